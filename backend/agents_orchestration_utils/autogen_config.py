@@ -4,7 +4,7 @@ import autogen
 import time 
 
 from dotenv import load_dotenv
-from typing import Optional
+from typing import List, Optional
 from autogen.agentchat.contrib.capabilities import transform_messages, transforms
 
 from .mcp_sse_connection import MCP_SSE_Connection
@@ -21,6 +21,11 @@ file_client = MCP_SSE_Connection(FILE_SERVER_URL)
 code_client = MCP_SSE_Connection(CODE_SERVER_URL)
 git_client = MCP_SSE_Connection(GIT_SERVER_URL)
 
+# Batch coding tools run one LLM call per file; wait longer for them than for single calls.
+BATCH_TOOL_TIMEOUT = int(os.environ.get("BATCH_TOOL_TIMEOUT", "3600"))
+# Clones of large repositories can take far longer than a regular tool call.
+GIT_CLONE_TOOL_TIMEOUT = int(os.environ.get("GIT_CLONE_TOOL_TIMEOUT", "3600"))
+
 RPM_LIMIT = 30
 RPM_DELAY_SECONDS = 60 / RPM_LIMIT 
 
@@ -43,13 +48,14 @@ def write_file(path: str, content: str) -> str:
     """
     return file_client.call_tool("write_file", {'path': path, 'content': content})
 
-def read_file(path: str) -> str:
-    """Reads the entire content of a specified file.
+def read_file(path: str, metadata_only: bool = False) -> str:
+    """Reads the entire content of a specified text file. Binary files only return their size, type and checksum.
 
     Args:
         path (str): The path of the file to read.
+        metadata_only (bool): If True, returns only size, type, encoding and checksum instead of the content. Defaults to False.
     """
-    return file_client.call_tool("read_file", {'path': path})
+    return file_client.call_tool("read_file", {'path': path, 'metadata_only': metadata_only})
 
 def list_directory(path: str = ".") -> str:
     """Lists all files and subdirectories in a given directory path.
@@ -92,37 +98,64 @@ def get_file_info(path: str) -> str:
     """
     return file_client.call_tool("get_file_info", {'path': path})
 
+def workspace_fingerprint(path: str = ".", previous_hash: str = "") -> str:
+    """Gets a content hash of a file or directory tree to cheaply check whether anything changed.
+
+    Args:
+        path (str): The file or directory to fingerprint. Defaults to the workspace root.
+        previous_hash (str): A hash returned by an earlier call. If given, the paths changed since then are listed.
+    """
+    return file_client.call_tool("workspace_fingerprint", {'path': path, 'previous_hash': previous_hash})
+
 
 # --- Coding Tools ---
 
-def explain_code(code: str, language: str = "auto") -> str:
-    """Analyzes and provides a detailed explanation of a piece of code.
+def _source_args(code: str, path: str, paths: Optional[List[str]], start_line: int, end_line: int) -> dict:
+    """Either inline code or a workspace selection; unused fields are left out of the call"""
+    args = {'code': code, 'path': path, 'paths': paths, 'start_line': start_line, 'end_line': end_line}
+    return {key: value for key, value in args.items() if value}
+
+
+def explain_code(code: str = "", language: str = "auto", path: str = "", paths: Optional[List[str]] = None, start_line: int = 0, end_line: int = 0) -> str:
+    """Analyzes and provides a detailed explanation of a piece of code or of workspace files.
 
     Args:
         code (str): The code snippet to explain.
         language (str): The programming language of the code. Defaults to "auto".
+        path (str): Workspace file to load instead of passing code, e.g. 'src/app.py'.
+        paths (list[str]): Several workspace files to load together; entries may select lines as 'src/app.py:10-40'.
+        start_line (int): First line (1-based) of path to use. 0 means the start of the file.
+        end_line (int): Last line (inclusive) of path to use. 0 means the end of the file.
     """
-    return code_client.call_tool("explain_code", {'code': code, 'language': language})
+    return code_client.call_tool("explain_code", {**_source_args(code, path, paths, start_line, end_line), 'language': language})
 
-def fix_code_error(code: str, error_message: str, language: str = "auto") -> str:
-    """Fixes an error in a piece of code given the code and the full error message.
+def fix_code_error(error_message: str, code: str = "", language: str = "auto", path: str = "", paths: Optional[List[str]] = None, start_line: int = 0, end_line: int = 0) -> str:
+    """Fixes an error in a piece of code given the code (or its workspace path) and the full error message.
 
     Args:
-        code (str): The code snippet containing the error.
         error_message (str): The full error message produced by the code.
+        code (str): The code snippet containing the error.
         language (str): The programming language of the code. Defaults to "auto".
+        path (str): Workspace file to load instead of passing code, e.g. 'src/app.py'.
+        paths (list[str]): Several workspace files to load together; entries may select lines as 'src/app.py:10-40'.
+        start_line (int): First line (1-based) of path to use. 0 means the start of the file.
+        end_line (int): Last line (inclusive) of path to use. 0 means the end of the file.
     """
-    return code_client.call_tool("fix_code_error", {'code': code, 'error_message': error_message, 'language': language})
+    return code_client.call_tool("fix_code_error", {**_source_args(code, path, paths, start_line, end_line), 'error_message': error_message, 'language': language})
 
-def create_unit_tests(code: str, language: str = "auto", test_framework: str = "auto") -> str:
-    """Generates unit tests for a given piece of code.
+def create_unit_tests(code: str = "", language: str = "auto", test_framework: str = "auto", path: str = "", paths: Optional[List[str]] = None, start_line: int = 0, end_line: int = 0) -> str:
+    """Generates unit tests for a given piece of code or workspace files.
 
     Args:
         code (str): The code snippet to generate tests for.
         language (str): The programming language of the code. Defaults to "auto".
         test_framework (str): The desired testing framework (e.g., 'pytest', 'jest'). Defaults to "auto".
+        path (str): Workspace file to load instead of passing code, e.g. 'src/app.py'.
+        paths (list[str]): Several workspace files to load together; entries may select lines as 'src/app.py:10-40'.
+        start_line (int): First line (1-based) of path to use. 0 means the start of the file.
+        end_line (int): Last line (inclusive) of path to use. 0 means the end of the file.
     """
-    return code_client.call_tool("create_unit_tests", {'code': code, 'language': language, 'test_framework': test_framework})
+    return code_client.call_tool("create_unit_tests", {**_source_args(code, path, paths, start_line, end_line), 'language': language, 'test_framework': test_framework})
 
 def create_boilerplate(project_type: str, language: str, features: str = "") -> str:
     """Creates boilerplate code for various project types.
@@ -134,44 +167,112 @@ def create_boilerplate(project_type: str, language: str, features: str = "") ->
     """
     return code_client.call_tool("create_boilerplate", {'project_type': project_type, 'language': language, 'features': features})
 
-def code_review(code: str, language: str = "auto") -> str:
-    """Performs a detailed review of a piece of code, suggesting improvements.
+def code_review(code: str = "", language: str = "auto", path: str = "", paths: Optional[List[str]] = None, start_line: int = 0, end_line: int = 0) -> str:
+    """Performs a detailed review of a piece of code or of workspace files, suggesting improvements.
 
     Args:
         code (str): The code snippet to review.
         language (str): The programming language of the code. Defaults to "auto".
+        path (str): Workspace file to load instead of passing code, e.g. 'src/app.py'.
+        paths (list[str]): Several workspace files to load together; entries may select lines as 'src/app.py:10-40'.
+        start_line (int): First line (1-based) of path to use. 0 means the start of the file.
+        end_line (int): Last line (inclusive) of path to use. 0 means the end of the file.
     """
-    return code_client.call_tool("code_review", {'code': code, 'language': language})
+    return code_client.call_tool("code_review", {**_source_args(code, path, paths, start_line, end_line), 'language': language})
 
-def optimize_code(code: str, language: str = "auto") -> str:
-    """Optimizes code for performance, readability, or memory usage.
+def optimize_code(code: str = "", language: str = "auto", path: str = "", paths: Optional[List[str]] = None, start_line: int = 0, end_line: int = 0) -> str:
+    """Optimizes code (inline or from workspace files) for performance, readability, or memory usage.
 
     Args:
         code (str): The code snippet to optimize.
         language (str): The programming language of the code. Defaults to "auto".
+        path (str): Workspace file to load instead of passing code, e.g. 'src/app.py'.
+        paths (list[str]): Several workspace files to load together; entries may select lines as 'src/app.py:10-40'.
+        start_line (int): First line (1-based) of path to use. 0 means the start of the file.
+        end_line (int): Last line (inclusive) of path to use. 0 means the end of the file.
     """
-    return code_client.call_tool("optimize_code", {'code': code, 'language': language})
+    return code_client.call_tool("optimize_code", {**_source_args(code, path, paths, start_line, end_line), 'language': language})
 
-def convert_code(code: str, from_language: str, to_language: str) -> str:
-    """Converts a code snippet from one programming language to another.
+def convert_code(to_language: str, code: str = "", from_language: str = "auto", path: str = "", paths: Optional[List[str]] = None, start_line: int = 0, end_line: int = 0) -> str:
+    """Converts code (inline or from workspace files) from one programming language to another.
 
     Args:
-        code (str): The code snippet to convert.
-        from_language (str): The source programming language.
         to_language (str): The target programming language.
+        code (str): The code snippet to convert.
+        from_language (str): The source programming language. Defaults to "auto".
+        path (str): Workspace file to load instead of passing code, e.g. 'src/app.py'.
+        paths (list[str]): Several workspace files to load together; entries may select lines as 'src/app.py:10-40'.
+        start_line (int): First line (1-based) of path to use. 0 means the start of the file.
+        end_line (int): Last line (inclusive) of path to use. 0 means the end of the file.
     """
-    return code_client.call_tool("convert_code", {'code': code, 'from_language': from_language, 'to_language': to_language})
+    return code_client.call_tool("convert_code", {**_source_args(code, path, paths, start_line, end_line), 'source_language': from_language, 'target_language': to_language})
 
 
-def generate_documentation(code: str, doc_type: str = "api", language: str = "auto") -> str:
-    """Creates professional documentation for a code snippet.
+def generate_documentation(code: str = "", doc_type: str = "api", language: str = "auto", path: str = "", paths: Optional[List[str]] = None, start_line: int = 0, end_line: int = 0) -> str:
+    """Creates professional documentation for a code snippet or workspace files.
 
     Args:
         code (str): The code snippet to document.
         doc_type (str): The type of documentation (e.g., 'docstrings', 'readme', 'api'). Defaults to "api".
         language (str): The programming language of the code. Defaults to "auto".
+        path (str): Workspace file to load instead of passing code, e.g. 'src/app.py'.
+        paths (list[str]): Several workspace files to load together; entries may select lines as 'src/app.py:10-40'.
+        start_line (int): First line (1-based) of path to use. 0 means the start of the file.
+        end_line (int): Last line (inclusive) of path to use. 0 means the end of the file.
+    """
+    return code_client.call_tool("generate_documentation", {**_source_args(code, path, paths, start_line, end_line), 'doc_type': doc_type, 'language': language})
+
+
+def batch_code_review(pattern: str = "", paths: Optional[List[str]] = None, language: str = "auto", output_dir: str = "", resume: bool = True) -> str:
+    """Reviews many workspace files at once and writes one review per file to disk.
+
+    Args:
+        pattern (str): Glob of files to review, relative to the workspace (e.g. 'src/**/*.py').
+        paths (list[str]): Explicit list of files to review, instead of pattern.
+        language (str): The programming language of the files. Defaults to "auto".
+        output_dir (str): Workspace directory for the results. Defaults to '.mcp_batch/code_review'.
+        resume (bool): Skip files finished by an earlier run and unchanged since. Defaults to True.
+    """
+    return code_client.call_tool("batch_code_review", {'pattern': pattern, 'paths': paths, 'language': language, 'output_dir': output_dir, 'resume': resume}, timeout=BATCH_TOOL_TIMEOUT)
+
+def batch_generate_documentation(pattern: str = "", paths: Optional[List[str]] = None, doc_type: str = "api", language: str = "auto", output_dir: str = "", resume: bool = True) -> str:
+    """Documents many workspace files at once and writes one document per file to disk.
+
+    Args:
+        pattern (str): Glob of files to document, relative to the workspace (e.g. 'src/**/*.py').
+        paths (list[str]): Explicit list of files to document, instead of pattern.
+        doc_type (str): The type of documentation (e.g., 'docstrings', 'readme', 'api'). Defaults to "api".
+        language (str): The programming language of the files. Defaults to "auto".
+        output_dir (str): Workspace directory for the results. Defaults to '.mcp_batch/generate_documentation'.
+        resume (bool): Skip files finished by an earlier run and unchanged since. Defaults to True.
+    """
+    return code_client.call_tool("batch_generate_documentation", {'pattern': pattern, 'paths': paths, 'doc_type': doc_type, 'language': language, 'output_dir': output_dir, 'resume': resume}, timeout=BATCH_TOOL_TIMEOUT)
+
+def batch_create_unit_tests(pattern: str = "", paths: Optional[List[str]] = None, language: str = "auto", test_framework: str = "auto", output_dir: str = "", resume: bool = True) -> str:
+    """Generates unit tests for many workspace files at once and writes one result per file to disk.
+
+    Args:
+        pattern (str): Glob of files to test, relative to the workspace (e.g. 'src/**/*.py').
+        paths (list[str]): Explicit list of files to test, instead of pattern.
+        language (str): The programming language of the files. Defaults to "auto".
+        test_framework (str): The desired testing framework (e.g., 'pytest', 'jest'). Defaults to "auto".
+        output_dir (str): Workspace directory for the results. Defaults to '.mcp_batch/create_unit_tests'.
+        resume (bool): Skip files finished by an earlier run and unchanged since. Defaults to True.
+    """
+    return code_client.call_tool("batch_create_unit_tests", {'pattern': pattern, 'paths': paths, 'language': language, 'test_framework': test_framework, 'output_dir': output_dir, 'resume': resume}, timeout=BATCH_TOOL_TIMEOUT)
+
+def batch_convert_code(to_language: str, pattern: str = "", paths: Optional[List[str]] = None, from_language: str = "auto", output_dir: str = "", resume: bool = True) -> str:
+    """Converts many workspace files to another programming language and writes one result per file to disk.
+
+    Args:
+        to_language (str): The target programming language.
+        pattern (str): Glob of files to convert, relative to the workspace (e.g. 'src/**/*.py').
+        paths (list[str]): Explicit list of files to convert, instead of pattern.
+        from_language (str): The source programming language. Defaults to "auto".
+        output_dir (str): Workspace directory for the results. Defaults to '.mcp_batch/convert_code'.
+        resume (bool): Skip files finished by an earlier run and unchanged since. Defaults to True.
     """
-    return code_client.call_tool("generate_documentation", {'code': code, 'doc_type': doc_type, 'language': language})
+    return code_client.call_tool("batch_convert_code", {'pattern': pattern, 'paths': paths, 'source_language': from_language, 'target_language': to_language, 'output_dir': output_dir, 'resume': resume}, timeout=BATCH_TOOL_TIMEOUT)
 
 
 # --- Git Tools ---
@@ -184,22 +285,32 @@ def git_init(path: str = ".") -> str:
     """
     return git_client.call_tool("git_init", {'path': path})
 
-def git_clone(url: str, directory: str = ".") -> str:
+def git_clone(url: str, directory: Optional[str] = None, depth: int = 0, filter: str = "", branch: str = "", single_branch: bool = False, sparse: Optional[List[str]] = None) -> str:
     """Clones a remote Git repository from a URL into a local directory.
 
     Args:
         url (str): The URL of the remote Git repository to clone.
-        directory (str): The local directory path to clone the repository into. Defaults to the current directory.
+        directory (str): The new, empty directory to clone into. Defaults to the repository name.
+        depth (int): If > 0, only fetch this many most recent commits (shallow clone). Use 1 when history is not needed.
+        filter (str): Partial clone filter, e.g. 'blob:none' to download file contents only when they are checked out.
+        branch (str): Branch or tag to check out instead of the remote's default branch.
+        single_branch (bool): Only fetch the history of that one branch.
+        sparse (List[str]): Only check out these directories.
     """
-    return git_client.call_tool("git_clone", {'url': url, 'directory': directory})
+    payload = {'url': url, 'depth': depth, 'filter': filter, 'branch': branch, 'single_branch': single_branch, 'sparse': sparse}
+    if directory:
+        payload['directory'] = directory
+    return git_client.call_tool("git_clone", payload, timeout=GIT_CLONE_TOOL_TIMEOUT)
 
-def git_status(path: str = ".") -> str:
-    """Shows the status of the Git repository, including staged, unstaged, and untracked files.
+def git_status(path: str = ".", pathspec: Optional[List[str]] = None, max_paths: int = 50) -> str:
+    """Shows the status of the Git repository: branch, counts of staged, unstaged, untracked and conflicted files, and the changed paths.
 
     Args:
         path (str): The path to the Git repository. Defaults to the current directory.
+        pathspec (List[str]): Only report these paths or directories (relative to path). Use it in large repositories.
+        max_paths (int): Maximum number of changed paths to list. Defaults to 50.
     """
-    return git_client.call_tool("git_status", {'path': path})
+    return git_client.call_tool("git_status", {'path': path, 'pathspec': pathspec or [], 'max_paths': max_paths})
 
 def git_add(files: str, path: str = ".") -> str:
     """Adds file contents to the staging area for the next commit.
@@ -249,24 +360,35 @@ def git_branch(action: str = "list", branch_name: str = "", path: str = ".") ->
     """
     return git_client.call_tool("git_branch", {'action': action, 'branch_name': branch_name, 'path': path})
 
-def git_log(count: int = 10, path: str = ".") -> str:
-    """Shows the commit history for the repository.
+def git_log(count: int = 10, path: str = ".", cursor: str = "", ref: str = "HEAD", pathspec: Optional[List[str]] = None, author: str = "", since: str = "", until: str = "", grep: str = "", stats: bool = False) -> str:
+    """Shows the commit history for the repository, newest first, one line per commit. Narrow it with filters instead of asking for many commits.
 
     Args:
-        count (int): The number of recent commits to display. Defaults to 10.
+        count (int): The number of commits per page. Defaults to 10.
         path (str): The path to the Git repository. Defaults to the current directory.
+        cursor (str): The cursor printed at the end of a previous page, to get older commits (repeat the same filters).
+        ref (str): Branch, tag or commit to start from. Defaults to 'HEAD'.
+        pathspec (List[str]): Only commits touching these paths (relative to path).
+        author (str): Only commits whose author matches this pattern.
+        since (str): Only commits after this date, e.g. '2 weeks ago' or '2024-05-01'.
+        until (str): Only commits before this date.
+        grep (str): Only commits whose message matches this pattern (case-insensitive).
+        stats (bool): Add line counts and changed files to each commit. Defaults to False.
     """
-    return git_client.call_tool("git_log", {'count': count, 'path': path})
+    return git_client.call_tool("git_log", {'count': count, 'path': path, 'cursor': cursor, 'ref': ref, 'pathspec': pathspec or [], 'author': author, 'since': since, 'until': until, 'grep': grep, 'stats': stats})
 
-def git_diff(file: str = "", staged: bool = False, path: str = ".") -> str:
-    """Shows the differences between commits, the commit and the working tree, etc.
+def git_diff(file: str = "", staged: bool = False, path: str = ".", pathspec: Optional[List[str]] = None, mode: str = "auto", cursor: str = "") -> str:
+    """Shows the differences between commits, the commit and the working tree, etc. Large diffs come back as a summary of changed files first; request the hunks of the files you need with mode='patch' and pathspec.
 
     Args:
-        file (str): The specific file to diff. If empty, shows all changes.
+        file (str): The specific file (or a revision such as 'HEAD~1') to diff. If empty, shows all changes.
         staged (bool): If True, shows only changes in the staging area. Defaults to False.
         path (str): The path to the Git repository. Defaults to the current directory.
+        pathspec (List[str]): Only diff these paths or directories (relative to path).
+        mode (str): 'auto' (patch if small, else summary), 'summary' (changed files with line counts) or 'patch' (hunks). Defaults to 'auto'.
+        cursor (str): The cursor printed at the end of a previous page, to get the next page.
     """
-    return git_client.call_tool("git_diff", {'file': file, 'staged': staged, 'path': path})
+    return git_client.call_tool("git_diff", {'file': file, 'staged': staged, 'path': path, 'pathspec': pathspec or [], 'mode': mode, 'cursor': cursor})
 
 def git_remote(action: str = "list", name: str = "", url: str = "", path: str = ".") -> str:
     """Manages the set of tracked remote repositories. Actions can be 'list', 'add', or 'remove'.
@@ -320,6 +442,25 @@ def git_config(action: str = "list", key: str = "", value: str = "", global_conf
     """
     return git_client.call_tool("git_config", {'action': action, 'key': key, 'value': value, 'global_config': global_config, 'path': path})
 
+def list_repositories(path: str = ".", dirty: bool = True) -> str:
+    """Lists the Git repositories in the workspace (including worktrees and submodules) with their current branch, HEAD commit and whether they have uncommitted changes. Use it to find the path of a repository before calling other git tools.
+
+    Args:
+        path (str): Only list repositories at or below this directory. Defaults to the whole workspace.
+        dirty (bool): Also report clean/dirty for each repository. Defaults to True.
+    """
+    return git_client.call_tool("list_repositories", {'path': path, 'dirty': dirty})
+
+def git_batch(operations: List[dict], path: str = ".") -> str:
+    """Runs several Git operations on one repository in a single call, stopping at the first failure. Prefer it over separate calls for routine flows such as add + commit + status.
+
+    Args:
+        operations (List[dict]): Ordered operations, each with an "op" key, e.g. [{"op": "add", "files": ["a.py"]}, {"op": "commit", "message": "Fix parser"}, {"op": "status"}].
+            Operations: add/rm {files}, restore {files, staged}, commit {message, all}, status, diff {staged, files}, log {count}, branch {name, delete}, checkout {branch, create}, merge {branch}, reset {mode, target}, stash {action, message}, tag {name, message}, fetch/pull/push {remote, branch}.
+        path (str): The path to the Git repository. Defaults to the current directory.
+    """
+    return git_client.call_tool("git_batch", {'operations': operations, 'path': path})
+
 
 def get_autogen_config(llm_config: dict):
     """
@@ -327,10 +468,11 @@ def get_autogen_config(llm_config: dict):
     with intelligent context handling.
     """
     available_tools = [
-        write_file, read_file, list_directory, create_directory, delete_file, move_file, get_file_info,
+        write_file, read_file, list_directory, create_directory, delete_file, move_file, get_file_info, workspace_fingerprint,
         explain_code, fix_code_error, create_unit_tests, create_boilerplate, code_review, optimize_code, convert_code, generate_documentation,
+        batch_code_review, batch_generate_documentation, batch_create_unit_tests, batch_convert_code,
         git_init, git_clone, git_status, git_add, git_commit, git_push, git_pull, git_branch, git_log, git_diff, git_remote, git_stash, 
-        git_merge, git_reset, git_config
+        git_merge, git_reset, git_config, git_batch, list_repositories
     ]
     
     context_handling = transform_messages.TransformMessages(
@@ -351,6 +493,9 @@ def get_autogen_config(llm_config: dict):
             4. When interacting with files, always verify their existence using `list_directory` before accessing them.
             5. When unsure about a file/directory path, retrieve or create it using available tools.
             6. For each tool call, be precise and use the correct parameters — no guessing.
+            7. To run a coding tool on a workspace file, pass its `path` (or `paths`) instead of reading the file and pasting its content as `code`.
+            8. When unsure where a Git repository is, call `list_repositories` instead of probing paths with `git_status`.
+            9. For several git steps on one repository (e.g. add, commit, status), make one `git_batch` call instead of one call per step.
 
             **Strict rules:**
             - You MUST NOT write Python code or shell commands directly.
@@ -2,7 +2,7 @@ import requests
 import json
 import uuid
 import threading
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Optional
 
 class MCP_SSE_Connection:
     def __init__(self, server_base_url: str):
@@ -12,6 +12,7 @@ class MCP_SSE_Connection:
         self._listener_thread = None
         self._is_connected = False
         self._pending_requests: Dict[str, Dict[str, Any]] = {}
+        self._progress_handlers: Dict[str, Callable[[str, float], None]] = {}
         self._lock = threading.Lock()
         self._url_received_event = threading.Event()
 
@@ -26,10 +27,14 @@ class MCP_SSE_Connection:
         post_response = self._session.post(self._message_url, json=message_to_send, timeout=180)
         post_response.raise_for_status()
 
-    def _send_rpc_request(self, method: str, params: dict, timeout: int = 180) -> Any:
+    def _send_rpc_request(self, method: str, params: dict, timeout: int = 180, on_progress: Optional[Callable[[str, float], None]] = None) -> Any:
         message_id = str(uuid.uuid4())
         event = threading.Event()
         self._pending_requests[message_id] = {"event": event, "response": None}
+        if on_progress is not None:
+            # Ask the server for progress notifications tied to this request.
+            params = {**params, "_meta": {"progressToken": message_id}}
+            self._progress_handlers[message_id] = on_progress
 
         message_to_send = {
             "method": "notifications/initialized",
@@ -45,6 +50,7 @@ class MCP_SSE_Connection:
 
         event_was_set = event.wait(timeout=timeout)
         response_data = self._pending_requests.pop(message_id, None)
+        self._progress_handlers.pop(message_id, None)
 
         if not event_was_set:
             raise TimeoutError(f"Request '{method}' (ID: {message_id}) timed out.")
@@ -107,6 +113,9 @@ class MCP_SSE_Connection:
 
                 try:
                     message = json.loads(message_data_bytes)
+                    if message.get("method") == "notifications/progress":
+                        self._dispatch_progress(message.get("params", {}))
+                        continue
                     correlation_id = message.get("id")
                     if correlation_id in self._pending_requests:
                         request_info = self._pending_requests[correlation_id]
@@ -120,12 +129,26 @@ class MCP_SSE_Connection:
             print("[MCPClient Listener] Stopped.")
             self._is_connected = False
             
-    def call_tool(self, tool_name: str, payload: dict) -> str:
+    def _dispatch_progress(self, params: dict):
+        handler = self._progress_handlers.get(params.get("progressToken"))
+        if handler is None:
+            return
+        try:
+            handler(params.get("message") or "", params.get("progress", 0))
+        except Exception as e:
+            print(f"[MCPClient Listener] Progress handler failed: {e}")
+
+    def call_tool(self, tool_name: str, payload: dict, on_progress: Optional[Callable[[str, float], None]] = None, timeout: int = 180) -> str:
+        """
+        Calls a tool on the server. If on_progress is given, it is called with
+        (message, progress) for every progress notification, e.g. streamed LLM output.
+        timeout is how long to wait for the result, in seconds.
+        """
         try:
             if not self._is_connected:
                 self.connect()
             tool_params = {"name": tool_name, "arguments": payload}
-            result = self._send_rpc_request("tools/call", tool_params)
+            result = self._send_rpc_request("tools/call", tool_params, timeout=timeout, on_progress=on_progress)
             return str(result)
         except Exception as e:
             error_message = f"An error occurred during tool call '{tool_name}': {e}"
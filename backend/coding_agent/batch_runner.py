@@ -0,0 +1,165 @@
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from file_agent.file_transfer import file_sha256
+from coding_agent.workspace_source import WORKSPACE_DIR, resolve_workspace_path, relative_label
+
+BATCH_MAX_FILES = int(os.getenv("CODE_BATCH_MAX_FILES", "500"))
+MANIFEST_NAME = "manifest.json"
+SKIPPED_DIRS = {".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv", ".mypy_cache", ".pytest_cache"}
+
+# process(relative path) -> (succeeded, tool output)
+ProcessFn = Callable[[str], Awaitable[Tuple[bool, str]]]
+# report(files finished, files total, message)
+ReportFn = Callable[[int, int, str], Awaitable[None]]
+
+
+def select_files(pattern: str = "", paths: Optional[List[str]] = None, exclude: Optional[Path] = None) -> List[Path]:
+    """
+    Resolve a workspace glob (e.g. 'src/**/*.py') or an explicit list of paths
+    to existing files, skipping VCS/dependency directories and anything under
+    exclude (the batch's own output directory).
+    """
+    if pattern and paths:
+        raise ValueError("Pass either pattern or paths, not both.")
+    if paths:
+        candidates = [resolve_workspace_path(p) for p in paths]
+        missing = [p for p, c in zip(paths, candidates) if not c.is_file()]
+        if missing:
+            raise ValueError(f"Files not found in workspace: {', '.join(missing)}")
+    elif pattern:
+        if Path(pattern).is_absolute():
+            raise ValueError("pattern must be relative to the workspace")
+        candidates = [p.resolve() for p in WORKSPACE_DIR.glob(pattern)]
+    else:
+        raise ValueError("No files selected; pass pattern or paths.")
+
+    selected = []
+    for candidate in candidates:
+        if not candidate.is_file() or (WORKSPACE_DIR not in candidate.parents):
+            continue
+        if SKIPPED_DIRS.intersection(candidate.relative_to(WORKSPACE_DIR).parts[:-1]):
+            continue
+        if exclude is not None and (candidate == exclude or exclude in candidate.parents):
+            continue
+        selected.append(candidate)
+    selected = sorted(set(selected))
+    if not selected:
+        raise ValueError(f"No files matched {pattern or paths}")
+    if len(selected) > BATCH_MAX_FILES:
+        raise ValueError(f"{len(selected)} files selected, limit is {BATCH_MAX_FILES}; narrow the selection.")
+    return selected
+
+
+class BatchManifest:
+    """
+    JSON progress record kept in the batch's output directory. A rerun with the
+    same tool and parameters skips files whose source digest is unchanged and
+    whose output still exists, so an interrupted batch resumes where it stopped.
+    """
+
+    def __init__(self, path: Path, tool: str, params: Dict[str, Any], resume: bool = True):
+        self.path = path
+        self.tool = tool
+        self.params = params
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        if resume and path.is_file():
+            try:
+                stored = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                stored = {}
+            if stored.get("tool") == tool and stored.get("params") == params:
+                self.files = stored.get("files", {})
+
+    def is_done(self, relative: str, sha256: str) -> bool:
+        entry = self.files.get(relative)
+        return (
+            entry is not None
+            and entry.get("status") == "done"
+            and entry.get("sha256") == sha256
+            and (WORKSPACE_DIR / entry.get("output", "")).is_file()
+        )
+
+    async def record(self, relative: str, entry: Dict[str, Any]) -> None:
+        """Store one file's outcome and persist the manifest atomically"""
+        async with self._lock:
+            self.files[relative] = entry
+            data = json.dumps(
+                {"tool": self.tool, "params": self.params, "updated_at": time.time(), "files": self.files},
+                indent=2, sort_keys=True,
+            )
+            await asyncio.to_thread(self._write, data)
+
+    def _write(self, data: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(data, encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def _write_output(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(content, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+async def run_batch(
+    files: List[Path],
+    output_dir: Path,
+    manifest: BatchManifest,
+    workers: int,
+    process: ProcessFn,
+    report: Optional[ReportFn] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Run process over files with at most `workers` files in flight, writing each
+    output to <output_dir>/<relative path>.md and recording it in the manifest
+    as soon as it finishes. Returns one result entry per file, in input order.
+    """
+    total = len(files)
+    finished = 0
+    results: Dict[str, Dict[str, Any]] = {}
+    queue: "asyncio.Queue[Path]" = asyncio.Queue()
+    for file_path in files:
+        queue.put_nowait(file_path)
+
+    async def finish(relative: str, entry: Dict[str, Any]) -> None:
+        nonlocal finished
+        finished += 1
+        results[relative] = entry
+        if report:
+            detail = entry.get("output") if entry["status"] != "error" else entry.get("error")
+            await report(finished, total, f"[{finished}/{total}] {relative}: {entry['status']} ({detail})")
+
+    async def worker() -> None:
+        while not queue.empty():
+            file_path = queue.get_nowait()
+            relative = relative_label(file_path)
+            output = output_dir / f"{relative}.md"
+            sha256 = await asyncio.to_thread(file_sha256, file_path)
+            if manifest.is_done(relative, sha256):
+                await finish(relative, {**manifest.files[relative], "status": "skipped"})
+                continue
+
+            started = time.monotonic()
+            try:
+                ok, text = await process(relative)
+            except Exception as e:
+                ok, text = False, str(e)
+            entry = {"sha256": sha256, "seconds": round(time.monotonic() - started, 3)}
+            if ok:
+                await asyncio.to_thread(_write_output, output, text)
+                entry.update(status="done", output=relative_label(output))
+            else:
+                entry.update(status="error", error=text[:500])
+            await manifest.record(relative, entry)
+            await finish(relative, entry)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(workers, total)))))
+    return [{"path": relative_label(f), **results[relative_label(f)]} for f in files]
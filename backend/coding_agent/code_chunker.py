@@ -0,0 +1,153 @@
+import ast
+import re
+from typing import List, Tuple
+
+# (label, source) of one chunk, e.g. ("lines 10-42: class Parser", "class Parser: ...")
+CodeChunk = Tuple[str, str]
+
+BRACE_LANGUAGES = {"javascript", "typescript", "java", "c++", "rust", "go"}
+_NAME_PATTERNS = [
+    re.compile(r"^\s*(?:export\s+)?(?:async\s+)?(?:function|class|def|fn|func|struct|enum|trait|impl|interface)\s+([\w:<>]+)"),
+    re.compile(r"^\s*(?:pub\s+)?(?:async\s+)?fn\s+(\w+)"),
+    re.compile(r"^\s*(?:public|private|protected|static|final|\s)*[\w<>\[\],]+\s+(\w+)\s*\([^;]*$"),
+]
+
+
+def _unit_name(lines: List[str]) -> str:
+    for line in lines:
+        for pattern in _NAME_PATTERNS:
+            match = pattern.match(line)
+            if match:
+                return match.group(1)
+    return ""
+
+
+def _first_line(node: ast.stmt) -> int:
+    """0-based first line of a statement, including its decorators"""
+    return min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])]) - 1
+
+
+def _python_units(lines: List[str], body: List[ast.stmt], body_end: int, max_chars: int) -> List[Tuple[int, int]]:
+    """Line ranges (0-based, end exclusive) of statements, splitting oversized classes by member"""
+    units = []
+    for index, node in enumerate(body):
+        start = _first_line(node)
+        end = _first_line(body[index + 1]) if index + 1 < len(body) else body_end
+        # Comments directly above a definition belong to it, not to the previous unit.
+        floor = units[-1][0] + 1 if units else 0
+        while start > floor and lines[start - 1].strip().startswith("#"):
+            start -= 1
+        if units:
+            units[-1] = (units[-1][0], start)
+
+        size = sum(len(line) + 1 for line in lines[start:end])
+        if isinstance(node, ast.ClassDef) and size > max_chars and len(node.body) > 1:
+            header_end = _first_line(node.body[0])
+            units.append((start, header_end))
+            units.extend(_python_units(lines, node.body, end, max_chars))
+        else:
+            units.append((start, end))
+    return units
+
+
+def _brace_units(lines: List[str], start: int, end: int, depth: int, max_chars: int) -> List[Tuple[int, int]]:
+    """Split lines[start:end] where brace nesting returns to depth; recurse one level into oversized blocks"""
+    units = []
+    level = 0
+    unit_start = start
+    entered = False
+    for i in range(start, end):
+        stripped = re.sub(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|//.*$', "", lines[i])
+        for char in stripped:
+            if char == "{":
+                level += 1
+                if level > depth:
+                    entered = True
+            elif char == "}":
+                level -= 1
+        if entered and level <= depth:
+            units.append((unit_start, i + 1))
+            unit_start = i + 1
+            entered = False
+    if unit_start < end:
+        units.append((unit_start, end))
+
+    if depth == 0 and len(units) <= 2:
+        # Typically one wrapping class/namespace: split its members instead.
+        refined = []
+        for unit in units:
+            size = sum(len(line) + 1 for line in lines[unit[0]:unit[1]])
+            refined.extend(_brace_units(lines, unit[0], unit[1], 1, max_chars) if size > max_chars else [unit])
+        return refined
+    return units
+
+
+def _line_units(lines: List[str], max_chars: int) -> List[Tuple[int, int]]:
+    units = []
+    start, size = 0, 0
+    for i, line in enumerate(lines):
+        if size and size + len(line) + 1 > max_chars:
+            units.append((start, i))
+            start, size = i, 0
+        size += len(line) + 1
+    units.append((start, len(lines)))
+    return units
+
+
+def split_code(code: str, language: str, max_chars: int) -> List[CodeChunk]:
+    """
+    Split code into chunks of at most ~max_chars on syntactic boundaries:
+    top-level definitions via ast for Python, brace nesting for C-like
+    languages, plain line windows otherwise. Adjacent small units are packed
+    together; a single unit larger than max_chars is cut into line windows.
+    """
+    lines = code.splitlines()
+    units = None
+    if language == "python":
+        try:
+            tree = ast.parse(code)
+            if tree.body:
+                units = _python_units(lines, tree.body, len(lines), max_chars)
+                units[0] = (0, units[0][1])
+        except SyntaxError:
+            units = None
+    elif language in BRACE_LANGUAGES:
+        units = _brace_units(lines, 0, len(lines), 0, max_chars)
+    if not units:
+        units = _line_units(lines, max_chars)
+
+    # Cut oversized units, then pack neighbours greedily.
+    bounded = []
+    for start, end in units:
+        if start >= end:
+            continue
+        if sum(len(line) + 1 for line in lines[start:end]) > max_chars:
+            bounded.extend((start + s, start + e) for s, e in _line_units(lines[start:end], max_chars))
+        else:
+            bounded.append((start, end))
+
+    chunks: List[CodeChunk] = []
+    current_start, current_end, size, names = None, None, 0, []
+    for start, end in bounded:
+        unit_size = sum(len(line) + 1 for line in lines[start:end])
+        if current_start is not None and size + unit_size > max_chars:
+            chunks.append(_make_chunk(lines, current_start, current_end, names))
+            current_start, size, names = None, 0, []
+        if current_start is None:
+            current_start = start
+        current_end = end
+        size += unit_size
+        name = _unit_name(lines[start:end])
+        if name:
+            names.append(name)
+    if current_start is not None:
+        chunks.append(_make_chunk(lines, current_start, current_end, names))
+    return chunks
+
+
+def _make_chunk(lines: List[str], start: int, end: int, names: List[str]) -> CodeChunk:
+    label = f"lines {start + 1}-{end}"
+    if names:
+        shown = ", ".join(names[:4]) + (", ..." if len(names) > 4 else "")
+        label += f": {shown}"
+    return label, "\n".join(lines[start:end])
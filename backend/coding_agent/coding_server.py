@@ -1,20 +1,262 @@
 import re
+import asyncio
 import uvicorn
 import os
 import sys
-from fastmcp import FastMCP
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import List, Optional, Tuple
+from fastmcp import FastMCP, Context
 from fastapi import FastAPI
 from starlette.applications import Starlette
 from starlette.routing import Route, Mount
 from mcp.server.sse import SseServerTransport
-from starlette.responses import Response
+from starlette.responses import Response, JSONResponse
+from pathlib import Path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from llm_choice.llm_client import FlexibleLLMClient
+from llm_choice.response_cache import ResponseCache, DEFAULT_TTL_SECONDS, DEFAULT_MAX_BYTES
+from coding_agent.code_chunker import split_code
+from coding_agent.workspace_source import load_sources, resolve_workspace_path, relative_label
+from coding_agent.batch_runner import BatchManifest, MANIFEST_NAME, select_files, run_batch
 
 
 mcp = FastMCP("Coding Assistant Server")
 
-code_helper = FlexibleLLMClient()
+response_cache = None
+if os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true":
+    response_cache = ResponseCache(
+        Path(os.getenv("LLM_CACHE_PATH", str(Path.home() / ".cache" / "mcp_coding_server" / "llm_responses.sqlite"))),
+        ttl_seconds=int(os.getenv("LLM_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+        max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+    )
+
+code_helper = FlexibleLLMClient(cache=response_cache)
+
+# How often buffered token deltas are relayed to the client as progress notifications.
+PROGRESS_FLUSH_SECONDS = 0.1
+# Code longer than this is processed chunk by chunk (map) and the partial answers merged (reduce).
+# The limit is lowered further when the model's prompt token budget is smaller.
+CHUNK_MAX_CHARS = int(os.getenv("CODE_CHUNK_MAX_CHARS", "12000"))
+MIN_CHUNK_CHARS = 1000
+# Tokens kept free for the "part i of n" note added to map prompts.
+PART_NOTE_TOKENS = 64
+# Workspace directory batch tools write to unless given an output_dir.
+BATCH_OUTPUT_DIR = os.getenv("CODE_BATCH_OUTPUT_DIR", ".mcp_batch")
+
+def wants_progress(ctx: Optional[Context]) -> bool:
+    """True when the client attached a progress token to the current tool call"""
+    try:
+        meta = ctx.request_context.meta if ctx else None
+    except (LookupError, ValueError):
+        return False
+    return meta is not None and meta.progressToken is not None
+
+async def generate(ctx: Optional[Context], tool: str, prompt: str, system_prompt: str, use_cache: bool, progress_base: float = 0) -> str:
+    """
+    Run the LLM call. If the client asked for progress, stream the answer and
+    relay the text deltas as MCP progress notifications, where progress is
+    progress_base plus the number of characters generated so far.
+    """
+    if not wants_progress(ctx):
+        return await code_helper.generate_response(prompt, system_prompt, tool, use_cache)
+
+    buffered = []
+    state = {"generated": progress_base, "last_flush": 0.0}
+
+    async def flush() -> None:
+        chunk = "".join(buffered)
+        buffered.clear()
+        state["generated"] += len(chunk)
+        state["last_flush"] = time.monotonic()
+        await ctx.report_progress(state["generated"], None, chunk)
+
+    async def on_token(delta: str) -> None:
+        buffered.append(delta)
+        if time.monotonic() - state["last_flush"] >= PROGRESS_FLUSH_SECONDS:
+            await flush()
+
+    response = await code_helper.generate_response(prompt, system_prompt, tool, use_cache, on_token)
+    if buffered:
+        await flush()
+    return response
+
+def chunk_limit(code: str, make_prompt, system_prompt: str) -> int:
+    """
+    Max characters of code per LLM call: CHUNK_MAX_CHARS, lowered so that the
+    prompt built around one chunk fits the model's prompt token budget.
+    """
+    budget = code_helper.budget
+    overhead = budget.count_messages([
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": make_prompt("")},
+    ])
+    available = budget.prompt_limit - overhead - PART_NOTE_TOKENS
+    chars_per_token = len(code) / max(1, budget.count(code))
+    return max(MIN_CHUNK_CHARS, min(CHUNK_MAX_CHARS, int(available * chars_per_token * 0.9)))
+
+async def map_chunks(ctx: Optional[Context], tool: str, chunks, make_prompt, system_prompt: str, use_cache: bool) -> List[str]:
+    """
+    Run make_prompt(chunk) for every chunk concurrently (bounded by the
+    client's provider limit); progress counts finished chunks.
+    """
+    progress = wants_progress(ctx)
+    state = {"done": 0}
+
+    async def process(index: int, label: str, snippet: str) -> str:
+        prompt = make_prompt(snippet) + f"""
+
+    Note: this is part {index} of {len(chunks)} ({label}) of a larger file. Cover only this part."""
+        result = await code_helper.generate_response(prompt, system_prompt, f"{tool}:map", use_cache)
+        state["done"] += 1
+        if progress:
+            await ctx.report_progress(state["done"], None, f"[processed {state['done']}/{len(chunks)} parts]\n")
+        return result
+
+    return await asyncio.gather(*(
+        process(index, label, snippet) for index, (label, snippet) in enumerate(chunks, start=1)
+    ))
+
+async def map_join(
+    ctx: Optional[Context],
+    tool: str,
+    code: str,
+    language: str,
+    make_prompt,
+    system_prompt: str,
+    use_cache: bool,
+    max_chars: int = CHUNK_MAX_CHARS,
+) -> str:
+    """
+    Like map_reduce, for answers that are complete per unit (tests, converted
+    or optimized code): the per-chunk answers are concatenated in file order
+    instead of being merged by another LLM call.
+    """
+    chunks = split_code(code, language, max_chars)
+    if len(chunks) == 1:
+        return await generate(ctx, tool, make_prompt(code), system_prompt, use_cache)
+    partials = await map_chunks(ctx, tool, chunks, make_prompt, system_prompt, use_cache)
+    sections = [f"The code was too large for one request, so it was handled in {len(chunks)} parts split at top-level units."]
+    sections += [
+        f"### Part {index} of {len(chunks)} ({label})\n{partial}"
+        for index, ((label, _), partial) in enumerate(zip(chunks, partials), start=1)
+    ]
+    return "\n\n".join(sections)
+
+def fit_code(code: str, make_prompt, system_prompt: str, focus_line: int = 0, first_line: int = 1) -> Tuple[str, str]:
+    """
+    Cut code to the lines that fit one prompt, keeping a window around
+    focus_line (1-based within code) when given and the beginning otherwise.
+    Returns the code and a note saying what was left out ("" when nothing
+    was); its line numbers start at first_line.
+    """
+    budget = code_helper.budget
+    available = budget.prompt_limit - budget.count_messages([
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": make_prompt("")},
+    ])
+    tokens = budget.count(code)
+    if tokens <= available:
+        return code, ""
+    lines = code.splitlines(keepends=True)
+    max_chars = int(max(0, available) * len(code) / max(1, tokens))
+    while True:
+        start = min(max(0, focus_line - 1), len(lines) - 1) if focus_line else 0
+        end = start
+        size = 0
+        # Grow the window alternately downwards and upwards until the character budget is used.
+        while end - start < len(lines):
+            grew = False
+            for below in (True, False):
+                index = end if below else start - 1
+                if 0 <= index < len(lines) and size + len(lines[index]) <= max_chars:
+                    size += len(lines[index])
+                    if below:
+                        end += 1
+                    else:
+                        start -= 1
+                    grew = True
+                    if not focus_line:
+                        break
+            if not grew:
+                break
+        kept = "".join(lines[start:end])
+        if budget.count(kept) <= available or max_chars <= 0:
+            break
+        max_chars = int(max_chars * 0.9)
+    around = " around the line named in the error" if focus_line else ""
+    note = (f"Note: the code is too long for the model's context; only lines {start + first_line}-{end + first_line - 1} "
+            f"of {first_line}-{len(lines) + first_line - 1}{around} "
+            f"were sent, the rest was left out.")
+    return kept, note
+
+async def map_reduce(
+    ctx: Optional[Context],
+    tool: str,
+    code: str,
+    language: str,
+    make_prompt,
+    system_prompt: str,
+    task: str,
+    use_cache: bool,
+    max_chars: int = CHUNK_MAX_CHARS,
+) -> str:
+    """
+    Handle code longer than max_chars: run make_prompt(chunk) for every
+    syntactic chunk concurrently (bounded by the client's provider limit), then
+    merge the partial answers with one final, streamed reduce call. Progress
+    counts finished chunks first, then reduce characters on top of that.
+    """
+    chunks = split_code(code, language, max_chars)
+    if len(chunks) == 1:
+        return await generate(ctx, tool, make_prompt(code), system_prompt, use_cache)
+    partials = await map_chunks(ctx, tool, chunks, make_prompt, system_prompt, use_cache)
+
+    def make_reduce_prompt(sections: str) -> str:
+        return f"""A {language} file was too large to handle at once, so it was split into {len(chunks)} parts and a partial {task} was written for each part:
+
+{sections}
+
+Merge these into a single, coherent {task} of the whole file. Remove repetition, keep every specific finding and reference, and organize the result as if the file had been handled in one go."""
+
+    # Trim the partial answers evenly if together they would not fit the reduce prompt.
+    budget = code_helper.budget
+    overhead = budget.count_messages([
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": make_reduce_prompt("")},
+    ])
+    per_part = max(1, (budget.prompt_limit - overhead) // len(chunks) - PART_NOTE_TOKENS)
+    sections = "\n\n".join(
+        f"### Part {index} ({label})\n{budget.trim(partial, per_part)}"
+        for index, ((label, _), partial) in enumerate(zip(chunks, partials), start=1)
+    )
+    reduce_prompt = make_reduce_prompt(sections)
+    return await generate(ctx, f"{tool}:reduce", reduce_prompt, system_prompt, use_cache, progress_base=len(chunks))
+
+async def load_input(
+    code: str, path: str, paths: Optional[List[str]], start_line: int, end_line: int, language: str
+) -> Tuple[str, str, str]:
+    """
+    Return (code, source label, language) for a tool call. The code is either
+    passed inline or loaded server-side from the workspace via path/paths, so
+    file content never has to travel through the orchestrating LLM.
+    """
+    source = ""
+    if path or paths:
+        if code:
+            raise ValueError("Pass either code or path/paths, not both.")
+        code, source, file_language = await asyncio.to_thread(load_sources, path, paths, start_line, end_line)
+        if language == "auto" and file_language:
+            language = file_language
+    elif not code:
+        raise ValueError("No code given; pass code, path or paths.")
+    if language == "auto":
+        language = detect_language(code)
+    return code, source, language
+
+def source_note(source: str) -> str:
+    return f" of {source}" if source else ""
 
 def detect_language(code: str) -> str:
     """Detect programming language from code"""
@@ -34,10 +276,16 @@ def detect_language(code: str) -> str:
         return "unknown"
 
 @mcp.tool("explain_code")
-def explain_code(code: str, language: str = "auto") -> str:
-    """Explain what a piece of code does"""
-    if language == "auto":
-        language = detect_language(code)
+async def explain_code(code: str = "", language: str = "auto", path: str = "", paths: Optional[List[str]] = None, start_line: int = 0, end_line: int = 0, use_cache: bool = True, ctx: Context = None) -> str:
+    """
+    Explain what a piece of code does.
+    Instead of code, pass a workspace path (optionally with start_line/end_line) or a list of paths
+    (entries may be 'file:start-end') to load the source server-side.
+    """
+    try:
+        code, source, language = await load_input(code, path, paths, start_line, end_line, language)
+    except ValueError as e:
+        return f"Error explaining code: {str(e)}"
     
     system_prompt = f"""You are a code explanation expert. Analyze the provided {language} code and provide:
     1. A clear, concise explanation of what the code does
@@ -46,25 +294,38 @@ def explain_code(code: str, language: str = "auto") -> str:
     4. Mention potential improvements or best practices
     5. Keep explanations accessible but technically accurate"""
     
-    prompt = f"""Please explain this {language} code:
+    def make_prompt(snippet: str) -> str:
+        return f"""Please explain this {language} code:
 
     ```{language}
-    {code}
+    {snippet}
     ```
 
     Provide a comprehensive but clear explanation suitable for developers."""
     
     try:
-        explanation = code_helper.generate_response(prompt, system_prompt)
-        return f"Code Explanation ({language}):\n\n{explanation}"
+        max_chars = chunk_limit(code, make_prompt, system_prompt)
+        if len(code) > max_chars:
+            explanation = await map_reduce(ctx, "explain_code", code, language, make_prompt, system_prompt, "explanation", use_cache, max_chars)
+        else:
+            explanation = await generate(ctx, "explain_code", make_prompt(code), system_prompt, use_cache)
+        return f"Code Explanation ({language}){source_note(source)}:\n\n{explanation}"
     except Exception as e:
         return f"Error explaining code: {str(e)}"
 
 @mcp.tool("fix_code_error")
-def fix_code_error(code: str, error_message: str, language: str = "auto") -> str:
-    """Fix code errors and provide corrected version"""
-    if language == "auto":
-        language = detect_language(code)
+async def fix_code_error(code: str = "", error_message: str = "", language: str = "auto", path: str = "", paths: Optional[List[str]] = None, start_line: int = 0, end_line: int = 0, use_cache: bool = True, ctx: Context = None) -> str:
+    """
+    Fix code errors and provide corrected version.
+    Instead of code, pass a workspace path (optionally with start_line/end_line) or a list of paths
+    (entries may be 'file:start-end') to load the source server-side.
+    """
+    try:
+        code, source, language = await load_input(code, path, paths, start_line, end_line, language)
+    except ValueError as e:
+        return f"Error fixing code: {str(e)}"
+    if not error_message:
+        return "Error fixing code: error_message is required."
     
     system_prompt = f"""You are a code debugging expert. Given code with an error, provide:
     1. Identification of the error and its cause
@@ -73,11 +334,12 @@ def fix_code_error(code: str, error_message: str, language: str = "auto") -> str
     4. Tips to avoid similar errors in the future
     Focus on providing working, clean code."""
         
-    prompt = f"""Fix this {language} code that has an error:
+    def make_prompt(snippet: str) -> str:
+        return f"""Fix this {language} code that has an error:
 
     **Code:**
     ```{language}
-    {code}
+    {snippet}
     ```
 
     **Error Message:**
@@ -86,16 +348,32 @@ def fix_code_error(code: str, error_message: str, language: str = "auto") -> str
     Please provide the corrected code and explain the fix."""
     
     try:
-        fix_response = code_helper.generate_response(prompt, system_prompt)
-        return f"Code Fix ({language}):\n\n{fix_response}"
+        # A fix needs the failing code in one piece: keep what fits, centred on the line the error names.
+        # Error line numbers count from the top of the file; code may be a slice starting at start_line.
+        first_line = start_line if path and start_line > 1 else 1
+        mentioned = re.findall(r"line (\d+)", error_message)
+        focus = int(mentioned[-1]) - first_line + 1 if mentioned and not paths else 0
+        if not 1 <= focus <= code.count("\n") + 1:
+            focus = 0
+        code, note = fit_code(code, make_prompt, system_prompt, focus, first_line)
+        fix_response = await generate(ctx, "fix_code_error", make_prompt(code), system_prompt, use_cache)
+        if note:
+            fix_response = f"{note}\n\n{fix_response}"
+        return f"Code Fix ({language}){source_note(source)}:\n\n{fix_response}"
     except Exception as e:
         return f"Error fixing code: {str(e)}"
 
 @mcp.tool("create_unit_tests")
-def create_unit_tests(code: str, language: str = "auto", test_framework: str = "auto") -> str:
-    """Create unit tests for the provided code"""
-    if language == "auto":
-        language = detect_language(code)
+async def create_unit_tests(code: str = "", language: str = "auto", test_framework: str = "auto", path: str = "", paths: Optional[List[str]] = None, start_line: int = 0, end_line: int = 0, use_cache: bool = True, ctx: Context = None) -> str:
+    """
+    Create unit tests for the provided code.
+    Instead of code, pass a workspace path (optionally with start_line/end_line) or a list of paths
+    (entries may be 'file:start-end') to load the source server-side.
+    """
+    try:
+        code, source, language = await load_input(code, path, paths, start_line, end_line, language)
+    except ValueError as e:
+        return f"Error creating unit tests: {str(e)}"
     
     if test_framework == "auto":
         framework_map = {
@@ -116,22 +394,24 @@ def create_unit_tests(code: str, language: str = "auto", test_framework: str = "
     5. Clear test names and documentation
     6. Proper test structure and assertions"""
     
-    prompt = f"""Create unit tests for this {language} code using {test_framework}:
+    def make_prompt(snippet: str) -> str:
+        return f"""Create unit tests for this {language} code using {test_framework}:
 
     ```{language}
-    {code}
+    {snippet}
     ```
 
     Generate comprehensive test cases that cover various scenarios."""
     
     try:
-        tests = code_helper.generate_response(prompt, system_prompt)
-        return f"Unit Tests ({language} - {test_framework}):\n\n{tests}"
+        max_chars = chunk_limit(code, make_prompt, system_prompt)
+        tests = await map_join(ctx, "create_unit_tests", code, language, make_prompt, system_prompt, use_cache, max_chars)
+        return f"Unit Tests ({language} - {test_framework}){source_note(source)}:\n\n{tests}"
     except Exception as e:
         return f"Error creating unit tests: {str(e)}"
 
 @mcp.tool("create_boilerplate")
-def create_boilerplate(project_type: str, language: str, features: str = "") -> str:
+async def create_boilerplate(project_type: str, language: str, features: str = "", use_cache: bool = True, ctx: Context = None) -> str:
     """Create boilerplate code for different project types"""
     system_prompt = f"""You are a project template expert. Create clean, well-structured boilerplate code for {project_type} projects in {language}. Include:
     1. Proper project structure
@@ -154,16 +434,22 @@ def create_boilerplate(project_type: str, language: str, features: str = "") ->
     Make it production-ready and follow best practices."""
     
     try:
-        boilerplate = code_helper.generate_response(prompt, system_prompt)
+        boilerplate = await generate(ctx, "create_boilerplate", prompt, system_prompt, use_cache)
         return f"Boilerplate Code ({project_type} - {language}):\n\n{boilerplate}"
     except Exception as e:
         return f"Error creating boilerplate: {str(e)}"
 
 @mcp.tool("code_review")
-def code_review(code: str, language: str = "auto") -> str:
-    """Perform a code review and provide suggestions"""
-    if language == "auto":
-        language = detect_language(code)
+async def code_review(code: str = "", language: str = "auto", path: str = "", paths: Optional[List[str]] = None, start_line: int = 0, end_line: int = 0, use_cache: bool = True, ctx: Context = None) -> str:
+    """
+    Perform a code review and provide suggestions.
+    Instead of code, pass a workspace path (optionally with start_line/end_line) or a list of paths
+    (entries may be 'file:start-end') to load the source server-side.
+    """
+    try:
+        code, source, language = await load_input(code, path, paths, start_line, end_line, language)
+    except ValueError as e:
+        return f"Error reviewing code: {str(e)}"
     
     system_prompt = f"""You are a senior code reviewer. Analyze the provided {language} code and provide:
     1. Code quality assessment
@@ -174,25 +460,36 @@ def code_review(code: str, language: str = "auto") -> str:
     6. Maintainability improvements
     Be constructive and specific in your feedback."""
     
-    prompt = f"""Please review this {language} code and provide detailed feedback:
+    def make_prompt(snippet: str) -> str:
+        return f"""Please review this {language} code and provide detailed feedback:
 
     ```{language}
-    {code}
+    {snippet}
     ```
 
     Focus on code quality, performance, security, and maintainability."""
     
     try:
-        review = code_helper.generate_response(prompt, system_prompt)
-        return f"Code Review ({language}):\n\n{review}"
+        max_chars = chunk_limit(code, make_prompt, system_prompt)
+        if len(code) > max_chars:
+            review = await map_reduce(ctx, "code_review", code, language, make_prompt, system_prompt, "code review", use_cache, max_chars)
+        else:
+            review = await generate(ctx, "code_review", make_prompt(code), system_prompt, use_cache)
+        return f"Code Review ({language}){source_note(source)}:\n\n{review}"
     except Exception as e:
         return f"Error reviewing code: {str(e)}"
 
 @mcp.tool("optimize_code")
-def optimize_code(code: str, optimization_type: str = "performance", language: str = "auto") -> str:
-    """Optimize code for performance, readability, or memory usage"""
-    if language == "auto":
-        language = detect_language(code)
+async def optimize_code(code: str = "", optimization_type: str = "performance", language: str = "auto", path: str = "", paths: Optional[List[str]] = None, start_line: int = 0, end_line: int = 0, use_cache: bool = True, ctx: Context = None) -> str:
+    """
+    Optimize code for performance, readability, or memory usage.
+    Instead of code, pass a workspace path (optionally with start_line/end_line) or a list of paths
+    (entries may be 'file:start-end') to load the source server-side.
+    """
+    try:
+        code, source, language = await load_input(code, path, paths, start_line, end_line, language)
+    except ValueError as e:
+        return f"Error optimizing code: {str(e)}"
     
     system_prompt = f"""You are a code optimization expert. Optimize the provided {language} code for {optimization_type}. Provide:
     1. The optimized version of the code
@@ -201,23 +498,36 @@ def optimize_code(code: str, optimization_type: str = "performance", language: s
     4. Any trade-offs made
     5. Benchmarking suggestions if applicable"""
         
-    prompt = f"""Optimize this {language} code for {optimization_type}:
+    def make_prompt(snippet: str) -> str:
+        return f"""Optimize this {language} code for {optimization_type}:
 
     ```{language}
-    {code}
+    {snippet}
     ```
 
     Provide the optimized version with detailed explanations of improvements."""
     
     try:
-        optimization = code_helper.generate_response(prompt, system_prompt)
-        return f"Code Optimization ({language} - {optimization_type}):\n\n{optimization}"
+        max_chars = chunk_limit(code, make_prompt, system_prompt)
+        optimization = await map_join(ctx, "optimize_code", code, language, make_prompt, system_prompt, use_cache, max_chars)
+        return f"Code Optimization ({language} - {optimization_type}){source_note(source)}:\n\n{optimization}"
     except Exception as e:
         return f"Error optimizing code: {str(e)}"
 
 @mcp.tool("convert_code")
-def convert_code(code: str, source_language: str, target_language: str) -> str:
-    """Convert code from one programming language to another"""
+async def convert_code(code: str = "", source_language: str = "auto", target_language: str = "", path: str = "", paths: Optional[List[str]] = None, start_line: int = 0, end_line: int = 0, use_cache: bool = True, ctx: Context = None) -> str:
+    """
+    Convert code from one programming language to another.
+    Instead of code, pass a workspace path (optionally with start_line/end_line) or a list of paths
+    (entries may be 'file:start-end') to load the source server-side.
+    """
+    try:
+        code, source, source_language = await load_input(code, path, paths, start_line, end_line, source_language)
+    except ValueError as e:
+        return f"Error converting code: {str(e)}"
+    if not target_language:
+        return "Error converting code: target_language is required."
+
     system_prompt = f"""You are a code conversion expert. Convert code from {source_language} to {target_language}. Ensure:
     1. Functionality remains exactly the same
     2. Follow {target_language} best practices and idioms
@@ -225,25 +535,33 @@ def convert_code(code: str, source_language: str, target_language: str) -> str:
     4. Maintain code structure and readability
     5. Add comments explaining any language-specific changes"""
     
-    prompt = f"""Convert this {source_language} code to {target_language}:
+    def make_prompt(snippet: str) -> str:
+        return f"""Convert this {source_language} code to {target_language}:
 
     ```{source_language}
-    {code}
+    {snippet}
     ```
 
     Ensure the converted code maintains the same functionality and follows {target_language} best practices."""
         
     try:
-        conversion = code_helper.generate_response(prompt, system_prompt)
-        return f"Code Conversion ({source_language} → {target_language}):\n\n{conversion}"
+        max_chars = chunk_limit(code, make_prompt, system_prompt)
+        conversion = await map_join(ctx, "convert_code", code, source_language, make_prompt, system_prompt, use_cache, max_chars)
+        return f"Code Conversion ({source_language} → {target_language}){source_note(source)}:\n\n{conversion}"
     except Exception as e:
         return f"Error converting code: {str(e)}"
 
 @mcp.tool("generate_documentation")
-def generate_documentation(code: str, doc_type: str = "api", language: str = "auto") -> str:
-    """Generate documentation for code"""
-    if language == "auto":
-        language = detect_language(code)
+async def generate_documentation(code: str = "", doc_type: str = "api", language: str = "auto", path: str = "", paths: Optional[List[str]] = None, start_line: int = 0, end_line: int = 0, use_cache: bool = True, ctx: Context = None) -> str:
+    """
+    Generate documentation for code.
+    Instead of code, pass a workspace path (optionally with start_line/end_line) or a list of paths
+    (entries may be 'file:start-end') to load the source server-side.
+    """
+    try:
+        code, source, language = await load_input(code, path, paths, start_line, end_line, language)
+    except ValueError as e:
+        return f"Error generating documentation: {str(e)}"
     
     system_prompt = f"""You are a documentation expert. Generate {doc_type} documentation for the provided {language} code. Include:
     1. Clear descriptions of functionality
@@ -253,20 +571,113 @@ def generate_documentation(code: str, doc_type: str = "api", language: str = "au
     5. Performance considerations where relevant
     Use appropriate documentation format for {language}."""
     
-    prompt = f"""Generate {doc_type} documentation for this {language} code:
+    def make_prompt(snippet: str) -> str:
+        return f"""Generate {doc_type} documentation for this {language} code:
 
     ```{language}
-    {code}
+    {snippet}
     ```
 
     Create comprehensive documentation suitable for developers."""
     
     try:
-        documentation = code_helper.generate_response(prompt, system_prompt)
-        return f"Documentation ({language} - {doc_type}):\n\n{documentation}"
+        max_chars = chunk_limit(code, make_prompt, system_prompt)
+        if len(code) > max_chars:
+            documentation = await map_reduce(
+                ctx, "generate_documentation", code, language, make_prompt, system_prompt, f"{doc_type} documentation",
+                use_cache, max_chars,
+            )
+        else:
+            documentation = await generate(ctx, "generate_documentation", make_prompt(code), system_prompt, use_cache)
+        return f"Documentation ({language} - {doc_type}){source_note(source)}:\n\n{documentation}"
     except Exception as e:
         return f"Error generating documentation: {str(e)}"
 
+async def run_batch_tool(
+    ctx: Optional[Context],
+    tool: str,
+    tool_fn,
+    pattern: str,
+    paths: Optional[List[str]],
+    output_dir: str,
+    resume: bool,
+    use_cache: bool,
+    params: dict,
+) -> str:
+    """
+    Shared driver of the batch_* tools: run tool_fn(path=...) on every selected
+    file with as many files in flight as the provider allows, write each output
+    to disk and keep a resumable manifest. Per-file results are streamed as
+    progress notifications.
+    """
+    try:
+        out_dir = resolve_workspace_path(output_dir or f"{BATCH_OUTPUT_DIR}/{tool}")
+        files = await asyncio.to_thread(select_files, pattern, paths, out_dir)
+    except ValueError as e:
+        return f"Error running batch {tool}: {str(e)}"
+    manifest = BatchManifest(out_dir / MANIFEST_NAME, tool, params, resume)
+
+    async def process(relative: str):
+        result = await tool_fn(path=relative, use_cache=use_cache, ctx=None, **params)
+        return not result.startswith("Error "), result
+
+    async def _report(done: int, total: int, message: str) -> None:
+        await ctx.report_progress(done, total, message + "\n")
+
+    report = _report if wants_progress(ctx) else None
+    results = await run_batch(files, out_dir, manifest, code_helper.max_concurrency, process, report)
+    counts = Counter(result["status"] for result in results)
+    lines = [
+        f"Batch {tool} over {len(results)} files: " + ", ".join(f"{count} {status}" for status, count in sorted(counts.items())),
+        f"Outputs in {relative_label(out_dir)}/, progress manifest {relative_label(manifest.path)}",
+    ]
+    for result in results:
+        detail = result.get("error") if result["status"] == "error" else result.get("output")
+        lines.append(f"- {result['path']}: {result['status']} -> {detail}")
+    return "\n".join(lines)
+
+@mcp.tool("batch_code_review")
+async def batch_code_review(pattern: str = "", paths: Optional[List[str]] = None, language: str = "auto", output_dir: str = "", resume: bool = True, use_cache: bool = True, ctx: Context = None) -> str:
+    """
+    Review many workspace files, selected by a glob pattern (e.g. 'src/**/*.py') or a list of paths.
+    Each review is written to <output_dir>/<path>.md (default .mcp_batch/code_review) and recorded in a
+    manifest there; with resume=true a rerun skips files that are already done and unchanged.
+    """
+    return await run_batch_tool(ctx, "code_review", code_review.fn, pattern, paths, output_dir, resume, use_cache, {"language": language})
+
+@mcp.tool("batch_generate_documentation")
+async def batch_generate_documentation(pattern: str = "", paths: Optional[List[str]] = None, doc_type: str = "api", language: str = "auto", output_dir: str = "", resume: bool = True, use_cache: bool = True, ctx: Context = None) -> str:
+    """
+    Generate documentation for many workspace files, one document per file.
+    File selection, output files and resuming work as in batch_code_review.
+    """
+    return await run_batch_tool(
+        ctx, "generate_documentation", generate_documentation.fn, pattern, paths, output_dir, resume, use_cache,
+        {"doc_type": doc_type, "language": language},
+    )
+
+@mcp.tool("batch_create_unit_tests")
+async def batch_create_unit_tests(pattern: str = "", paths: Optional[List[str]] = None, language: str = "auto", test_framework: str = "auto", output_dir: str = "", resume: bool = True, use_cache: bool = True, ctx: Context = None) -> str:
+    """
+    Create unit tests for many workspace files, one test suite per file.
+    File selection, output files and resuming work as in batch_code_review.
+    """
+    return await run_batch_tool(
+        ctx, "create_unit_tests", create_unit_tests.fn, pattern, paths, output_dir, resume, use_cache,
+        {"language": language, "test_framework": test_framework},
+    )
+
+@mcp.tool("batch_convert_code")
+async def batch_convert_code(target_language: str, pattern: str = "", paths: Optional[List[str]] = None, source_language: str = "auto", output_dir: str = "", resume: bool = True, use_cache: bool = True, ctx: Context = None) -> str:
+    """
+    Convert many workspace files to another language, one conversion per file.
+    File selection, output files and resuming work as in batch_code_review.
+    """
+    return await run_batch_tool(
+        ctx, "convert_code", convert_code.fn, pattern, paths, output_dir, resume, use_cache,
+        {"source_language": source_language, "target_language": target_language},
+    )
+
 transport = SseServerTransport("/mcp-messages/")
 
 
@@ -289,15 +700,36 @@ async def handle_sse_handshake(request):
     finally:
         return Response(status_code=200, content="SSE connection closed.")
 
+async def handle_ready(request):
+    """Readiness probe: 200 once the model is loaded and requests will not pay a cold start"""
+    readiness = await code_helper.readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+async def handle_metrics(request):
+    """Expose server-side runtime statistics"""
+    return JSONResponse({
+        "llm": code_helper.stats(),
+        "response_cache": response_cache.stats() if response_cache else None,
+    })
+
 sse_app = Starlette(
     routes=[
         Route("/mcp-sse", handle_sse_handshake, methods=["GET"]),
+        Route("/metrics", handle_metrics, methods=["GET"]),
+        Route("/ready", handle_ready, methods=["GET"]),
         
         Mount("/mcp-messages/", app=transport.handle_post_message)
     ]
 )
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    if os.getenv("LLM_WARMUP_ENABLED", "true").lower() == "true":
+        code_helper.start_warmup()
+    yield
+    await code_helper.aclose()
+
+app = FastAPI(lifespan=lifespan)
 app.mount("/", sse_app)
 
 if __name__ == "__main__":
@@ -311,5 +743,6 @@ if __name__ == "__main__":
     print("- optimize_code: Optimize code performance/readability")
     print("- convert_code: Convert between programming languages")
     print("- generate_documentation: Create code documentation")
+    print("- batch_code_review / batch_generate_documentation / batch_create_unit_tests / batch_convert_code: Run over many workspace files")
     # mcp.run(transport="streamable-http", host="0.0.0.0", port=8765)
     uvicorn.run(app, host="0.0.0.0", port=8765)
@@ -0,0 +1,105 @@
+import os
+import re
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from file_agent.file_transfer import detect_encoding
+
+WORKSPACE_DIR = Path(os.getenv("MCP_WORKSPACE_DIR", "/workspace")).resolve()
+# Upper bound on the source loaded for one tool call; larger inputs belong in batch tools.
+MAX_SOURCE_BYTES = int(os.getenv("CODE_MAX_SOURCE_BYTES", str(2 * 1024 * 1024)))
+
+EXTENSION_LANGUAGES = {
+    ".py": "python", ".pyi": "python",
+    ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript", ".cjs": "javascript",
+    ".ts": "typescript", ".tsx": "typescript",
+    ".java": "java",
+    ".c": "c++", ".h": "c++", ".cc": "c++", ".cpp": "c++", ".cxx": "c++", ".hpp": "c++",
+    ".rs": "rust",
+    ".go": "go",
+}
+# "src/app.py:10-40" selects lines 10 to 40 (1-based, inclusive) of a file.
+_RANGE_SUFFIX = re.compile(r"^(.*):(\d+)-(\d+)$")
+
+
+def resolve_workspace_path(path: str) -> Path:
+    """Resolve a workspace-relative (or absolute) path, refusing anything outside the workspace"""
+    target = Path(path)
+    if not target.is_absolute():
+        target = WORKSPACE_DIR / target
+    resolved = target.resolve()
+    if resolved != WORKSPACE_DIR and WORKSPACE_DIR not in resolved.parents:
+        raise ValueError(f"Path outside allowed directory: {path}")
+    return resolved
+
+
+def relative_label(path: Path) -> str:
+    return str(path.relative_to(WORKSPACE_DIR))
+
+
+def language_for_path(path: str) -> Optional[str]:
+    return EXTENSION_LANGUAGES.get(Path(path).suffix.lower())
+
+
+def read_source(path: str, start_line: int = 0, end_line: int = 0) -> Tuple[str, str]:
+    """
+    Return (text, label) of a workspace text file, optionally restricted to
+    lines start_line..end_line (1-based, inclusive; 0 means open-ended).
+    """
+    match = _RANGE_SUFFIX.match(path)
+    if match and not start_line and not end_line:
+        path, start_line, end_line = match.group(1), int(match.group(2)), int(match.group(3))
+
+    file_path = resolve_workspace_path(path)
+    if not file_path.is_file():
+        raise ValueError(f"File not found in workspace: {path}")
+    if file_path.stat().st_size > MAX_SOURCE_BYTES:
+        raise ValueError(f"File too large ({file_path.stat().st_size} bytes, limit {MAX_SOURCE_BYTES}): {path}")
+    raw = file_path.read_bytes()
+    encoding = detect_encoding(raw)
+    if encoding is None:
+        raise ValueError(f"Binary file: {path}")
+    text = raw.decode(encoding)
+
+    label = relative_label(file_path)
+    if start_line or end_line:
+        lines = text.splitlines()
+        first = max(start_line, 1)
+        last = min(end_line, len(lines)) if end_line else len(lines)
+        if first > last:
+            raise ValueError(f"Empty line range {start_line}-{end_line} in {path} ({len(lines)} lines)")
+        text = "\n".join(lines[first - 1:last])
+        label += f":{first}-{last}"
+    return text, label
+
+
+def load_sources(path: str = "", paths: Optional[List[str]] = None, start_line: int = 0, end_line: int = 0) -> Tuple[str, str, Optional[str]]:
+    """
+    Load the code named by path (with an optional line range) or by paths
+    (each entry may carry a ":start-end" suffix). Several files are
+    concatenated under "=== File: <path> ===" headers.
+    Returns (code, label, language guessed from the file extensions).
+    """
+    if path and paths:
+        raise ValueError("Pass either path or paths, not both.")
+    if paths and (start_line or end_line):
+        raise ValueError("start_line/end_line apply to a single path; use 'file:start-end' entries in paths.")
+
+    if path:
+        text, label = read_source(path, start_line, end_line)
+        return text, label, language_for_path(label.split(":")[0])
+
+    sections, labels, total = [], [], 0
+    for entry in paths or []:
+        text, label = read_source(entry)
+        total += len(text)
+        if total > MAX_SOURCE_BYTES:
+            raise ValueError(f"Selected files exceed {MAX_SOURCE_BYTES} bytes; narrow the selection.")
+        sections.append(f"=== File: {label} ===\n{text}")
+        labels.append(label)
+    if not sections:
+        raise ValueError("No files selected.")
+
+    languages = {language_for_path(label.split(":")[0]) for label in labels}
+    language = languages.pop() if len(languages) == 1 else None
+    return "\n\n".join(sections), ", ".join(labels), language
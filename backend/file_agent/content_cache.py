@@ -0,0 +1,113 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from file_agent.file_transfer import BinaryFileError, detect_encoding, SNIFF_BYTES
+
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Budget charged for remembering that a file is binary.
+BINARY_ENTRY_BYTES = 64
+
+
+class ContentCache:
+    """
+    Byte-bounded LRU cache of decoded file contents.
+
+    Entries are validated against (st_mtime_ns, st_size, st_ino) on every
+    lookup, so edits made outside the server are picked up with a single
+    stat() instead of an open() + read() + decode. Binary files are
+    remembered as such, without their content.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_MAX_BYTES, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 4
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int, int], Optional[str], int, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _signature(st: os.stat_result) -> Tuple[int, int, int]:
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def read_text(self, path: Path) -> Tuple[str, str]:
+        """
+        Return (decoded content, detected encoding) of path, served from cache
+        when still valid. Raises BinaryFileError for files that are not text.
+        """
+        key = str(path)
+        signature = self._signature(os.stat(key))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                if entry[3] is None:
+                    raise BinaryFileError(f"Binary file: {path}")
+                return entry[1], entry[3]
+            self.misses += 1
+
+        with open(key, "rb") as f:
+            raw = f.read(SNIFF_BYTES)
+            # Most binaries are recognised from their first bytes; skip reading the rest.
+            if detect_encoding(raw, truncated=True) is not None:
+                raw += f.read()
+        encoding = detect_encoding(raw)
+        content = raw.decode(encoding) if encoding else None
+
+        # Only cache when the file did not change while we were reading it.
+        if self._signature(os.stat(key)) == signature:
+            self._store(key, signature, content, encoding)
+        if encoding is None:
+            raise BinaryFileError(f"Binary file: {path}")
+        return content, encoding
+
+    def _store(self, key: str, signature: Tuple[int, int, int], content: Optional[str], encoding: Optional[str]) -> None:
+        size = signature[1] if encoding else BINARY_ENTRY_BYTES
+        with self._lock:
+            self._drop(key)
+            if size > self.max_entry_bytes:
+                return
+            self._entries[key] = (signature, content, size, encoding)
+            self._current_bytes += size
+            while self._current_bytes > self.max_bytes and self._entries:
+                _, (_, _, evicted_size, _) = self._entries.popitem(last=False)
+                self._current_bytes -= evicted_size
+                self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._current_bytes -= entry[2]
+
+    def invalidate(self, path: Path) -> None:
+        """Forget a single cached file"""
+        with self._lock:
+            self._drop(str(path))
+
+    def invalidate_tree(self, path: Path) -> None:
+        """Forget a path and everything cached below it"""
+        key = str(path)
+        prefix = key.rstrip(os.sep) + os.sep
+        with self._lock:
+            for cached in [k for k in self._entries if k == key or k.startswith(prefix)]:
+                self._drop(cached)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -1,21 +1,74 @@
 import os
+import sys
+import json
+import mimetypes
 import uvicorn
 import shutil
 
+from contextlib import asynccontextmanager
+from urllib.parse import unquote
+
 from fastmcp import FastMCP
 from fastapi import FastAPI
 from starlette.applications import Starlette
 from starlette.routing import Route, Mount
 from mcp.server.sse import SseServerTransport
+from mcp.server.lowlevel import NotificationOptions
+from mcp.types import Resource as MCPResource
+from pydantic import AnyUrl
 from pathlib import Path
-from starlette.responses import Response
+from starlette.responses import Response, JSONResponse
 # from mcp.server.fastmcp import FastMCP
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from file_agent.content_cache import ContentCache, DEFAULT_CACHE_MAX_BYTES
+from file_agent.io_pool import BlockingIOPool, DEFAULT_IO_WORKERS
+from file_agent.workspace_watcher import WorkspaceWatcher, ResourceSubscriptions, RESOURCE_SCHEME, path_to_uri
+from file_agent.workspace_fingerprint import WorkspaceFingerprinter
+from file_agent.file_transfer import (
+    BinaryFileError, DEFAULT_CHUNK_SIZE, file_metadata, read_chunk, write_chunk, partial_path
+)
 
 mcp = FastMCP("Filesystem Server")
 
 ALLOWED_BASE_DIR = Path(os.getenv("MCP_WORKSPACE_DIR", "/workspace")).resolve()
 ALLOWED_BASE_DIR.mkdir(parents=True, exist_ok=True)
 
+content_cache = ContentCache(max_bytes=int(os.getenv("FILE_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES)))
+
+# Per-tool concurrency limits on the blocking I/O pool. Tree-wide operations get
+# a small share each, and together at most FILE_IO_SLOW_WORKERS (default: half
+# the pool), so they can never starve cheap reads from other sessions.
+TOOL_CONCURRENCY = {
+    "read_file": 16,
+    "read_file_chunk": 8,
+    "write_file_chunk": 4,
+    "get_file_info": 16,
+    "list_directory": 8,
+    "write_file": 8,
+    "create_directory": 8,
+    "delete_file": 8,
+    "move_file": 4,
+    "delete_directory": 2,
+    "workspace_fingerprint": 2,
+}
+io_pool = BlockingIOPool(
+    max_workers=int(os.getenv("FILE_IO_WORKERS", DEFAULT_IO_WORKERS)),
+    tool_limits=TOOL_CONCURRENCY,
+    slow_tools=("move_file", "delete_directory", "workspace_fingerprint"),
+    slow_limit=int(os.getenv("FILE_IO_SLOW_WORKERS", "0")) or None,
+)
+
+WATCH_ENABLED = os.getenv("FILE_WATCH_ENABLED", "true").lower() == "true"
+RESOURCE_LIST_LIMIT = int(os.getenv("FILE_RESOURCE_LIST_LIMIT", "1000"))
+workspace_watcher = WorkspaceWatcher(ALLOWED_BASE_DIR)
+subscriptions = ResourceSubscriptions(ALLOWED_BASE_DIR)
+
+FINGERPRINT_DB = Path(os.getenv(
+    "FILE_FINGERPRINT_DB", str(Path.home() / ".cache" / "mcp_file_server" / "fingerprints.sqlite")
+))
+fingerprinter = WorkspaceFingerprinter(ALLOWED_BASE_DIR, FINGERPRINT_DB)
+MAX_REPORTED_CHANGES = 200
+
 def validate_path(path: str) -> Path:
     """Validate and resolve path within allowed directory"""
     try:
@@ -33,50 +86,115 @@ def validate_path(path: str) -> Path:
     except Exception as e:
         raise ValueError(f"Invalid path: {path} - {str(e)}")
 
+def describe_file(file_path: Path, binary: bool = False) -> str:
+    """Format file metadata and content hash instead of the content itself"""
+    metadata = file_metadata(file_path)
+    header = "binary, content not returned" if binary else "content not returned"
+    result = f"Metadata of {file_path} ({header}):\n"
+    for key in ("size", "mime", "encoding", "sha256"):
+        result += f"  {key}: {metadata[key]}\n"
+    if binary:
+        result += "Use read_file_chunk to transfer the bytes.\n"
+    return result
+
 @mcp.tool("read_file")
-def read_file(path: str) -> str:
+@io_pool.offload("read_file")
+def read_file(path: str, metadata_only: bool = False) -> str:
     """
-    Read the content of a file by name or relative path from the workspace.
+    Read the content of a text file by name or relative path from the workspace.
     If only the file name is given, it searches recursively under the workspace.
+    Binary files, or any file when metadata_only is true, return only size, type
+    and sha256; use read_file_chunk to transfer binary content.
     """
     try:
+        selected = None
         try:
             file_path = validate_path(path)
             if file_path.exists() and file_path.is_file():
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return f"File content of {file_path}:\n{f.read()}"
+                selected = file_path
         except Exception:
             pass 
 
-        matches = list(ALLOWED_BASE_DIR.rglob(path))
-        if not matches:
-            return f"Error: File named '{path}' not found in workspace."
+        if selected is None:
+            matches = list(ALLOWED_BASE_DIR.rglob(path))
+            if not matches:
+                return f"Error: File named '{path}' not found in workspace."
+            selected = matches[0]
+
+        if metadata_only:
+            return describe_file(selected)
+        try:
+            content, encoding = content_cache.read_text(selected)
+        except BinaryFileError:
+            return describe_file(selected, binary=True)
 
-        selected = matches[0]
-        with open(selected, 'r', encoding='utf-8') as f:
-            return f"File content of {selected}:\n{f.read()}"
+        encoding_note = "" if encoding == "utf-8" else f" (decoded as {encoding})"
+        return f"File content of {selected}{encoding_note}:\n{content}"
     except Exception as e:
         return f"Error reading file '{path}': {str(e)}"
 
 
 @mcp.tool("write_file")
-def write_file(path: str, content: str) -> str:
-    """Write content to a file"""
+@io_pool.offload("write_file")
+def write_file(path: str, content: str, encoding: str = "utf-8") -> str:
+    """Write text content to a file, utf-8 encoded unless another encoding is given"""
     try:
         file_path = validate_path(path)
         
         # Create parent directories if they don't exist
         file_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(file_path, 'w', encoding='utf-8') as f:
+        with open(file_path, 'w', encoding=encoding) as f:
             f.write(content)
+        content_cache.invalidate(file_path)
+        fingerprinter.mark_changed([file_path])
         
         return f"Successfully wrote {len(content)} characters to {path}"
     except Exception as e:
         return f"Error writing file {path}: {str(e)}"
     
 
+@mcp.tool("read_file_chunk")
+@io_pool.offload("read_file_chunk")
+def read_file_chunk(path: str, offset: int = 0, length: int = DEFAULT_CHUNK_SIZE) -> str:
+    """
+    Read a byte range of any file (text or binary) as base64 for chunked, resumable transfers.
+    Returns JSON with data, next_offset, eof, chunk_sha256 and, on the last chunk, the file sha256.
+    """
+    try:
+        file_path = validate_path(path)
+
+        if not file_path.is_file():
+            return f"Error: File not found: {path}"
+        if offset < 0:
+            return f"Error: Offset must not be negative: {offset}"
+
+        return json.dumps(read_chunk(file_path, offset, length))
+    except Exception as e:
+        return f"Error reading chunk of {path}: {str(e)}"
+
+@mcp.tool("write_file_chunk")
+@io_pool.offload("write_file_chunk")
+def write_file_chunk(path: str, data: str, offset: int = 0, final: bool = False, sha256: str = "") -> str:
+    """
+    Write a base64 chunk of a (binary) file at offset. Chunks are staged in <path>.part; an
+    unexpected offset is rejected with the offset to resume from. With final=true the optional
+    sha256 of the whole file is verified and the file is moved into place. Returns JSON.
+    """
+    try:
+        file_path = validate_path(path)
+        validate_path(str(partial_path(file_path)))
+
+        result = write_chunk(file_path, data, offset, final, sha256)
+        if result.get("complete"):
+            content_cache.invalidate(file_path)
+            fingerprinter.mark_changed([file_path])
+        return json.dumps(result)
+    except Exception as e:
+        return f"Error writing chunk of {path}: {str(e)}"
+
 @mcp.tool("list_directory")
+@io_pool.offload("list_directory")
 def list_directory(path: str = ".") -> str:
     """List files and directories in a directory"""
     try:
@@ -107,16 +225,19 @@ def list_directory(path: str = ".") -> str:
         return f"Error listing directory {path}: {str(e)}"
 
 @mcp.tool("create_directory")
+@io_pool.offload("create_directory")
 def create_directory(path: str) -> str:
     """Create a new directory"""
     try:
         dir_path = validate_path(path)
         dir_path.mkdir(parents=True, exist_ok=True)
+        fingerprinter.mark_changed([dir_path])
         return f"Successfully created directory: {path}"
     except Exception as e:
         return f"Error creating directory {path}: {str(e)}"
 
 @mcp.tool("delete_file")
+@io_pool.offload("delete_file")
 def delete_file(path: str) -> str:
     """Delete a file"""
     try:
@@ -127,6 +248,8 @@ def delete_file(path: str) -> str:
         
         if file_path.is_file():
             file_path.unlink()
+            content_cache.invalidate(file_path)
+            fingerprinter.mark_changed([file_path])
             return f"Successfully deleted file: {path}"
         elif file_path.is_dir():
             return f"Error: Path is a directory, use delete_directory instead: {path}"
@@ -136,6 +259,7 @@ def delete_file(path: str) -> str:
         return f"Error deleting file {path}: {str(e)}"
 
 @mcp.tool("delete_directory")
+@io_pool.offload("delete_directory")
 def delete_directory(path: str) -> str:
     """Delete a directory and all its contents"""
     try:
@@ -148,11 +272,14 @@ def delete_directory(path: str) -> str:
             return f"Error: Path is not a directory: {path}"
         
         shutil.rmtree(dir_path)
+        content_cache.invalidate_tree(dir_path)
+        fingerprinter.mark_changed([dir_path])
         return f"Successfully deleted directory: {path}"
     except Exception as e:
         return f"Error deleting directory {path}: {str(e)}"
 
 @mcp.tool("move_file")
+@io_pool.offload("move_file")
 def move_file(source: str, destination: str) -> str:
     """Move a file to directory"""
     try:
@@ -166,11 +293,15 @@ def move_file(source: str, destination: str) -> str:
         dest_path.parent.mkdir(parents=True, exist_ok=True)
         
         shutil.move(str(source_path), str(dest_path))
+        content_cache.invalidate_tree(source_path)
+        content_cache.invalidate_tree(dest_path)
+        fingerprinter.mark_changed([source_path, dest_path])
         return f"Successfully moved {source} to {destination}"
     except Exception as e:
         return f"Error moving {source} to {destination}: {str(e)}"
 
 @mcp.tool("get_file_info")
+@io_pool.offload("get_file_info")
 def get_file_info(path: str) -> str:
     """Get detailed information about a file or directory"""
     try:
@@ -197,6 +328,98 @@ def get_file_info(path: str) -> str:
     except Exception as e:
         return f"Error getting info for {path}: {str(e)}"
 
+@mcp.tool("workspace_fingerprint")
+@io_pool.offload("workspace_fingerprint")
+def workspace_fingerprint(path: str = ".", previous_hash: str = "") -> str:
+    """
+    Get a content hash (Merkle root) of a file or directory tree.
+    The same hash means nothing under the path changed. Pass the hash from an
+    earlier call as previous_hash to list the paths changed since then.
+    """
+    try:
+        target_path = validate_path(path)
+
+        if not target_path.exists():
+            return f"Error: Path not found: {path}"
+
+        root_hash, entries = fingerprinter.fingerprint(target_path)
+        result = f"Fingerprint of {path}: {root_hash} ({len(entries)} files)\n"
+
+        if not previous_hash:
+            return result
+        if previous_hash == root_hash:
+            return result + "Unchanged since previous fingerprint."
+
+        changes = fingerprinter.changes_since(target_path, previous_hash, entries)
+        if changes is None:
+            return result + f"Previous fingerprint {previous_hash} is unknown; treat everything as changed."
+
+        result += f"Changes since {previous_hash} ({len(changes)}):\n"
+        for kind, changed_path in changes[:MAX_REPORTED_CHANGES]:
+            result += f"  {kind:9} {changed_path}\n"
+        if len(changes) > MAX_REPORTED_CHANGES:
+            result += f"  ... and {len(changes) - MAX_REPORTED_CHANGES} more\n"
+        return result
+    except Exception as e:
+        return f"Error fingerprinting {path}: {str(e)}"
+
+# --- Workspace resources and change notifications ---
+
+@mcp.resource(f"{RESOURCE_SCHEME}:///{{path*}}", name="workspace_file", description="A text file in the shared workspace")
+async def workspace_file(path: str) -> str | bytes:
+    """Read a workspace file exposed as an MCP resource"""
+    file_path = validate_path(unquote(path))
+    try:
+        content, _ = await io_pool.run("read_file", content_cache.read_text, file_path)
+        return content
+    except BinaryFileError:
+        return await io_pool.run("read_file", file_path.read_bytes)
+
+def list_workspace_files() -> list[MCPResource]:
+    """Enumerate workspace files as resources, skipping hidden directories such as .git"""
+    resources = []
+    for dirpath, dirnames, filenames in os.walk(ALLOWED_BASE_DIR):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for name in sorted(filenames):
+            file_path = Path(dirpath) / name
+            resources.append(MCPResource(
+                uri=AnyUrl(path_to_uri(ALLOWED_BASE_DIR, file_path)),
+                name=file_path.relative_to(ALLOWED_BASE_DIR).as_posix(),
+                mimeType=mimetypes.guess_type(name)[0] or "text/plain",
+            ))
+            if len(resources) >= RESOURCE_LIST_LIMIT:
+                return resources
+    return resources
+
+@mcp._mcp_server.list_resources()
+async def list_resources() -> list[MCPResource]:
+    subscriptions.track_session(mcp._mcp_server.request_context.session)
+    static_resources = await mcp._mcp_list_resources()
+    return static_resources + await io_pool.run("list_directory", list_workspace_files)
+
+@mcp._mcp_server.subscribe_resource()
+async def subscribe_resource(uri: AnyUrl) -> None:
+    subscriptions.subscribe(str(uri), mcp._mcp_server.request_context.session)
+
+@mcp._mcp_server.unsubscribe_resource()
+async def unsubscribe_resource(uri: AnyUrl) -> None:
+    subscriptions.unsubscribe(str(uri), mcp._mcp_server.request_context.session)
+
+async def invalidate_changed_files(changes) -> None:
+    """Drop cache entries for files changed by anyone sharing the workspace"""
+    for _, path in changes:
+        content_cache.invalidate_tree(path)
+    fingerprinter.mark_changed([path for _, path in changes])
+
+workspace_watcher.add_listener(invalidate_changed_files)
+workspace_watcher.add_listener(subscriptions.publish)
+
+def create_initialization_options():
+    """Advertise resource subscriptions and list_changed notifications"""
+    options = mcp._mcp_server.create_initialization_options(NotificationOptions(resources_changed=True))
+    options.capabilities.resources.subscribe = True
+    return options
+
 transport = SseServerTransport("/mcp-messages/")
 
 async def handle_sse_handshake(request):
@@ -211,26 +434,48 @@ async def handle_sse_handshake(request):
             await mcp._mcp_server.run(
                 in_stream,
                 out_stream,
-                mcp._mcp_server.create_initialization_options()
+                create_initialization_options()
             )
     except Exception as e:
         print(f"Error during SSE connection: {e}")
     finally:
         return Response(status_code=200, content="SSE connection closed.")
 
+async def handle_metrics(request):
+    """Expose server-side runtime statistics"""
+    return JSONResponse({
+        "content_cache": content_cache.stats(),
+        "io_pool": io_pool.stats(),
+        "watcher": workspace_watcher.stats(),
+        "subscriptions": subscriptions.stats(),
+        "fingerprint": fingerprinter.stats(),
+    })
+
 sse_app = Starlette(
     routes=[
         Route("/mcp-sse", handle_sse_handshake, methods=["GET"]),
+        Route("/metrics", handle_metrics, methods=["GET"]),
         Mount("/mcp-messages/", app=transport.handle_post_message)
     ]
 )
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    if WATCH_ENABLED:
+        workspace_watcher.start()
+        # With the watcher running, unchanged scopes can be answered without rescanning.
+        fingerprinter.trust_watcher = True
+    yield
+    fingerprinter.trust_watcher = False
+    await workspace_watcher.stop()
+
+app = FastAPI(lifespan=lifespan)
 app.mount("/", sse_app)
 
 if __name__ == "__main__":
     print("\n=== MCP Filesystem Assistant ===")
     print(f"Allowed base directory: {ALLOWED_BASE_DIR}")
+    print(f"Content cache budget: {content_cache.max_bytes} bytes (stats at /metrics)")
     print("Ask me to help with file operations! Type 'quit' to exit.")
     print("Examples:")
     print("- 'Create a file called test.txt with hello world content'")
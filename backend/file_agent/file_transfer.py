@@ -0,0 +1,140 @@
+import base64
+import codecs
+import hashlib
+import mimetypes
+import os
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+SNIFF_BYTES = 8192
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+# Bytes that essentially never appear in text files (everything below 0x20 except \t \n \f \r and ESC).
+_BINARY_BYTES = bytes(set(range(32)) - {9, 10, 12, 13, 27}) + b"\x7f"
+
+
+class BinaryFileError(ValueError):
+    """Raised when text content is requested for a file that is not text"""
+
+
+def detect_encoding(raw: bytes, truncated: bool = False) -> Optional[str]:
+    """
+    Return the text encoding of raw, or None when it looks like binary data.
+    truncated marks raw as a prefix of the file, which may end mid-character.
+    """
+    for bom, encoding in _BOMS:
+        if raw.startswith(bom):
+            return encoding
+
+    sample = raw[:SNIFF_BYTES]
+    if b"\x00" in sample:
+        return None
+    try:
+        if truncated:
+            # Without final=True a multibyte character cut off at the end is buffered, not an error.
+            codecs.getincrementaldecoder("utf-8")().decode(raw)
+        else:
+            raw.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    if sample and len(sample.translate(None, _BINARY_BYTES)) < len(sample) * 0.9:
+        return None
+    # Not UTF-8 but text-like: latin-1 decodes any byte sequence losslessly.
+    return "latin-1"
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_metadata(path: Path) -> Dict[str, Any]:
+    """Describe a file without returning its content"""
+    st = path.stat()
+    with open(path, "rb") as f:
+        sample = f.read(SNIFF_BYTES)
+    encoding = detect_encoding(sample, truncated=len(sample) < st.st_size)
+    return {
+        "path": str(path),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "mime": mimetypes.guess_type(path.name)[0] or ("application/octet-stream" if encoding is None else "text/plain"),
+        "binary": encoding is None,
+        "encoding": encoding,
+        "sha256": file_sha256(path),
+    }
+
+
+def read_chunk(path: Path, offset: int, length: int) -> Dict[str, Any]:
+    """Read a byte range as base64; the whole-file checksum is added on the last chunk"""
+    length = max(1, min(length, MAX_CHUNK_SIZE))
+    st = path.stat()
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+    next_offset = offset + len(data)
+    result = {
+        "path": str(path),
+        "offset": offset,
+        "length": len(data),
+        "next_offset": next_offset,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "eof": next_offset >= st.st_size,
+        "chunk_sha256": hashlib.sha256(data).hexdigest(),
+        "data": base64.b64encode(data).decode("ascii"),
+    }
+    if result["eof"]:
+        result["sha256"] = file_sha256(path)
+    return result
+
+
+def partial_path(path: Path) -> Path:
+    return path.with_name(path.name + ".part")
+
+
+def write_chunk(path: Path, data: str, offset: int, final: bool, sha256: str = "") -> Dict[str, Any]:
+    """
+    Append a base64 chunk to <path>.part at offset. An offset that does not
+    match what was already received is rejected with the offset to resume
+    from. On the final chunk the checksum is verified and the partial file
+    atomically replaces path.
+    """
+    part = partial_path(path)
+    received = part.stat().st_size if part.exists() else 0
+    if offset != 0 and offset != received:
+        return {"path": str(path), "error": f"Offset {offset} does not match received bytes", "next_offset": received}
+
+    chunk = base64.b64decode(data, validate=True)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(part, "wb" if offset == 0 else "ab") as f:
+        f.write(chunk)
+    result = {
+        "path": str(path),
+        "next_offset": offset + len(chunk),
+        "chunk_sha256": hashlib.sha256(chunk).hexdigest(),
+        "complete": False,
+    }
+
+    if final:
+        digest = file_sha256(part)
+        if sha256 and sha256.lower() != digest:
+            result["error"] = f"Checksum mismatch: expected {sha256}, got {digest}"
+            return result
+        os.replace(part, path)
+        result["complete"] = True
+        result["sha256"] = digest
+    return result
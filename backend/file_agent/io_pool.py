@@ -0,0 +1,123 @@
+import asyncio
+import contextlib
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+DEFAULT_IO_WORKERS = 8
+DEFAULT_TOOL_CONCURRENCY = 4
+
+
+class BlockingIOPool:
+    """
+    Runs blocking filesystem work on a bounded thread pool so the SSE event
+    loop stays responsive. Every tool has its own concurrency limit, and the
+    slow tools (e.g. delete_directory on a huge tree) also share one combined
+    limit below the pool size, so a burst of them always leaves workers free
+    for cheap reads.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_IO_WORKERS,
+        tool_limits: Optional[Dict[str, int]] = None,
+        default_limit: int = DEFAULT_TOOL_CONCURRENCY,
+        slow_tools: Iterable[str] = (),
+        slow_limit: Optional[int] = None,
+    ):
+        self.max_workers = max_workers
+        self.tool_limits = dict(tool_limits or {})
+        self.default_limit = default_limit
+        self.slow_tools = frozenset(slow_tools)
+        # Half the pool by default; never all of it, unless the pool has a single worker.
+        self.slow_limit = max(1, min(slow_limit or max_workers // 2, max_workers - 1))
+        self._slow = asyncio.Semaphore(self.slow_limit)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="file-io")
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._tools: Dict[str, Dict[str, Any]] = {}
+
+    def _tool_stats(self, tool: str) -> Dict[str, Any]:
+        stats = self._tools.get(tool)
+        if stats is None:
+            stats = {"queued": 0, "running": 0, "completed": 0, "errors": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+            self._tools[tool] = stats
+        return stats
+
+    def _semaphore(self, tool: str) -> asyncio.Semaphore:
+        sem = self._semaphores.get(tool)
+        if sem is None:
+            sem = asyncio.Semaphore(self.tool_limits.get(tool, self.default_limit))
+            self._semaphores[tool] = sem
+        return sem
+
+    def _invoke(self, tool: str, token: Dict[str, Any], fn: Callable, args: tuple, kwargs: dict) -> Any:
+        with self._lock:
+            stats = self._tool_stats(tool)
+            if token["state"] == "queued":
+                self._queued -= 1
+                stats["queued"] -= 1
+            token["state"] = "running"
+            waited = time.monotonic() - token["enqueued_at"]
+            stats["running"] += 1
+            stats["wait_seconds_total"] += waited
+            stats["wait_seconds_max"] = max(stats["wait_seconds_max"], waited)
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                stats["running"] -= 1
+                stats["completed"] += 1
+
+    async def run(self, tool: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the pool under the limit of the given tool"""
+        token = {"state": "queued", "enqueued_at": time.monotonic()}
+        with self._lock:
+            self._queued += 1
+            self._tool_stats(tool)["queued"] += 1
+        try:
+            async with self._semaphore(tool), self._slow if tool in self.slow_tools else contextlib.nullcontext():
+                future = self._executor.submit(self._invoke, tool, token, fn, args, kwargs)
+                try:
+                    return await asyncio.wrap_future(future)
+                except asyncio.CancelledError:
+                    # A started job cannot be interrupted; keep its slot until it is done.
+                    if not future.cancelled():
+                        with contextlib.suppress(Exception):
+                            await asyncio.wrap_future(future)
+                    raise
+        finally:
+            with self._lock:
+                if token["state"] == "queued":
+                    token["state"] = "abandoned"
+                    self._queued -= 1
+                    self._tool_stats(tool)["queued"] -= 1
+
+    def offload(self, tool: str) -> Callable:
+        """Decorator turning a blocking tool function into an async one running on the pool"""
+        def decorator(fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                return await self.run(tool, fn, *args, **kwargs)
+            return wrapper
+        return decorator
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self._queued,
+                "running": sum(s["running"] for s in self._tools.values()),
+                "slow_tools": {"limit": self.slow_limit, "tools": sorted(self.slow_tools)},
+                "tools": {
+                    name: dict(s, limit=self.tool_limits.get(name, self.default_limit))
+                    for name, s in self._tools.items()
+                },
+            }
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from watchfiles import Change, DefaultFilter
+
+HASH_CHUNK_SIZE = 1024 * 1024
+MAX_SNAPSHOTS_PER_SCOPE = 10
+
+# Must match the watcher's filter, otherwise cached fingerprints could miss changes.
+_watch_filter = DefaultFilter()
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _hash_file(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class WorkspaceFingerprinter:
+    """
+    Maintains a persistent Merkle tree of content hashes over the workspace.
+
+    File digests are stored in SQLite together with the stat signature they
+    were computed from, so only files whose (st_mtime_ns, st_size, st_ino)
+    changed are re-read. Directory digests hash the sorted (name, digest)
+    pairs of their children. When a watcher feeds mark_changed(), an unchanged
+    scope is answered from memory without touching the disk at all.
+    """
+
+    def __init__(self, root: Path, db_path: Path):
+        self.root = root
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, ino INTEGER, digest TEXT
+            );
+            CREATE TABLE IF NOT EXISTS snapshots (
+                root_hash TEXT, scope TEXT, created_at REAL, entries TEXT,
+                PRIMARY KEY (scope, root_hash)
+            );
+        """)
+        self._lock = threading.Lock()
+        # Guards only the in-memory scope cache, so watcher callbacks never wait on a running scan.
+        self._cache_lock = threading.Lock()
+        self._generation = 0
+        self._scope_cache: Dict[str, Tuple[str, Dict[str, str]]] = {}
+        self.trust_watcher = False
+        self.files_hashed = 0
+        self.files_reused = 0
+        self.scope_cache_hits = 0
+
+    def _relative(self, path: Path) -> str:
+        relative = path.relative_to(self.root).as_posix()
+        return "" if relative == "." else relative
+
+    def mark_changed(self, paths: List[Path]) -> None:
+        """Drop cached scopes that contain, or are contained in, any of the changed paths"""
+        with self._cache_lock:
+            self._generation += 1
+            for path in paths:
+                try:
+                    changed = self._relative(path)
+                except ValueError:
+                    continue
+                for scope in list(self._scope_cache):
+                    if (scope == "" or changed == scope or changed.startswith(scope + "/")
+                            or scope.startswith(changed + "/")):
+                        del self._scope_cache[scope]
+
+    def _load_file_rows(self, scope: str) -> Dict[str, Tuple[int, int, int, str]]:
+        if scope:
+            rows = self._db.execute(
+                "SELECT path, mtime_ns, size, ino, digest FROM files WHERE path = ? OR (path >= ? AND path < ?)",
+                (scope, scope + "/", scope + "0"),
+            )
+        else:
+            rows = self._db.execute("SELECT path, mtime_ns, size, ino, digest FROM files")
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    def _hash_tree(self, directory: str, relative: str, known: Dict, seen: Dict, updates: List, entries: Dict[str, str]) -> str:
+        lines = []
+        with os.scandir(directory) as it:
+            children = sorted(it, key=lambda e: e.name)
+        for entry in children:
+            child_relative = f"{relative}/{entry.name}" if relative else entry.name
+            if not _watch_filter(Change.modified, entry.path):
+                continue
+            if entry.is_symlink():
+                digest = _digest(b"link:" + os.readlink(entry.path).encode())
+                lines.append(f"l {entry.name} {digest}")
+                entries[child_relative] = digest
+            elif entry.is_dir():
+                digest = self._hash_tree(entry.path, child_relative, known, seen, updates, entries)
+                lines.append(f"d {entry.name} {digest}")
+            elif entry.is_file():
+                st = entry.stat()
+                signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+                row = known.get(child_relative)
+                if row is not None and row[:3] == signature:
+                    digest = row[3]
+                    self.files_reused += 1
+                else:
+                    digest = _hash_file(entry.path)
+                    updates.append((child_relative, *signature, digest))
+                    self.files_hashed += 1
+                seen[child_relative] = True
+                lines.append(f"f {entry.name} {digest}")
+                entries[child_relative] = digest
+        return _digest("\n".join(lines).encode())
+
+    def fingerprint(self, path: Path) -> Tuple[str, Dict[str, str]]:
+        """Return (root hash, {relative file path: digest}) for a directory or file"""
+        scope = self._relative(path)
+        with self._cache_lock:
+            generation = self._generation
+            if self.trust_watcher and scope in self._scope_cache:
+                self.scope_cache_hits += 1
+                return self._scope_cache[scope]
+
+        with self._lock:
+            known = self._load_file_rows(scope)
+            seen: Dict[str, bool] = {}
+            updates: List = []
+            entries: Dict[str, str] = {}
+            if path.is_dir():
+                root_hash = self._hash_tree(str(path), scope, known, seen, updates, entries)
+            else:
+                st = path.stat()
+                row = known.get(scope)
+                if row is not None and row[:3] == (st.st_mtime_ns, st.st_size, st.st_ino):
+                    digest = row[3]
+                else:
+                    digest = _hash_file(str(path))
+                    updates.append((scope, st.st_mtime_ns, st.st_size, st.st_ino, digest))
+                seen[scope] = True
+                entries[scope] = digest
+                root_hash = digest
+
+            removed = [(p,) for p in known if p not in seen]
+            with self._db:
+                self._db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)", updates)
+                self._db.executemany("DELETE FROM files WHERE path = ?", removed)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?)",
+                    (root_hash, scope, time.time(), json.dumps(entries)),
+                )
+                self._db.execute(
+                    "DELETE FROM snapshots WHERE scope = ? AND root_hash NOT IN "
+                    "(SELECT root_hash FROM snapshots WHERE scope = ? ORDER BY created_at DESC LIMIT ?)",
+                    (scope, scope, MAX_SNAPSHOTS_PER_SCOPE),
+                )
+        with self._cache_lock:
+            # Anything reported while we were scanning may not be reflected in this result.
+            if generation == self._generation:
+                self._scope_cache[scope] = (root_hash, entries)
+        return root_hash, entries
+
+    def changes_since(self, path: Path, previous_hash: str, current: Dict[str, str]) -> Optional[List[Tuple[str, str]]]:
+        """List (kind, path) changes between a previous snapshot and the current entries, or None if unknown"""
+        scope = self._relative(path)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT entries FROM snapshots WHERE scope = ? AND root_hash = ?", (scope, previous_hash)
+            ).fetchone()
+        if row is None:
+            return None
+        previous = json.loads(row[0])
+        changes = []
+        for file_path in sorted(previous.keys() | current.keys()):
+            if file_path not in current:
+                changes.append(("deleted", file_path))
+            elif file_path not in previous:
+                changes.append(("added", file_path))
+            elif previous[file_path] != current[file_path]:
+                changes.append(("modified", file_path))
+        return changes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cache_lock:
+            return {
+                "files_hashed": self.files_hashed,
+                "files_reused": self.files_reused,
+                "scope_cache_hits": self.scope_cache_hits,
+                "cached_scopes": len(self._scope_cache),
+            }
@@ -0,0 +1,168 @@
+import asyncio
+import contextlib
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import quote, unquote
+
+from pydantic import AnyUrl
+from watchfiles import Change, DefaultFilter, awatch
+
+RESOURCE_SCHEME = "workspace"
+
+# (kind, absolute path) where kind is one of "added", "modified", "deleted"
+WorkspaceChange = Tuple[str, Path]
+ChangeListener = Callable[[List[WorkspaceChange]], Awaitable[None]]
+
+_CHANGE_KINDS = {
+    Change.added: "added",
+    Change.modified: "modified",
+    Change.deleted: "deleted",
+}
+
+
+def path_to_uri(root: Path, path: Path) -> str:
+    """Build the workspace:/// resource URI of a path under root"""
+    relative = path.relative_to(root).as_posix()
+    if relative == ".":
+        relative = ""
+    return str(AnyUrl(f"{RESOURCE_SCHEME}:///{quote(relative)}"))
+
+
+def uri_to_relative_path(uri: str) -> str:
+    """Inverse of path_to_uri, returning the workspace-relative path"""
+    prefix = f"{RESOURCE_SCHEME}:///"
+    if not uri.startswith(prefix):
+        raise ValueError(f"Not a workspace resource URI: {uri}")
+    return unquote(uri[len(prefix):])
+
+
+class WorkspaceWatcher:
+    """
+    Watches the workspace with the OS file notification API (inotify on Linux)
+    and fans batched changes out to the registered listeners.
+    """
+
+    def __init__(self, root: Path, debounce_ms: int = 200, watch_filter: Optional[DefaultFilter] = None):
+        self.root = root
+        self.debounce_ms = debounce_ms
+        self.watch_filter = watch_filter or DefaultFilter()
+        self._listeners: List[ChangeListener] = []
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self.batches = 0
+        self.events = 0
+
+    def add_listener(self, listener: ChangeListener) -> None:
+        self._listeners.append(listener)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stop_event = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stop_event.set()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        async for raw_changes in awatch(self.root, watch_filter=self.watch_filter, debounce=self.debounce_ms, stop_event=self._stop_event):
+            changes = sorted({(_CHANGE_KINDS[kind], Path(path)) for kind, path in raw_changes})
+            self.batches += 1
+            self.events += len(changes)
+            for listener in self._listeners:
+                try:
+                    await listener(changes)
+                except Exception as e:
+                    print(f"Error in workspace change listener: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {"running": self._task is not None, "batches": self.batches, "events": self.events}
+
+
+class ResourceSubscriptions:
+    """
+    Tracks which client sessions subscribed to which workspace resources and
+    sends them MCP resources/updated and resources/list_changed notifications.
+    Subscribing to a directory URI covers every file below it.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._by_uri: Dict[str, Set] = {}
+        self._sessions: Set = set()
+        self.notifications_sent = 0
+
+    def track_session(self, session) -> None:
+        """Remember a session that is interested in list_changed notifications"""
+        self._sessions.add(session)
+
+    def subscribe(self, uri: str, session) -> None:
+        self.track_session(session)
+        self._by_uri.setdefault(str(AnyUrl(uri)), set()).add(session)
+
+    def unsubscribe(self, uri: str, session) -> None:
+        sessions = self._by_uri.get(str(AnyUrl(uri)))
+        if sessions is not None:
+            sessions.discard(session)
+            if not sessions:
+                del self._by_uri[str(AnyUrl(uri))]
+
+    def _forget_session(self, session) -> None:
+        self._sessions.discard(session)
+        for uri in list(self._by_uri):
+            self._by_uri[uri].discard(session)
+            if not self._by_uri[uri]:
+                del self._by_uri[uri]
+
+    def _subscribers(self, path: Path) -> Dict[str, Set]:
+        """Map each subscribed URI that covers path (the file or one of its parents) to its sessions"""
+        matches = {}
+        for candidate in [path, *path.parents]:
+            try:
+                uri = path_to_uri(self.root, candidate)
+            except ValueError:
+                break
+            if uri in self._by_uri:
+                matches[uri] = self._by_uri[uri]
+        return matches
+
+    async def _send(self, session, coro_factory) -> None:
+        try:
+            await coro_factory(session)
+            self.notifications_sent += 1
+        except Exception:
+            # The client went away; stop notifying it.
+            self._forget_session(session)
+
+    async def publish(self, changes: List[WorkspaceChange]) -> None:
+        """Listener for WorkspaceWatcher: notify subscribers about a batch of changes"""
+        updated: Dict = {}
+        structure_changed = False
+        for kind, path in changes:
+            if kind != "modified":
+                structure_changed = True
+            try:
+                file_uri = path_to_uri(self.root, path)
+            except ValueError:
+                continue
+            for sessions in self._subscribers(path).values():
+                for session in sessions:
+                    updated.setdefault(session, set()).add(file_uri)
+
+        for session, uris in updated.items():
+            for uri in sorted(uris):
+                await self._send(session, lambda s, u=uri: s.send_resource_updated(AnyUrl(u)))
+
+        if structure_changed:
+            for session in list(self._sessions):
+                await self._send(session, lambda s: s.send_resource_list_changed())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "subscribed_uris": len(self._by_uri),
+            "notifications_sent": self.notifications_sent,
+        }
@@ -0,0 +1,130 @@
+"""
+Compare per-call latency of the git read backends.
+
+    python git_agent/benchmark_read_backends.py /workspace/some-large-repo --iterations 50
+    python git_agent/benchmark_read_backends.py /tmp/bench-repo --generate 20000 --commits 200
+
+--generate first creates a synthetic repository with that many files. Before
+timing, the backends' status and log results are compared; any difference
+is reported and the script exits with status 1.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from git_agent.git_backend import CliBackend, Pygit2Backend, pygit2
+
+OPERATIONS = {
+    "status": lambda backend, repo: backend.status(repo),
+    "log": lambda backend, repo: backend.log(repo, "HEAD", 0, 20),
+    "branches": lambda backend, repo: backend.branches(repo),
+    "remotes": lambda backend, repo: backend.remotes(repo),
+}
+
+
+def generate_repository(path: Path, files: int, commits: int) -> None:
+    path.mkdir(parents=True, exist_ok=True)
+    # One timestamp for every commit, like bursts of agent commits: log order must still be parent-after-child.
+    env = {**os.environ, "GIT_AUTHOR_DATE": "2024-01-01T00:00:00Z", "GIT_COMMITTER_DATE": "2024-01-01T00:00:00Z"}
+    git = lambda *args: subprocess.run(["git", *args], cwd=path, check=True, capture_output=True, env=env)
+    git("init", "-q")
+    git("config", "user.email", "bench@example.com")
+    git("config", "user.name", "bench")
+    per_dir = 500
+    for i in range(files):
+        directory = path / f"dir{i // per_dir:04d}"
+        directory.mkdir(exist_ok=True)
+        (directory / f"file{i:06d}.txt").write_text(f"line {i}\n" * 20)
+    git("add", "-A")
+    git("commit", "-q", "-m", "initial")
+    for i in range(1, commits):
+        (path / "dir0000" / f"file{i % per_dir:06d}.txt").write_text(f"revision {i}\n")
+        git("commit", "-q", "-am", f"change {i}")
+    # A few dirty files so status has something to report.
+    for i in range(10):
+        (path / "dir0000" / f"file{i:06d}.txt").write_text("dirty\n")
+    # And a staged rename, which status must report as one "R" entry.
+    git("mv", "dir0000/file000010.txt", "dir0000/renamed.txt")
+    # An untracked directory is reported as one "untracked/" entry, not file by file.
+    (path / "untracked" / "nested").mkdir(parents=True, exist_ok=True)
+    for name in ("a.txt", "b.txt", "nested/c.txt"):
+        (path / "untracked" / name).write_text("new\n")
+    (path / "untracked.txt").write_text("new\n")
+
+
+async def compare(backends, repo: Path) -> list:
+    """Differences between the backends' status and log results, as messages"""
+    reference, others = backends[0], backends[1:]
+    problems = []
+    expected_status = (await reference.status(repo))["status"]
+    expected_log = [(c["oid"], c["parents"]) for c in (await reference.log(repo, "HEAD", 0, 200))["commits"]]
+    for backend in others:
+        status = (await backend.status(repo))["status"]
+        for key in ("branch", "oid", "upstream", "ahead", "behind", "counts"):
+            if status[key] != expected_status[key]:
+                problems.append(f"status {key}: {reference.name} {expected_status[key]!r}, {backend.name} {status[key]!r}")
+        if sorted(status["entries"]) != sorted(expected_status["entries"]):
+            problems.append(f"status entries differ between {reference.name} and {backend.name}")
+        log = [(c["oid"], c["parents"]) for c in (await backend.log(repo, "HEAD", 0, 200))["commits"]]
+        if log != expected_log:
+            first = next((i for i, (a, b) in enumerate(zip(expected_log, log)) if a != b), min(len(log), len(expected_log)))
+            problems.append(f"log order differs between {reference.name} and {backend.name} from commit {first}")
+    return problems
+
+
+async def measure(backend, repo: Path, operation, iterations: int) -> dict:
+    await operation(backend, repo)  # warm up: open the repository, fill OS caches
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = await operation(backend, repo)
+        samples.append((time.perf_counter() - started) * 1000)
+        if not result["success"]:
+            raise RuntimeError(result["stderr"])
+    samples.sort()
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": samples[len(samples) // 2],
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("repo", type=Path)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--generate", type=int, default=0, metavar="FILES")
+    parser.add_argument("--commits", type=int, default=100)
+    args = parser.parse_args()
+
+    repo = args.repo.resolve()
+    if args.generate:
+        generate_repository(repo, args.generate, args.commits)
+
+    backends = [CliBackend()]
+    if pygit2 is not None:
+        backends.append(Pygit2Backend())
+    else:
+        print("pygit2 is not installed; only the CLI backend is measured.")
+
+    problems = asyncio.run(compare(backends, repo))
+    for problem in problems:
+        print(f"MISMATCH {problem}")
+    if problems:
+        sys.exit(1)
+
+    print(f"{'operation':<10} {'backend':<8} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, operation in OPERATIONS.items():
+        for backend in backends:
+            timing = asyncio.run(measure(backend, repo, operation, args.iterations))
+            print(f"{name:<10} {backend.name:<8} {timing['mean']:>9.2f} {timing['p50']:>9.2f} {timing['p95']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from git_agent.git_backend import ProgressFn, run_with_progress
+from git_agent.repo_locks import RepoLockManager
+
+MIRROR_CACHE_ENABLED = os.getenv("GIT_MIRROR_CACHE_ENABLED", "true").lower() == "true"
+MIRROR_CACHE_DIR = Path(os.path.expanduser(os.getenv("GIT_MIRROR_CACHE_DIR", "~/.cache/mcp_git_server/mirrors")))
+
+
+def repository_name(url: str) -> str:
+    """Directory name git clone would pick for url"""
+    name = re.split(r"[/:]", url.rstrip("/"))[-1]
+    return name[:-len(".git")] if name.endswith(".git") and len(name) > 4 else name
+
+
+class MirrorCache:
+    """
+    Server-managed bare mirrors of upstream repositories. A clone borrows
+    objects from the mirror (--reference) and then copies them (--dissociate),
+    so re-cloning an upstream transfers only what changed since the mirror
+    was last refreshed, and the new clone never depends on the cache.
+    """
+
+    def __init__(self, locks: RepoLockManager, root: Path = MIRROR_CACHE_DIR, enabled: bool = MIRROR_CACHE_ENABLED):
+        self.locks = locks
+        self.root = root
+        self.enabled = enabled
+        self.hits = 0
+        self.created = 0
+        self.refresh_failures = 0
+
+    def mirror_path(self, url: str) -> Path:
+        digest = hashlib.sha1(url.encode()).hexdigest()[:16]
+        return self.root / f"{digest}-{repository_name(url) or 'repo'}.git"
+
+    async def prepare(self, url: str, create: bool, on_progress: Optional[ProgressFn] = None) -> Optional[Path]:
+        """
+        Refresh (or, when create is set, create) the mirror of url and return
+        it, or None when no usable mirror exists. A failed refresh still
+        returns the mirror: its objects remain valid references.
+        """
+        if not self.enabled:
+            return None
+        mirror = self.mirror_path(url)
+        async with self.locks.write(mirror):
+            if (mirror / "HEAD").exists():
+                self.hits += 1
+                result = await run_with_progress(["fetch", "--prune", "--progress", "origin"], mirror, on_progress)
+                if not result["success"]:
+                    self.refresh_failures += 1
+                    print(f"[Git] Refreshing mirror of {url} failed: {result['stderr']}")
+                return mirror
+            if not create:
+                return None
+            self.root.mkdir(parents=True, exist_ok=True)
+            result = await run_with_progress(["clone", "--mirror", "--progress", url, str(mirror)], self.root, on_progress)
+            if not result["success"]:
+                shutil.rmtree(mirror, ignore_errors=True)
+                print(f"[Git] Mirroring {url} failed: {result['stderr']}")
+                return None
+            self.created += 1
+            return mirror
+
+    def stats(self) -> Dict[str, Any]:
+        mirrors = len(list(self.root.glob("*.git"))) if self.root.exists() else 0
+        return {
+            "enabled": self.enabled,
+            "root": str(self.root),
+            "mirrors": mirrors,
+            "hits": self.hits,
+            "created": self.created,
+            "refresh_failures": self.refresh_failures,
+        }
@@ -0,0 +1,110 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Set
+
+from git_agent.git_backend import run_cli
+from git_agent.git_status import git_dirs
+from git_agent.repo_locks import RepoLockManager
+
+COMMIT_GRAPH_ENABLED = os.getenv("GIT_COMMIT_GRAPH_ENABLED", "true").lower() == "true"
+# Bursts of commits are folded into one write this long after the last of them.
+COMMIT_GRAPH_DELAY_SECONDS = float(os.getenv("GIT_COMMIT_GRAPH_DELAY_SECONDS", "5"))
+COMMIT_GRAPH_TIMEOUT_SECONDS = int(os.getenv("GIT_COMMIT_GRAPH_TIMEOUT_SECONDS", "600"))
+
+# Commands after which new commits may be reachable
+GRAPH_CHANGING_COMMANDS = {"commit", "merge", "pull", "fetch", "clone", "rebase", "cherry-pick", "revert", "am"}
+
+# --split appends a small layer instead of rewriting the whole file; --changed-paths
+# stores Bloom filters so path-limited logs can skip commits that did not touch the path.
+WRITE_COMMAND = ["commit-graph", "write", "--reachable", "--split", "--changed-paths"]
+
+
+def has_commit_graph(repo: Path) -> bool:
+    info = git_dirs(repo)[1] / "objects" / "info"
+    return (info / "commit-graph").exists() or (info / "commit-graphs" / "commit-graph-chain").exists()
+
+
+class CommitGraphKeeper:
+    """
+    Keeps each repository's commit-graph current so log traversal reads
+    parents and generation numbers from the graph instead of parsing commits.
+    Writes run in the background under the repository's shared lock: they
+    only add files below objects/info, so reads go on meanwhile.
+    """
+
+    def __init__(self, locks: RepoLockManager, enabled: bool = COMMIT_GRAPH_ENABLED,
+                 delay: float = COMMIT_GRAPH_DELAY_SECONDS):
+        self.locks = locks
+        self.enabled = enabled
+        self.delay = delay
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._writing: Set[str] = set()
+        self._again: Set[str] = set()
+        self.writes = 0
+        self.failures = 0
+        self.write_seconds = 0.0
+        self.last_error = ""
+
+    def mark_stale(self, repo: Path) -> None:
+        """Schedule a write; a write still waiting for its delay is pushed back"""
+        if not self.enabled:
+            return
+        key = str(repo)
+        if key in self._writing:
+            # Never interrupt git mid-write (a killed writer leaves its lock file behind): write again afterwards.
+            self._again.add(key)
+            return
+        task = self._pending.get(key)
+        if task is not None:
+            task.cancel()
+        self._pending[key] = asyncio.create_task(self._write_later(repo, self.delay))
+
+    def ensure(self, repo: Path) -> None:
+        """Schedule a write for a repository that has no commit-graph yet"""
+        if self.enabled and str(repo) not in self._pending and (repo / ".git").exists() and not has_commit_graph(repo):
+            self._pending[str(repo)] = asyncio.create_task(self._write_later(repo, 0))
+
+    async def _write_later(self, repo: Path, delay: float) -> None:
+        key = str(repo)
+        await asyncio.sleep(delay)
+        self._writing.add(key)
+        started = time.monotonic()
+        try:
+            async with self.locks.read(repo, background=True):
+                result = await run_cli(WRITE_COMMAND, repo, timeout=COMMIT_GRAPH_TIMEOUT_SECONDS)
+        finally:
+            self._writing.discard(key)
+            if self._pending.get(key) is asyncio.current_task():
+                del self._pending[key]
+        if result["success"]:
+            self.writes += 1
+            self.write_seconds += time.monotonic() - started
+        else:
+            self.failures += 1
+            self.last_error = f"{repo}: {result['stderr']}"
+        if key in self._again:
+            self._again.discard(key)
+            self.mark_stale(repo)
+
+    async def aclose(self) -> None:
+        """Drop scheduled writes and wait for the ones already running"""
+        self.enabled = False
+        tasks = list(self._pending.items())
+        for key, task in tasks:
+            if key not in self._writing:
+                task.cancel()
+        await asyncio.gather(*(task for _, task in tasks), return_exceptions=True)
+        self._pending.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "pending": len(self._pending),
+            "writing": len(self._writing),
+            "writes": self.writes,
+            "failures": self.failures,
+            "avg_write_seconds": round(self.write_seconds / self.writes, 3) if self.writes else 0.0,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,190 @@
+import fnmatch
+import hashlib
+import os
+from contextlib import aclosing
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+from git_agent.git_backend import READ_ONLY_ENV, GitCommandError, run_cli, stream_cli
+
+GIT_DIFF_MAX_LINES = int(os.getenv("GIT_DIFF_MAX_LINES", "400"))
+GIT_DIFF_MAX_BYTES = int(os.getenv("GIT_DIFF_MAX_BYTES", "24000"))
+# Lock files, minified bundles and generated code: listed in summaries, left out of patches.
+GENERATED_PATTERNS = [
+    pattern.strip() for pattern in os.getenv(
+        "GIT_DIFF_GENERATED_PATTERNS",
+        "package-lock.json,yarn.lock,pnpm-lock.yaml,poetry.lock,Pipfile.lock,Cargo.lock,go.sum,composer.lock,"
+        "*.min.js,*.min.css,*.map,*.pb.go,*_pb2.py,*.snap",
+    ).split(",") if pattern.strip()
+]
+MAX_LINE_CHARS = 400
+# Files whose patches one git invocation is asked for; the page usually fills up long before.
+PATCH_FILES_PER_RUN = 200
+
+DIFF_OPTIONS = ["--no-color", "--no-ext-diff", "-M"]
+
+
+class DiffFile(NamedTuple):
+    path: str
+    old_path: Optional[str]  # source of a rename or copy
+    added: Optional[int]  # None for binary files
+    deleted: Optional[int]
+
+    @property
+    def binary(self) -> bool:
+        return self.added is None
+
+    @property
+    def generated(self) -> bool:
+        name = self.path.rsplit("/", 1)[-1]
+        return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(self.path, pattern) for pattern in GENERATED_PATTERNS)
+
+    @property
+    def pathspecs(self) -> List[str]:
+        # diff reports paths relative to the top of the working tree, whatever the cwd
+        return [f":(top,literal){p}" for p in (self.old_path, self.path) if p]
+
+
+def parse_numstat(output: str) -> List[DiffFile]:
+    """Parse `git diff --numstat -z` output"""
+    files = []
+    records = output.split("\0")
+    i = 0
+    while i < len(records):
+        record = records[i]
+        i += 1
+        if not record:
+            continue
+        added, deleted, path = record.split("\t", 2)
+        old_path = None
+        if not path:
+            # Rename or copy: the old and new paths follow as separate records.
+            old_path, path = records[i], records[i + 1]
+            i += 2
+        counts = (None, None) if added == "-" else (int(added), int(deleted))
+        files.append(DiffFile(path, old_path, *counts))
+    return files
+
+
+def encode_cursor(mode: str, file_index: int, line: int, digest: str) -> str:
+    return f"{mode}.{file_index}.{line}.{digest}"
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int, int, str]:
+    """(mode, file index, patch line within the file, diff digest)"""
+    try:
+        mode, file_index, line, digest = cursor.split(".")
+        if mode not in ("summary", "patch"):
+            raise ValueError
+        return mode, int(file_index), int(line), digest
+    except ValueError:
+        raise ValueError(f"Invalid cursor '{cursor}'")
+
+
+def estimated_patch_lines(files: List[DiffFile]) -> int:
+    """Changed lines plus headers and some context per file"""
+    return sum((f.added or 0) + (f.deleted or 0) + 10 for f in files)
+
+
+class DiffRequest:
+    """One git_diff call: what to compare, where, and the page limits"""
+
+    def __init__(self, cwd: Path, revisions: List[str], pathspec: List[str], staged: bool,
+                 include_generated: bool, max_lines: int, max_bytes: int):
+        self.cwd = cwd
+        self.revisions = revisions
+        self.pathspec = pathspec
+        self.staged = staged
+        self.include_generated = include_generated
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+
+    def command(self, *options: str, pathspec: Optional[List[str]] = None) -> List[str]:
+        cmd = ["diff", *DIFF_OPTIONS, *options]
+        if self.staged:
+            cmd.append("--cached")
+        return cmd + self.revisions + ["--", *(self.pathspec if pathspec is None else pathspec)]
+
+    @property
+    def label(self) -> str:
+        if self.revisions:
+            return " ".join(self.revisions) + (" (index)" if self.staged else "")
+        return "index vs HEAD" if self.staged else "working tree vs index"
+
+    async def files(self) -> Tuple[List[DiffFile], str]:
+        """Changed files in diff order, plus a digest that cursors use to detect a changed diff"""
+        result = await run_cli(self.command("--numstat", "-z"), self.cwd, env=READ_ONLY_ENV)
+        if not result["success"]:
+            raise GitCommandError(result["stderr"])
+        digest = hashlib.sha1(result["stdout"].encode()).hexdigest()[:10]
+        return parse_numstat(result["stdout"]), digest
+
+    def patched(self, files: List[DiffFile]) -> List[DiffFile]:
+        return [f for f in files if not f.binary and (self.include_generated or not f.generated)]
+
+
+def render_summary(request: DiffRequest, files: List[DiffFile], digest: str, start: int) -> str:
+    """numstat table, paginated by max_lines files"""
+    added = sum(f.added or 0 for f in files)
+    deleted = sum(f.deleted or 0 for f in files)
+    lines = [f"Diff summary ({request.label}): {len(files)} files changed, +{added} -{deleted}"]
+    page = files[start:start + max(1, request.max_lines)]
+    for f in page:
+        name = f"{f.old_path} -> {f.path}" if f.old_path else f.path
+        counts = "   binary" if f.binary else f"+{f.added:<5} -{f.deleted:<5}"
+        note = " [generated: left out of patches]" if f.generated and not request.include_generated else ""
+        lines.append(f"{counts} {name}{note}")
+    end = start + len(page)
+    if end < len(files):
+        lines.append(f"... {len(files) - end} more files; cursor='{encode_cursor('summary', end, 0, digest)}'")
+    lines.append("Use mode='patch' (optionally with pathspec) for the hunks.")
+    return "\n".join(lines)
+
+
+async def render_patch(request: DiffRequest, files: List[DiffFile], digest: str, start: int, start_line: int) -> str:
+    """
+    Hunks from file index start (in the patched file list), line start_line,
+    until max_lines or max_bytes is reached. git's output is read as it is
+    produced and the process is stopped once the page is full.
+    """
+    patched = request.patched(files)
+    if start >= len(patched):
+        return "No more differences" if start else "No textual differences found"
+
+    batch = patched[start:start + PATCH_FILES_PER_RUN]
+    pathspec = [spec for f in batch for spec in f.pathspecs]
+    out: List[str] = []
+    if start_line:
+        out.append(f"[continuing {patched[start].path} from patch line {start_line + 1}]")
+    used_bytes = 0
+    index = start - 1
+    line = 0
+    next_cursor = None
+    command = request.command("--patch", pathspec=pathspec)
+    async with aclosing(stream_cli(command, request.cwd, env=READ_ONLY_ENV)) as lines:
+        async for text in lines:
+            if text.startswith("diff --git "):
+                index += 1
+                line = 0
+            line += 1
+            if index == start and line <= start_line:
+                continue
+            if len(text) > MAX_LINE_CHARS:
+                text = text[:MAX_LINE_CHARS] + " [line truncated]"
+            if out and (len(out) >= request.max_lines or used_bytes + len(text) + 1 > request.max_bytes):
+                next_cursor = encode_cursor("patch", index, line - 1, digest)
+                break
+            out.append(text)
+            used_bytes += len(text) + 1
+        else:
+            if start + len(batch) < len(patched):
+                next_cursor = encode_cursor("patch", start + len(batch), 0, digest)
+
+    header = f"Diff ({request.label}): files {start + 1}-{min(index, len(patched) - 1) + 1} of {len(patched)}"
+    skipped = len(files) - len(patched)
+    if skipped:
+        header += f", {skipped} binary/generated files left out (mode='summary' lists them)"
+    result = [header, *out]
+    if next_cursor:
+        result.append(f"[page limit reached] continue with cursor='{next_cursor}'")
+    return "\n".join(result)
@@ -0,0 +1,107 @@
+import os
+import struct
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from git_agent.git_status import git_dirs
+
+# "off", "auto" (repositories whose index tracks at least GIT_FAST_STATUS_MIN_FILES files) or "on"
+GIT_FAST_STATUS = os.getenv("GIT_FAST_STATUS", "auto").lower()
+FAST_STATUS_MIN_FILES = int(os.getenv("GIT_FAST_STATUS_MIN_FILES", "20000"))
+
+# feature.manyFiles switches to index v4 and the untracked cache; core.fsmonitor
+# (the built-in daemon) lets status skip the working-tree scan altogether.
+FAST_STATUS_SETTINGS = [
+    ("feature.manyFiles", "true"),
+    ("core.untrackedCache", "true"),
+    ("core.fsmonitor", "true"),
+]
+
+RunGit = Callable[[List[str], Path], Awaitable[Dict[str, Any]]]
+
+
+def index_entries(repo: Path) -> int:
+    """Number of files in the index, read from its header"""
+    try:
+        with open(git_dirs(repo)[0] / "index", "rb") as f:
+            signature, _, entries = struct.unpack(">4sLL", f.read(12))
+        return entries if signature == b"DIRC" else 0
+    except (OSError, struct.error):
+        return 0
+
+
+class FastStatusManager:
+    """
+    Decides per repository whether status runs in fast mode and, the first
+    time it does, enables the settings above in the repository's local
+    config. Values a user already set are left untouched. Also keeps status
+    timings per repository.
+    """
+
+    def __init__(self, mode: str = GIT_FAST_STATUS, min_files: int = FAST_STATUS_MIN_FILES):
+        self.mode = mode
+        self.min_files = min_files
+        # Unknown until probed: the daemon exists on Windows and macOS builds only.
+        self.fsmonitor_supported: Optional[bool] = None
+        self._repos: Dict[str, Dict[str, Any]] = {}
+
+    async def prepare(self, repo: Path, run_git: RunGit) -> bool:
+        """Return whether repo uses fast mode, configuring it on first use"""
+        state = self._repos.get(str(repo))
+        if state is None:
+            state = {"fast": False, "index_entries": 0, "settings": {}, "statuses": 0, "total_ms": 0.0, "last_ms": None}
+            self._repos[str(repo)] = state
+        if state["fast"] or self.mode == "off" or not (repo / ".git").exists():
+            return state["fast"]
+        # Reading the index header is cheap, so a repository that grows past the threshold switches over.
+        state["index_entries"] = index_entries(repo)
+        if self.mode != "on" and state["index_entries"] < self.min_files:
+            return False
+        state["fast"] = True
+
+        if self.fsmonitor_supported is None:
+            probe = await run_git(["fsmonitor--daemon", "status"], repo)
+            self.fsmonitor_supported = "not supported" not in probe["stderr"]
+        for key, value in FAST_STATUS_SETTINGS:
+            if key == "core.fsmonitor" and not self.fsmonitor_supported:
+                state["settings"][key] = "unsupported on this platform"
+                continue
+            current = await run_git(["config", "--local", "--get", key], repo)
+            if current["success"]:
+                state["settings"][key] = f"{current['stdout']} (set by user)"
+                continue
+            result = await run_git(["config", "--local", key, value], repo)
+            state["settings"][key] = value if result["success"] else f"error: {result['stderr']}"
+        print(f"[Git] Fast status enabled for {repo}: {state['settings']}")
+        return True
+
+    def record(self, repo: Path, seconds: float) -> None:
+        state = self._repos.get(str(repo))
+        if state is not None:
+            state["statuses"] += 1
+            state["total_ms"] += seconds * 1000
+            state["last_ms"] = round(seconds * 1000, 2)
+
+    def forget(self, repo_path: Path) -> None:
+        """Re-evaluate repositories at or below repo_path, e.g. after a clone replaced one"""
+        prefix = str(repo_path).rstrip(os.sep) + os.sep
+        for key in [k for k in self._repos if k == str(repo_path) or k.startswith(prefix)]:
+            del self._repos[key]
+
+    def stats(self) -> Dict[str, Any]:
+        repos = {}
+        for key, state in self._repos.items():
+            repos[key] = {
+                "fast": state["fast"],
+                "index_entries": state["index_entries"],
+                "settings": state["settings"],
+                "statuses": state["statuses"],
+                "last_ms": state["last_ms"],
+                "avg_ms": round(state["total_ms"] / state["statuses"], 2) if state["statuses"] else None,
+            }
+        return {
+            "mode": self.mode,
+            "min_files": self.min_files,
+            "fsmonitor_supported": self.fsmonitor_supported,
+            "repositories": repos,
+        }
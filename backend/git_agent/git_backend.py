@@ -0,0 +1,441 @@
+import asyncio
+import os
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import pygit2
+except ImportError:  # optional: pip install pygit2
+    pygit2 = None
+
+from git_agent.git_log import commit_record, log_command, parse_log
+from git_agent.git_status import STATUS_COMMAND, parse_porcelain_v2, summarize
+
+GIT_TIMEOUT_SECONDS = 30
+# Network operations scale with the repository, not with the machine: give them their own budgets.
+OPERATION_TIMEOUTS = {
+    "clone": int(os.getenv("GIT_CLONE_TIMEOUT_SECONDS", "3600")),
+    "fetch": int(os.getenv("GIT_FETCH_TIMEOUT_SECONDS", "900")),
+    "pull": int(os.getenv("GIT_FETCH_TIMEOUT_SECONDS", "900")),
+    "push": int(os.getenv("GIT_PUSH_TIMEOUT_SECONDS", "900")),
+}
+# A transfer that prints no progress for this long is considered stuck, whatever its total budget.
+GIT_STALL_TIMEOUT_SECONDS = int(os.getenv("GIT_STALL_TIMEOUT_SECONDS", "300"))
+# Reads share a repository with each other: keep `git status` from taking index.lock to refresh stat data.
+READ_ONLY_ENV = {"GIT_OPTIONAL_LOCKS": "0"}
+
+
+def git_result(success: bool, stdout: str = "", stderr: str = "", returncode: int = 0) -> Dict[str, Any]:
+    return {"success": success, "stdout": stdout.strip(), "stderr": stderr.strip(), "returncode": returncode}
+
+
+async def run_cli(cmd: List[str], cwd: Path, timeout: int = GIT_TIMEOUT_SECONDS,
+                  env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Run `git <cmd>` in cwd without blocking the event loop; the process is killed on timeout"""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "git", *cmd, cwd=cwd, env={**os.environ, **env} if env else None,
+            stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+    except Exception as e:
+        return git_result(False, stderr=str(e), returncode=-1)
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+        process.kill()
+        await process.wait()
+        if isinstance(e, asyncio.CancelledError):
+            raise
+        return git_result(False, stderr="Command timed out", returncode=-1)
+    return git_result(
+        process.returncode == 0,
+        stdout.decode("utf-8", errors="replace"), stderr.decode("utf-8", errors="replace"), process.returncode,
+    )
+
+
+def timeout_for(cmd: List[str]) -> int:
+    """Time budget of a git command line (without the leading 'git')"""
+    return OPERATION_TIMEOUTS.get(cmd[0], GIT_TIMEOUT_SECONDS) if cmd else GIT_TIMEOUT_SECONDS
+
+
+# e.g. "Receiving objects:  45% (450/1000), 1.2 MiB | 3.4 MiB/s"
+PROGRESS_LINE = re.compile(r"^(?:remote: )?(?P<phase>[A-Za-z][A-Za-z ]+):\s+(?P<percent>\d+)%")
+
+ProgressFn = Callable[[str, int, str], Awaitable[None]]
+
+
+async def run_with_progress(cmd: List[str], cwd: Path, on_progress: Optional[ProgressFn] = None,
+                            timeout: Optional[int] = None, stall_timeout: int = GIT_STALL_TIMEOUT_SECONDS) -> Dict[str, Any]:
+    """
+    Run a transfer command (clone, fetch, ...) with --progress output parsed
+    from stderr as it arrives: on_progress(phase, percent, line) is awaited
+    for every progress update. The process is killed when the total timeout
+    expires or when nothing was printed for stall_timeout seconds.
+    """
+    timeout = timeout or timeout_for(cmd)
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "git", *cmd, cwd=cwd, env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+            stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+    except Exception as e:
+        return git_result(False, stderr=str(e), returncode=-1)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    messages: List[str] = []
+    last = None
+    pending = b""
+    stdout_task = asyncio.create_task(process.stdout.read())
+    try:
+        while True:
+            wait = min(stall_timeout, deadline - loop.time())
+            if wait <= 0:
+                raise asyncio.TimeoutError
+            chunk = await asyncio.wait_for(process.stderr.read(4096), wait)
+            if not chunk:
+                break
+            # Progress lines are redrawn with \r; everything else ends with \n.
+            *lines, pending = re.split(rb"[\r\n]", pending + chunk)
+            for raw in lines:
+                line = raw.decode("utf-8", errors="replace").strip()
+                match = PROGRESS_LINE.match(line)
+                if match is None:
+                    if line:
+                        messages.append(line)
+                    continue
+                update = (match["phase"], int(match["percent"]))
+                if update != last and on_progress is not None:
+                    last = update
+                    await on_progress(update[0], update[1], line)
+        stdout = await asyncio.wait_for(stdout_task, max(1, deadline - loop.time()))
+        await process.wait()
+    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+        process.kill()
+        await process.wait()
+        stdout_task.cancel()
+        if isinstance(e, asyncio.CancelledError):
+            raise
+        return git_result(False, stderr="\n".join(messages[-20:] + ["Command timed out or stalled"]), returncode=-1)
+    output = stdout.decode("utf-8", errors="replace")
+    # Only the tail of git's messages matters (the error, or the final summary).
+    return git_result(process.returncode == 0, output, "\n".join(messages[-20:]), process.returncode)
+
+
+class GitCommandError(RuntimeError):
+    """A streamed git command exited with an error"""
+
+
+async def stream_cli(cmd: List[str], cwd: Path, timeout: int = GIT_TIMEOUT_SECONDS,
+                     env: Optional[Dict[str, str]] = None, chunk_size: int = 65536) -> AsyncIterator[str]:
+    """
+    Yield the lines of `git <cmd>` output as they arrive, without buffering
+    the whole output. Closing the generator early kills the process, so a
+    caller that has read enough stops git from producing the rest.
+    """
+    process = await asyncio.create_subprocess_exec(
+        "git", *cmd, cwd=cwd, env={**os.environ, **env} if env else None,
+        stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    deadline = asyncio.get_running_loop().time() + timeout
+    pending = b""
+    try:
+        while True:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                raise GitCommandError("Command timed out")
+            try:
+                chunk = await asyncio.wait_for(process.stdout.read(chunk_size), remaining)
+            except asyncio.TimeoutError:
+                raise GitCommandError("Command timed out")
+            if not chunk:
+                break
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                yield line.decode("utf-8", errors="replace")
+            if len(pending) > 16 * chunk_size:
+                # A single enormous line (minified or generated content) is passed on in pieces.
+                yield pending.decode("utf-8", errors="replace")
+                pending = b""
+        if pending:
+            yield pending.decode("utf-8", errors="replace")
+        stderr = await process.stderr.read()
+        if await process.wait() != 0:
+            raise GitCommandError(stderr.decode("utf-8", errors="replace").strip())
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+
+class CliBackend:
+    """Read operations through the git executable: one fork/exec per call"""
+
+    name = "cli"
+
+    async def status(self, repo_path: Path, pathspec: Sequence[str] = (), refresh_index: bool = False) -> Dict[str, Any]:
+        """
+        Structured status (see git_status.summarize) under the "status" key.
+        refresh_index lets git write back the refreshed index, which persists
+        the untracked cache and fsmonitor token of fast-status repositories.
+        """
+        cmd = STATUS_COMMAND + (["--", *pathspec] if pathspec else [])
+        result = await run_cli(cmd, repo_path, env=None if refresh_index else READ_ONLY_ENV)
+        if result["success"]:
+            result["status"] = parse_porcelain_v2(result.pop("stdout"))
+        return result
+
+    async def log(self, repo_path: Path, rev: str, skip: int, count: int, **filters) -> Dict[str, Any]:
+        """
+        Commit records (see git_log.commit_record) under "commits" and the
+        commit rev resolved to under "start"; filters are log_command's.
+        """
+        start = await run_cli(["rev-parse", "--verify", "--quiet", f"{rev}^{{commit}}"], repo_path, env=READ_ONLY_ENV)
+        if not start["success"]:
+            return git_result(False, stderr=start["stderr"] or f"fatal: unknown revision '{rev}'", returncode=start["returncode"])
+        result = await run_cli(log_command(start["stdout"], skip, count, **filters), repo_path, env=READ_ONLY_ENV)
+        if result["success"]:
+            result["commits"] = parse_log(result.pop("stdout"))
+            result["start"] = start["stdout"]
+        return result
+
+    async def branches(self, repo_path: Path) -> Dict[str, Any]:
+        return await run_cli(["branch", "-a"], repo_path)
+
+    async def remotes(self, repo_path: Path) -> Dict[str, Any]:
+        return await run_cli(["remote", "-v"], repo_path)
+
+    def forget(self, repo_path: Path) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+class Pygit2Backend:
+    """
+    Read operations in-process through libgit2. Opened repositories are kept,
+    so a call costs neither a fork/exec nor a repository discovery; results
+    have the same shape as the CLI backend's. log serves unfiltered history
+    only; filtered logs go through the CLI.
+    """
+
+    name = "pygit2"
+
+    def __init__(self):
+        # (handle, lock) per repository path; _lock only guards this map.
+        self._repos: Dict[str, Tuple[Any, threading.Lock]] = {}
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def _repo(self, repo_path: Path) -> Optional[Tuple[Any, threading.Lock]]:
+        key = str(repo_path)
+        with self._lock:
+            entry = self._repos.get(key)
+            if entry is None:
+                gitdir = pygit2.discover_repository(key)
+                if gitdir is None:
+                    return None
+                # A Repository handle is not safe for concurrent use; other repositories are read in parallel.
+                entry = (pygit2.Repository(gitdir), threading.Lock())
+                self._repos[key] = entry
+                self.opened += 1
+            return entry
+
+    async def _run(self, repo_path: Path, fn: Callable[[Any], str]) -> Dict[str, Any]:
+        """Run fn on a worker thread so libgit2 never blocks the event loop"""
+        return await asyncio.to_thread(self._run_sync, repo_path, fn)
+
+    def _run_sync(self, repo_path: Path, fn: Callable[[Any], str]) -> Dict[str, Any]:
+        try:
+            entry = self._repo(repo_path)
+            if entry is None:
+                return git_result(False, stderr="fatal: not a git repository (or any of the parent directories): .git", returncode=128)
+            repo, repo_lock = entry
+            with repo_lock:
+                output = fn(repo)
+            if isinstance(output, dict):
+                return {**git_result(True), **output}
+            return git_result(True, output)
+        except Exception as e:
+            # The cached handle may be stale (repository moved or re-created).
+            with self._lock:
+                self._repos.pop(str(repo_path), None)
+            return git_result(False, stderr=str(e), returncode=-1)
+
+    def forget(self, repo_path: Path) -> None:
+        """Drop cached handles at or below repo_path, e.g. after a new repository was created there"""
+        prefix = str(repo_path).rstrip(os.sep) + os.sep
+        with self._lock:
+            for key in [k for k in self._repos if k == str(repo_path) or k.startswith(prefix)]:
+                del self._repos[key]
+
+    @staticmethod
+    def _head_branch(repo) -> Optional[str]:
+        target = repo.references["HEAD"].target
+        return target[len("refs/heads/"):] if isinstance(target, str) and target.startswith("refs/heads/") else None
+
+    async def status(self, repo_path: Path) -> Dict[str, Any]:
+        index_codes = [
+            (pygit2.GIT_STATUS_INDEX_NEW, "A"), (pygit2.GIT_STATUS_INDEX_MODIFIED, "M"),
+            (pygit2.GIT_STATUS_INDEX_DELETED, "D"), (pygit2.GIT_STATUS_INDEX_RENAMED, "R"),
+            (pygit2.GIT_STATUS_INDEX_TYPECHANGE, "T"),
+        ]
+        worktree_codes = [
+            (pygit2.GIT_STATUS_WT_MODIFIED, "M"), (pygit2.GIT_STATUS_WT_DELETED, "D"),
+            (pygit2.GIT_STATUS_WT_RENAMED, "R"), (pygit2.GIT_STATUS_WT_TYPECHANGE, "T"),
+        ]
+
+        def render(repo) -> Dict[str, Any]:
+            # Like porcelain v2: an untracked directory is one "dir/" entry, not every file inside it.
+            statuses = repo.status(untracked_files="normal")
+            renamed = self._staged_renames(repo, statuses)
+            sources = set(renamed.values())
+            entries = []
+            for path, flags in sorted(statuses.items()):
+                if path in sources:
+                    # Reported with its destination, as "R old -> new".
+                    flags &= ~pygit2.GIT_STATUS_INDEX_DELETED
+                if flags & pygit2.GIT_STATUS_IGNORED or not flags:
+                    continue
+                if flags & pygit2.GIT_STATUS_CONFLICTED:
+                    code = "UU"
+                elif flags == pygit2.GIT_STATUS_WT_NEW:
+                    code = "??"
+                else:
+                    x = "R" if path in renamed else next((c for flag, c in index_codes if flags & flag), " ")
+                    y = next((c for flag, c in worktree_codes if flags & flag), " ")
+                    code = x + y
+                entries.append((code, path, renamed.get(path)))
+            return {"status": summarize(*self._branch_info(repo), entries)}
+
+        return await self._run(repo_path, render)
+
+    @staticmethod
+    def _staged_renames(repo, statuses: Dict[str, int]) -> Dict[str, str]:
+        """new path -> old path of renames between HEAD and the index, detected like git status does"""
+        added = any(flags & pygit2.GIT_STATUS_INDEX_NEW for flags in statuses.values())
+        deleted = any(flags & pygit2.GIT_STATUS_INDEX_DELETED for flags in statuses.values())
+        if not (added and deleted) or repo.head_is_unborn:
+            return {}
+        diff = repo.index.diff_to_tree(repo.head.peel(pygit2.Tree))
+        diff.find_similar(pygit2.GIT_DIFF_FIND_RENAMES)
+        return {
+            delta.new_file.path: delta.old_file.path
+            for delta in diff.deltas if delta.status == pygit2.GIT_DELTA_RENAMED
+        }
+
+    def _branch_info(self, repo) -> Tuple[Optional[str], Optional[str], Optional[str], int, int]:
+        """(branch, head commit, upstream, ahead, behind) as in porcelain v2 branch headers"""
+        if repo.head_is_unborn:
+            return self._head_branch(repo), None, None, 0, 0
+        oid = str(repo.head.target)
+        if repo.head_is_detached:
+            return None, oid, None, 0, 0
+        branch_name = repo.head.shorthand
+        upstream = repo.branches.local[branch_name].upstream
+        if upstream is None:
+            return branch_name, oid, None, 0, 0
+        ahead, behind = repo.ahead_behind(repo.head.target, upstream.target)
+        return branch_name, oid, upstream.shorthand, ahead, behind
+
+    def _decorations(self, repo) -> Dict[Any, List[str]]:
+        """commit id -> names in `git log --decorate` style"""
+        decorations: Dict[Any, List[str]] = {}
+        current = None if repo.head_is_detached else self._head_branch(repo)
+        if not repo.head_is_unborn:
+            head_label = f"HEAD -> {current}" if current else "HEAD"
+            decorations.setdefault(repo.head.target, []).append(head_label)
+        for name in repo.references:
+            ref = repo.references[name]
+            if isinstance(ref.target, str):
+                continue  # symbolic, e.g. refs/remotes/origin/HEAD
+            if name.startswith("refs/heads/"):
+                label = name[len("refs/heads/"):]
+                if label == current:
+                    continue
+            elif name.startswith("refs/remotes/"):
+                label = name[len("refs/remotes/"):]
+            elif name.startswith("refs/tags/"):
+                label = "tag: " + name[len("refs/tags/"):]
+            else:
+                continue
+            try:
+                target = repo[ref.target].peel(pygit2.Commit).id
+            except Exception:
+                continue
+            decorations.setdefault(target, []).append(label)
+        return decorations
+
+    async def log(self, repo_path: Path, rev: str, skip: int, count: int) -> Dict[str, Any]:
+        """Unfiltered history from rev, in the CLI backend's record format"""
+        def render(repo) -> Dict[str, Any]:
+            start = repo.revparse_single(rev).peel(pygit2.Commit)
+            decorations = self._decorations(repo)
+            commits = []
+            # Topological first, like git log: tied commit times must not put a parent before its child.
+            walker = repo.walk(start.id, pygit2.GIT_SORT_TOPOLOGICAL | pygit2.GIT_SORT_TIME)
+            for position, commit in enumerate(walker):
+                if position < skip:
+                    continue
+                if len(commits) >= count:
+                    break
+                author = commit.author
+                date = datetime.fromtimestamp(author.time, timezone(timedelta(minutes=author.offset)))
+                commits.append(commit_record(
+                    str(commit.id), [str(p) for p in commit.parent_ids], author.name, date.isoformat(),
+                    ", ".join(decorations.get(commit.id, [])), commit.message.split("\n", 1)[0],
+                ))
+            return {"commits": commits, "start": str(start.id)}
+
+        return await self._run(repo_path, render)
+
+    async def branches(self, repo_path: Path) -> Dict[str, Any]:
+        def render(repo) -> str:
+            current = None if repo.head_is_detached else self._head_branch(repo)
+            lines = []
+            if repo.head_is_detached:
+                lines.append(f"* (HEAD detached at {str(repo.head.target)[:7]})")
+            for name in sorted(repo.branches.local):
+                lines.append(("* " if name == current else "  ") + name)
+            for name in sorted(repo.references):
+                if not name.startswith("refs/remotes/"):
+                    continue
+                target = repo.references[name].target
+                label = "remotes/" + name[len("refs/remotes/"):]
+                if isinstance(target, str):
+                    label += " -> " + target[len("refs/remotes/"):]
+                lines.append("  " + label)
+            return "\n".join(lines)
+
+        return await self._run(repo_path, render)
+
+    async def remotes(self, repo_path: Path) -> Dict[str, Any]:
+        def render(repo) -> str:
+            lines = []
+            for remote in repo.remotes:
+                lines.append(f"{remote.name}\t{remote.url} (fetch)")
+                lines.append(f"{remote.name}\t{remote.push_url or remote.url} (push)")
+            return "\n".join(lines)
+
+        return await self._run(repo_path, render)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": self.name, "open_repositories": len(self._repos), "opened": self.opened}
+
+
+def create_read_backend(choice: Optional[str] = None):
+    """
+    Backend for read-only tools, from GIT_READ_BACKEND: "auto" (pygit2 when
+    installed, else the CLI), "pygit2" or "cli". Porcelain commands always use the CLI.
+    """
+    choice = (choice or os.getenv("GIT_READ_BACKEND", "auto")).lower()
+    if choice in ("auto", "pygit2") and pygit2 is not None:
+        return Pygit2Backend()
+    if choice in ("auto", "pygit2"):
+        print(f"[Git] GIT_READ_BACKEND={choice} but pygit2 is not installed; read-only tools use the git CLI.")
+    return CliBackend()
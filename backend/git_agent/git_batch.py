@@ -0,0 +1,113 @@
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+from git_agent.git_backend import READ_ONLY_ENV, run_cli, timeout_for
+from git_agent.git_log import format_log, log_command, parse_log
+from git_agent.git_status import GIT_STATUS_MAX_PATHS, STATUS_COMMAND, format_status, parse_porcelain_v2
+from git_agent.repo_locks import is_read_only
+
+GIT_BATCH_MAX_OPERATIONS = int(os.getenv("GIT_BATCH_MAX_OPERATIONS", "20"))
+# Output lines kept per operation in the combined result
+BATCH_OUTPUT_LINES = int(os.getenv("GIT_BATCH_OUTPUT_LINES", "20"))
+
+BATCH_OPERATIONS = [
+    "add", "rm", "restore", "commit", "status", "diff", "log", "branch", "checkout",
+    "merge", "reset", "stash", "tag", "fetch", "pull", "push",
+]
+
+
+def _name(operation: Dict[str, Any], key: str, default: str = "") -> str:
+    """A ref, remote or tag argument; option-like values are rejected"""
+    value = str(operation.get(key) or default)
+    if not value:
+        raise ValueError(f"'{operation['op']}' needs '{key}'")
+    if value.startswith("-"):
+        raise ValueError(f"Invalid {key} '{value}'")
+    return value
+
+
+def _paths(operation: Dict[str, Any], required: bool = True) -> List[str]:
+    files = operation.get("files") or []
+    if isinstance(files, str):
+        files = files.replace(",", " ").split()
+    if required and not files:
+        raise ValueError(f"'{operation['op']}' needs 'files'")
+    return [str(f) for f in files]
+
+
+def batch_command(operation: Dict[str, Any]) -> List[str]:
+    """The git command line for one git_batch operation; ValueError when it is malformed"""
+    op = operation.get("op")
+    if op not in BATCH_OPERATIONS:
+        raise ValueError(f"Unknown operation '{op}'. Use: {', '.join(BATCH_OPERATIONS)}")
+    if op == "add":
+        return ["add", "--", *_paths(operation)]
+    if op == "rm":
+        return ["rm", "--", *_paths(operation)]
+    if op == "restore":
+        return ["restore", *(["--staged"] if operation.get("staged") else []), "--", *_paths(operation)]
+    if op == "commit":
+        if not operation.get("message"):
+            raise ValueError("'commit' needs 'message'")
+        return ["commit", *(["--all"] if operation.get("all") else []), "-m", str(operation["message"])]
+    if op == "status":
+        return list(STATUS_COMMAND)
+    if op == "diff":
+        return ["diff", "--stat", "--no-color", *(["--cached"] if operation.get("staged") else []), "--",
+                *_paths(operation, required=False)]
+    if op == "log":
+        return log_command("HEAD", 0, max(1, min(int(operation.get("count", 5)), 50)))
+    if op == "branch":
+        return ["branch", *(["-d"] if operation.get("delete") else []), _name(operation, "name")]
+    if op == "checkout":
+        return ["checkout", *(["-b"] if operation.get("create") else []), _name(operation, "branch"), "--"]
+    if op == "merge":
+        return ["merge", "--no-edit", _name(operation, "branch")]
+    if op == "reset":
+        mode = operation.get("mode", "mixed")
+        if mode not in ("soft", "mixed", "hard"):
+            raise ValueError(f"Invalid mode '{mode}'. Use: soft, mixed, hard")
+        return ["reset", f"--{mode}", _name(operation, "target", "HEAD"), "--"]
+    if op == "stash":
+        action = operation.get("action", "push")
+        if action not in ("push", "pop", "list", "drop"):
+            raise ValueError(f"Invalid stash action '{action}'. Use: push, pop, list, drop")
+        message = ["-m", str(operation["message"])] if action == "push" and operation.get("message") else []
+        return ["stash", action, *message]
+    if op == "tag":
+        message = ["-a", "-m", str(operation["message"])] if operation.get("message") else []
+        return ["tag", *message, _name(operation, "name")]
+    if op == "fetch":
+        return ["fetch", _name(operation, "remote", "origin")]
+    # pull / push
+    cmd = [op, _name(operation, "remote", "origin")]
+    return cmd + [_name(operation, "branch")] if operation.get("branch") else cmd
+
+
+def _truncate(text: str, max_lines: int = BATCH_OUTPUT_LINES) -> str:
+    lines = text.strip().splitlines()
+    if len(lines) > max_lines:
+        lines = lines[:max_lines] + [f"... {len(lines) - max_lines} more lines"]
+    return "\n".join(lines)
+
+
+async def run_operation(operation: Dict[str, Any], cmd: List[str], cwd: Path) -> Dict[str, Any]:
+    """
+    Run one operation's command (the caller holds the repository lock) and
+    put its compact rendering under "output". status and log are rendered
+    like the git_status and git_log tools.
+    """
+    env = READ_ONLY_ENV if is_read_only(cmd) else None
+    result = await run_cli(cmd, cwd, timeout_for(cmd), env=env)
+    if not result["success"]:
+        result["output"] = _truncate(result["stderr"] or f"exit code {result['returncode']}")
+    elif operation["op"] == "status":
+        max_paths = int(operation.get("max_paths", GIT_STATUS_MAX_PATHS))
+        result["output"] = format_status(parse_porcelain_v2(result["stdout"]), ".", max(0, max_paths))
+    elif operation["op"] == "log":
+        result["output"] = format_log(parse_log(result["stdout"]), "HEAD", None)
+    else:
+        # Many porcelain commands (checkout, push, pull) report on stderr only.
+        result["output"] = _truncate(result["stdout"] or result["stderr"])
+    return result
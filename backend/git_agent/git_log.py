@@ -0,0 +1,89 @@
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+GIT_LOG_MAX_COUNT = int(os.getenv("GIT_LOG_MAX_COUNT", "200"))
+# Changed paths listed per commit when stats are requested
+STAT_PATHS_PER_COMMIT = 5
+
+# One record per commit: separator, then hash, parents, author, date, decorations and subject
+LOG_FORMAT = "%x1e%H%x1f%P%x1f%an%x1f%aI%x1f%D%x1f%s"
+
+
+def log_command(rev: str, skip: int, count: int, author: str = "", since: str = "", until: str = "",
+                grep: str = "", pathspec: Sequence[str] = (), stats: bool = False) -> List[str]:
+    cmd = ["log", f"--format={LOG_FORMAT}", f"--skip={skip}", f"--max-count={count}"]
+    if author:
+        cmd.append(f"--author={author}")
+    if since:
+        cmd.append(f"--since={since}")
+    if until:
+        cmd.append(f"--until={until}")
+    if grep:
+        cmd += [f"--grep={grep}", "--regexp-ignore-case"]
+    if stats:
+        cmd.append("--numstat")
+    return cmd + [rev, "--", *pathspec]
+
+
+def commit_record(oid: str, parents: List[str], author: str, date: str, refs: str, subject: str) -> Dict[str, Any]:
+    return {"oid": oid, "parents": parents, "author": author, "date": date, "refs": refs, "subject": subject}
+
+
+def parse_log(output: str) -> List[Dict[str, Any]]:
+    """Parse log_command output into commit records (with "stats" when --numstat was given)"""
+    commits = []
+    for chunk in output.split("\x1e"):
+        if not chunk.strip():
+            continue
+        header, _, numstat = chunk.partition("\n")
+        oid, parents, author, date, refs, subject = header.split("\x1f", 5)
+        commit = commit_record(oid, parents.split(), author, date, refs, subject)
+        if numstat.strip():
+            files = []
+            for line in numstat.strip().splitlines():
+                added, deleted, path = line.split("\t", 2)
+                files.append((None if added == "-" else int(added), None if deleted == "-" else int(deleted), path))
+            commit["stats"] = files
+        commits.append(commit)
+    return commits
+
+
+def encode_cursor(start_oid: str, skip: int) -> str:
+    return f"{start_oid}.{skip}"
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """(commit the listing started from, commits already returned)"""
+    try:
+        start_oid, skip = cursor.split(".")
+        int(start_oid, 16)
+        return start_oid, int(skip)
+    except ValueError:
+        raise ValueError(f"Invalid cursor '{cursor}'")
+
+
+def format_commit(commit: Dict[str, Any]) -> str:
+    date = commit["date"][:16].replace("T", " ")
+    line = f"{commit['oid'][:10]} {date} {commit['author']}: {commit['subject']}"
+    if commit["refs"]:
+        line += f" ({commit['refs']})"
+    if len(commit["parents"]) > 1:
+        line += f" [merge of {' '.join(p[:10] for p in commit['parents'])}]"
+    if "stats" in commit:
+        files = commit["stats"]
+        added = sum(a or 0 for a, _, _ in files)
+        deleted = sum(d or 0 for _, d, _ in files)
+        paths = ", ".join(path for _, _, path in files[:STAT_PATHS_PER_COMMIT])
+        more = f" (+{len(files) - STAT_PATHS_PER_COMMIT} more)" if len(files) > STAT_PATHS_PER_COMMIT else ""
+        line += f"\n    +{added} -{deleted} in {len(files)} files: {paths}{more}"
+    return line
+
+
+def format_log(commits: List[Dict[str, Any]], label: str, next_cursor: Optional[str]) -> str:
+    if not commits:
+        return f"No commits found for {label}"
+    lines = [f"Git log for {label} ({len(commits)} commits, newest first):"]
+    lines += [format_commit(commit) for commit in commits]
+    if next_cursor:
+        lines.append(f"More commits: call git_log again with cursor='{next_cursor}'")
+    return "\n".join(lines)
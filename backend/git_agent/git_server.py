@@ -1,22 +1,73 @@
+import asyncio
 import os
-import subprocess
+import re
+import sys
+import time
 import uvicorn
 
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 # from mcp.server.fastmcp import FastMCP
-from fastmcp import FastMCP
+from fastmcp import FastMCP, Context
 from fastapi import FastAPI
 from starlette.applications import Starlette
 from starlette.routing import Route, Mount
 from mcp.server.sse import SseServerTransport
-from starlette.responses import Response
+from starlette.responses import Response, JSONResponse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from git_agent.git_backend import READ_ONLY_ENV, CliBackend, create_read_backend, run_cli, run_with_progress, timeout_for
+from git_agent.repo_locks import RepoLockManager, is_read_only, repo_root
+from git_agent.git_status import GIT_STATUS_MAX_PATHS, StatusCache, format_status
+from git_agent.fast_status import FastStatusManager
+from git_agent.git_log import GIT_LOG_MAX_COUNT, format_log
+from git_agent.git_log import decode_cursor as decode_log_cursor, encode_cursor as encode_log_cursor
+from git_agent.commit_graph import GRAPH_CHANGING_COMMANDS, CommitGraphKeeper
+from git_agent.clone_cache import MirrorCache, repository_name
+from git_agent.git_batch import GIT_BATCH_MAX_OPERATIONS, batch_command, run_operation
+from git_agent.repo_index import GIT_REPO_INDEX_ENABLED, GitWorkspaceFilter, RepositoryIndex, format_repositories
+from git_agent.maintenance import MaintenanceScheduler
+from git_agent.diff_pager import (
+    GIT_DIFF_MAX_BYTES, GIT_DIFF_MAX_LINES, DiffRequest, decode_cursor, estimated_patch_lines, render_patch, render_summary,
+)
+from file_agent.workspace_watcher import WorkspaceWatcher
 
 mcp = FastMCP("Git Server")
 
+# In-process engine for read-only tools when available; porcelain commands use the git CLI.
+read_backend = create_read_backend()
+# Scoped and fast-mode statuses need git itself (pathspecs, fsmonitor, untracked cache).
+cli_backend = read_backend if isinstance(read_backend, CliBackend) else CliBackend()
+# Reads of one repository run concurrently, writes to it one at a time; repositories are independent.
+repo_locks = RepoLockManager()
+commit_graph = CommitGraphKeeper(repo_locks)
+mirror_cache = MirrorCache(repo_locks)
+
 
 ALLOWED_BASE_DIR = Path(os.getenv("MCP_WORKSPACE_DIR", "/workspace")).resolve()
 ALLOWED_BASE_DIR.mkdir(parents=True, exist_ok=True)
+
+# Working-tree changes invalidate cached statuses; .git itself is covered by the index/HEAD stamps.
+STATUS_CACHE_ENABLED = os.getenv("GIT_STATUS_CACHE_ENABLED", "true").lower() == "true"
+status_cache = StatusCache()
+# Repositories in the workspace; the watcher also reports .git paths that add a repository or move HEAD.
+repo_index = RepositoryIndex(ALLOWED_BASE_DIR)
+workspace_watcher = WorkspaceWatcher(
+    ALLOWED_BASE_DIR,
+    debounce_ms=int(os.getenv("GIT_WATCH_DEBOUNCE_MS", "50")),
+    watch_filter=GitWorkspaceFilter(),
+)
+workspace_watcher.add_listener(status_cache.on_changes)
+workspace_watcher.add_listener(repo_index.on_changes)
+fast_status = FastStatusManager()
+
+
+def maintained_repositories() -> List[Path]:
+    """Indexed repositories with an object store of their own (worktrees share their main repository's)"""
+    return [entry["path"] for entry in repo_index.repositories() if entry["kind"] != "worktree"]
+
+
+maintenance = MaintenanceScheduler(repo_locks, maintained_repositories, commit_graph)
 def validate_path(path: str) -> Path:
     """Validate and resolve path within allowed directory"""
     try:
@@ -34,35 +85,26 @@ def validate_path(path: str) -> Path:
     except Exception as e:
         raise ValueError(f"Invalid path: {path} - {str(e)}")
 
-def run_git_command(cmd: List[str], cwd: Optional[Path] = None) -> Dict[str, Any]:
-    """Run a git command and return the result"""
+async def run_git_command(cmd: List[str], cwd: Optional[Path] = None) -> Dict[str, Any]:
+    """Run a git command under its repository's lock and return the result"""
     try:
         if cwd is None:
             cwd = ALLOWED_BASE_DIR
         
         cwd = validate_path(str(cwd))
-        
-        result = subprocess.run(
-            ["git"] + cmd,
-            cwd=cwd,
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
-        
-        return {
-            "success": result.returncode == 0,
-            "stdout": result.stdout.strip(),
-            "stderr": result.stderr.strip(),
-            "returncode": result.returncode
-        }
-    except subprocess.TimeoutExpired:
-        return {
-            "success": False,
-            "stdout": "",
-            "stderr": "Command timed out",
-            "returncode": -1
-        }
+        repo = repo_root(cwd)
+        if is_read_only(cmd):
+            async with repo_locks.read(repo):
+                return await run_cli(cmd, cwd, timeout_for(cmd), env=READ_ONLY_ENV)
+        async with repo_locks.write(repo):
+            try:
+                result = await run_cli(cmd, cwd, timeout_for(cmd))
+            finally:
+                status_cache.invalidate(repo)
+                repo_index.mark_stale(repo)
+        if result["success"] and cmd[0] in GRAPH_CHANGING_COMMANDS:
+            commit_graph.mark_stale(repo)
+        return result
     except Exception as e:
         return {
             "success": False,
@@ -71,14 +113,21 @@ def run_git_command(cmd: List[str], cwd: Optional[Path] = None) -> Dict[str, Any
             "returncode": -1
         }
 
+async def read_repo(repo_path: Path, operation, *args) -> Dict[str, Any]:
+    """Run a read_backend operation under the repository's shared lock"""
+    async with repo_locks.read(repo_root(repo_path)):
+        return await operation(repo_path, *args)
+
 @mcp.tool("git_init")
-def git_init(path: str = ".") -> str:
+async def git_init(path: str = ".") -> str:
     """Initialize a new Git repository"""
     try:
         repo_path = validate_path(path)
         repo_path.mkdir(parents=True, exist_ok=True)
         
-        result = run_git_command(["init"], cwd=repo_path)
+        result = await run_git_command(["init"], cwd=repo_path)
+        read_backend.forget(repo_path)
+        fast_status.forget(repo_path)
         
         if result["success"]:
             return f"Initialized Git repository in {path}\n{result['stdout']}"
@@ -87,45 +136,163 @@ def git_init(path: str = ".") -> str:
     except Exception as e:
         return f"Error: {str(e)}"
 
+# Share of a clone's progress each git phase accounts for
+CLONE_PHASES = {
+    "Counting objects": (0, 5), "Compressing objects": (5, 10), "Receiving objects": (10, 80),
+    "Resolving deltas": (80, 95), "Updating files": (95, 100), "Checking out files": (95, 100),
+}
+PARTIAL_CLONE_FILTER = re.compile(r"blob:none|blob:limit=\d+[kmg]?|tree:\d+")
+
+def clone_progress(ctx: Optional[Context], low: float, high: float):
+    """on_progress callback reporting git's phases as MCP progress between low and high percent"""
+    reported = [low]
+
+    async def report(phase: str, percent: int, line: str) -> None:
+        if ctx is None:
+            return
+        start, end = CLONE_PHASES.get(phase, (0, 100))
+        progress = low + (high - low) * (start + (end - start) * percent / 100) / 100
+        reported[0] = max(reported[0], progress)
+        await ctx.report_progress(round(reported[0], 1), 100, line)
+
+    return report
+
 @mcp.tool("git_clone")
-def git_clone(url: str, directory: str = None) -> str:
-    """Clone a Git repository"""
+async def git_clone(url: str, directory: Optional[str] = None, depth: int = 0, filter: str = "", branch: str = "",
+                    single_branch: bool = False, sparse: Optional[List[str]] = None, use_mirror: bool = True,
+                    ctx: Context = None) -> str:
+    """
+    Clone a Git repository. depth > 0 makes a shallow clone, filter a partial clone (e.g. 'blob:none'),
+    branch/single_branch limit what is fetched and sparse checks out only the listed directories.
+    Objects come from the server's mirror of the upstream when available (use_mirror); progress is reported.
+    """
     try:
-        cmd = ["clone", url]
-        if directory:
-            cmd.append(directory)
-            target_path = validate_path(directory)
-        else:
-            target_path = ALLOWED_BASE_DIR
-        
-        result = run_git_command(cmd, cwd=ALLOWED_BASE_DIR)
+        if not url or url.startswith("-"):
+            return f"Error: Invalid repository URL '{url}'"
+        if filter and not PARTIAL_CLONE_FILTER.fullmatch(filter):
+            return f"Error: Unsupported filter '{filter}'. Use: blob:none, blob:limit=<size>, tree:<depth>"
+        destination = validate_path(directory or repository_name(url))
+        if destination.exists() and any(destination.iterdir()):
+            return f"Error: Destination {destination} already exists and is not empty"
+        
+        mirror = None
+        if use_mirror:
+            # Full clones create the mirror; shallow and partial clones only reuse one that exists.
+            mirror = await mirror_cache.prepare(url, create=not (depth or filter), on_progress=clone_progress(ctx, 0, 50))
+        cmd = ["clone", "--progress"]
+        if mirror:
+            cmd += ["--reference", str(mirror), "--dissociate"]
+        if depth > 0:
+            cmd.append(f"--depth={depth}")
+        if filter:
+            cmd.append(f"--filter={filter}")
+        if branch:
+            cmd += ["--branch", branch]
+        if single_branch:
+            cmd.append("--single-branch")
+        sparse_dirs = [d for d in (sparse or []) if d]
+        if sparse_dirs:
+            cmd.append("--sparse")
+        cmd += ["--", url, str(destination)]
+        
+        started = time.monotonic()
+        # Lock the clone's destination, not the workspace, so clones of different repositories run in parallel.
+        async with repo_locks.write(destination):
+            result = await run_with_progress(cmd, ALLOWED_BASE_DIR, clone_progress(ctx, 50 if mirror else 0, 100))
+            if result["success"] and sparse_dirs:
+                sparse_result = await run_cli(["sparse-checkout", "set", "--cone", "--", *sparse_dirs], destination, timeout_for(cmd))
+                if not sparse_result["success"]:
+                    result = sparse_result
+        read_backend.forget(destination)
+        fast_status.forget(destination)
+        status_cache.invalidate(destination)
+        repo_index.mark_rescan()
         
         if result["success"]:
-            return f"Successfully cloned repository from {url}\n{result['stdout']}"
+            commit_graph.mark_stale(destination)
+            source = f" (objects from mirror {mirror.name})" if mirror else ""
+            return f"Successfully cloned repository from {url} into {destination} in {time.monotonic() - started:.1f}s{source}\n{result['stderr']}"
         else:
             return f"Error cloning repository: {result['stderr']}"
     except Exception as e:
         return f"Error: {str(e)}"
 
+async def compute_status(repo: Path, repo_path: Path, pathspec: List[str], scope: tuple, fast: bool) -> Dict[str, Any]:
+    """Run status under the repository's shared lock and cache it; "seconds" holds how long it took"""
+    backend = cli_backend if fast or pathspec else read_backend
+    async with repo_locks.read(repo):
+        token = status_cache.begin(repo)
+        started = time.monotonic()
+        if backend is cli_backend:
+            result = await cli_backend.status(repo_path if pathspec else repo, pathspec, refresh_index=fast)
+        else:
+            result = await backend.status(repo)
+        result["seconds"] = time.monotonic() - started
+    if result["success"]:
+        fast_status.record(repo, result["seconds"])
+        status_cache.put(repo, token, result["status"], result["seconds"], scope=scope, restamp=fast)
+    return result
+
 @mcp.tool("git_status")
-def git_status(path: str = ".") -> str:
-    """Get Git repository status"""
+async def git_status(path: str = ".", pathspec: Optional[List[str]] = None, max_paths: int = GIT_STATUS_MAX_PATHS,
+                     refresh: bool = False) -> str:
+    """
+    Get Git repository status: branch, change counts and up to max_paths changed paths.
+    pathspec limits the status to paths relative to path; refresh bypasses the cache.
+    """
     try:
         repo_path = validate_path(path)
-        result = run_git_command(["status", "--porcelain", "-b"], cwd=repo_path)
-        
-        if result["success"]:
-            if result["stdout"]:
-                return f"Git status for {path}:\n{result['stdout']}"
-            else:
-                return f"Working directory clean in {path}"
+        repo = repo_root(repo_path)
+        pathspec = [p for p in (pathspec or []) if p]
+        scope = (str(repo_path.relative_to(repo)), *pathspec) if pathspec else ()
+        fast = await fast_status.prepare(repo, run_git_command)
+        status = None if refresh else status_cache.get(repo, scope)
+        if status is None:
+            result = await compute_status(repo, repo_path, pathspec, scope, fast)
+            if not result["success"]:
+                return f"Error getting status: {result['stderr']}"
+            status = result["status"]
+            timing = f"Status took {result['seconds'] * 1000:.0f} ms" + (" (fast mode)" if fast else "")
         else:
-            return f"Error getting status: {result['stderr']}"
+            timing = "Status served from cache"
+        label = f"{path} ({' '.join(pathspec)})" if pathspec else path
+        return f"{format_status(status, label, max(0, max_paths))}\n{timing}"
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+# Statuses list_repositories computes at a time
+REPO_STATUS_CONCURRENCY = 4
+
+@mcp.tool("list_repositories")
+async def list_repositories(path: str = ".", dirty: bool = True) -> str:
+    """
+    List the Git repositories under path (default: the whole workspace), including worktrees and
+    submodules, with their kind, current branch and HEAD commit. dirty adds whether each has
+    uncommitted changes (served from the status cache where possible). Use it to find a repository's path.
+    """
+    try:
+        below = validate_path(path)
+        entries = await asyncio.to_thread(repo_index.repositories, below)
+        statuses: Dict[str, Optional[Dict[str, Any]]] = {}
+        if dirty:
+            limit = asyncio.Semaphore(REPO_STATUS_CONCURRENCY)
+
+            async def status_of(repo: Path) -> None:
+                status = status_cache.get(repo)
+                if status is None:
+                    async with limit:
+                        fast = await fast_status.prepare(repo, run_git_command)
+                        result = await compute_status(repo, repo, [], (), fast)
+                    status = result["status"] if result["success"] else None
+                statuses[str(repo)] = status
+
+            await asyncio.gather(*(status_of(entry["path"]) for entry in entries))
+        return format_repositories(entries, ALLOWED_BASE_DIR, statuses)
     except Exception as e:
         return f"Error: {str(e)}"
 
 @mcp.tool("git_add")
-def git_add(files: str, path: str = ".") -> str:
+async def git_add(files: str, path: str = ".") -> str:
     """Add files to Git staging area"""
     try:
         repo_path = validate_path(path)
@@ -139,7 +306,7 @@ def git_add(files: str, path: str = ".") -> str:
             file_list = [f.strip() for f in files.replace(",", " ").split()]
             cmd = ["add"] + file_list
         
-        result = run_git_command(cmd, cwd=repo_path)
+        result = await run_git_command(cmd, cwd=repo_path)
         
         if result["success"]:
             return f"Successfully added files: {files}\n{result['stdout']}"
@@ -149,11 +316,11 @@ def git_add(files: str, path: str = ".") -> str:
         return f"Error: {str(e)}"
 
 @mcp.tool("git_commit")
-def git_commit(message: str, path: str = ".") -> str:
+async def git_commit(message: str, path: str = ".") -> str:
     """Commit changes to Git repository"""
     try:
         repo_path = validate_path(path)
-        result = run_git_command(["commit", "-m", message], cwd=repo_path)
+        result = await run_git_command(["commit", "-m", message], cwd=repo_path)
         
         if result["success"]:
             return f"Successfully committed changes: {message}\n{result['stdout']}"
@@ -163,11 +330,11 @@ def git_commit(message: str, path: str = ".") -> str:
         return f"Error: {str(e)}"
 
 @mcp.tool("git_push")
-def git_push(remote: str = "origin", branch: str = "main", path: str = ".") -> str:
+async def git_push(remote: str = "origin", branch: str = "main", path: str = ".") -> str:
     """Push changes to remote repository"""
     try:
         repo_path = validate_path(path)
-        result = run_git_command(["push", remote, branch], cwd=repo_path)
+        result = await run_git_command(["push", remote, branch], cwd=repo_path)
         
         if result["success"]:
             return f"Successfully pushed to {remote}/{branch}\n{result['stdout']}"
@@ -177,11 +344,11 @@ def git_push(remote: str = "origin", branch: str = "main", path: str = ".") -> s
         return f"Error: {str(e)}"
 
 @mcp.tool("git_pull")
-def git_pull(remote: str = "origin", branch: str = "main", path: str = ".") -> str:
+async def git_pull(remote: str = "origin", branch: str = "main", path: str = ".") -> str:
     """Pull changes from remote repository"""
     try:
         repo_path = validate_path(path)
-        result = run_git_command(["pull", remote, branch], cwd=repo_path)
+        result = await run_git_command(["pull", remote, branch], cwd=repo_path)
         
         if result["success"]:
             return f"Successfully pulled from {remote}/{branch}\n{result['stdout']}"
@@ -191,25 +358,25 @@ def git_pull(remote: str = "origin", branch: str = "main", path: str = ".") -> s
         return f"Error: {str(e)}"
 
 @mcp.tool("git_branch")
-def git_branch(action: str = "list", branch_name: str = "", path: str = ".") -> str:
+async def git_branch(action: str = "list", branch_name: str = "", path: str = ".") -> str:
     """Manage Git branches (list, create, delete, switch)"""
     try:
         repo_path = validate_path(path)
         
         if action == "list":
-            result = run_git_command(["branch", "-a"], cwd=repo_path)
+            result = await read_repo(repo_path, read_backend.branches)
         elif action == "create":
             if not branch_name:
                 return "Error: Branch name required for create action"
-            result = run_git_command(["branch", branch_name], cwd=repo_path)
+            result = await run_git_command(["branch", branch_name], cwd=repo_path)
         elif action == "delete":
             if not branch_name:
                 return "Error: Branch name required for delete action"
-            result = run_git_command(["branch", "-d", branch_name], cwd=repo_path)
+            result = await run_git_command(["branch", "-d", branch_name], cwd=repo_path)
         elif action == "switch" or action == "checkout":
             if not branch_name:
                 return "Error: Branch name required for switch action"
-            result = run_git_command(["checkout", branch_name], cwd=repo_path)
+            result = await run_git_command(["checkout", branch_name], cwd=repo_path)
         else:
             return f"Error: Unknown action '{action}'. Use: list, create, delete, switch"
         
@@ -221,65 +388,115 @@ def git_branch(action: str = "list", branch_name: str = "", path: str = ".") ->
         return f"Error: {str(e)}"
 
 @mcp.tool("git_log")
-def git_log(count: int = 10, path: str = ".") -> str:
-    """Show Git commit history"""
+async def git_log(count: int = 10, path: str = ".", cursor: str = "", ref: str = "HEAD",
+                  pathspec: Optional[List[str]] = None, author: str = "", since: str = "", until: str = "",
+                  grep: str = "", stats: bool = False) -> str:
+    """
+    Show Git commit history newest first, one compact record per commit (hash, date, author, subject, refs,
+    merge parents). Filter by pathspec (relative to path), author, since/until (e.g. '2 weeks ago') and grep
+    (commit message); stats adds line counts and changed files. For older commits pass the cursor from the
+    previous answer together with the same filters.
+    """
     try:
         repo_path = validate_path(path)
-        result = run_git_command([
-            "log", 
-            f"--max-count={count}", 
-            "--oneline", 
-            "--graph", 
-            "--decorate"
-        ], cwd=repo_path)
+        repo = repo_root(repo_path)
+        count = max(1, min(count, GIT_LOG_MAX_COUNT))
+        skip = 0
+        if cursor:
+            # The cursor pins the first page's starting commit, so new commits do not shift later pages.
+            ref, skip = decode_log_cursor(cursor)
+        if not ref or ref.startswith("-"):
+            return f"Error: Invalid ref '{ref}'"
+        filters = {
+            "author": author, "since": since, "until": until, "grep": grep,
+            "pathspec": [p for p in (pathspec or []) if p], "stats": stats,
+        }
+        commit_graph.ensure(repo)
         
-        if result["success"]:
-            return f"Git log (last {count} commits):\n{result['stdout']}"
-        else:
+        async with repo_locks.read(repo):
+            # One extra commit tells whether there is another page.
+            if any(filters.values()):
+                result = await cli_backend.log(repo_path, ref, skip, count + 1, **filters)
+            else:
+                result = await read_backend.log(repo_path, ref, skip, count + 1)
+        
+        if not result["success"]:
             return f"Error getting log: {result['stderr']}"
+        commits = result["commits"]
+        next_cursor = encode_log_cursor(result["start"], skip + count) if len(commits) > count else None
+        label = path if ref == "HEAD" else f"{path} at {ref[:10] if cursor else ref}"
+        return format_log(commits[:count], label, next_cursor)
     except Exception as e:
         return f"Error: {str(e)}"
 
+async def is_revision(name: str, cwd: Path) -> bool:
+    """Whether a git_diff 'file' argument names a revision (or range) rather than a path"""
+    if (cwd / name).exists():
+        return False
+    if ".." in name:
+        return True
+    result = await run_cli(["rev-parse", "--verify", "--quiet", f"{name}^{{commit}}"], cwd, env=READ_ONLY_ENV)
+    return result["success"]
+
 @mcp.tool("git_diff")
-def git_diff(file: str = "", staged: bool = False, path: str = ".") -> str:
-    """Show Git differences"""
+async def git_diff(file: str = "", staged: bool = False, path: str = ".", pathspec: Optional[List[str]] = None,
+                   mode: str = "auto", cursor: str = "", max_lines: int = GIT_DIFF_MAX_LINES,
+                   max_bytes: int = GIT_DIFF_MAX_BYTES, include_generated: bool = False) -> str:
+    """
+    Show Git differences. mode "summary" lists changed files with line counts, "patch" returns hunks
+    paged by max_lines/max_bytes, "auto" returns the patch when it fits one page and the summary otherwise.
+    file is a path or a revision (range); pathspec limits paths (relative to path). Binary and generated
+    files (lock files, minified bundles) are left out of patches unless include_generated is set.
+    Pass the cursor from a previous answer to get the next page.
+    """
     try:
+        if mode not in ("auto", "summary", "patch"):
+            return f"Error: Unknown mode '{mode}'. Use: auto, summary, patch"
         repo_path = validate_path(path)
-        
-        cmd = ["diff"]
-        if staged:
-            cmd.append("--cached")
+        repo = repo_root(repo_path)
+        revisions, paths = [], [p for p in (pathspec or []) if p]
         if file:
-            cmd.append(file)
-        
-        result = run_git_command(cmd, cwd=repo_path)
-        
-        if result["success"]:
-            if result["stdout"]:
-                return f"Git diff:\n{result['stdout']}"
+            if await is_revision(file, repo_path):
+                revisions.append(file)
             else:
+                paths.insert(0, file)
+        request = DiffRequest(repo_path, revisions, paths, staged, include_generated, max(1, max_lines), max(1, max_bytes))
+        
+        async with repo_locks.read(repo):
+            files, digest = await request.files()
+            if not files:
                 return "No differences found"
-        else:
-            return f"Error getting diff: {result['stderr']}"
+            start = start_line = 0
+            if cursor:
+                mode, start, start_line, cursor_digest = decode_cursor(cursor)
+                if cursor_digest != digest:
+                    return "Error: The diff changed since this cursor was issued; call git_diff again without cursor"
+            elif mode == "auto":
+                fits = estimated_patch_lines(request.patched(files)) <= request.max_lines
+                mode = "patch" if fits else "summary"
+            
+            if mode == "summary":
+                return render_summary(request, files, digest, start)
+            return await render_patch(request, files, digest, start, start_line)
     except Exception as e:
-        return f"Error: {str(e)}"
+        return f"Error getting diff: {str(e)}"
 
 @mcp.tool("git_remote")
-def git_remote(action: str = "list", name: str = "", url: str = "", path: str = ".") -> str:
+async def git_remote(action: str = "list", name: str = "", url: str = "", path: str = ".") -> str:
     """Manage Git remotes"""
     try:
         repo_path = validate_path(path)
         
         if action == "list":
-            result = run_git_command(["remote", "-v"], cwd=repo_path)
+            result = await read_repo(repo_path, read_backend.remotes)
         elif action == "add":
             if not name or not url:
                 return "Error: Both name and URL required for add action"
-            result = run_git_command(["remote", "add", name, url], cwd=repo_path)
+            result = await run_git_command(["remote", "add", name, url], cwd=repo_path)
         elif action == "remove":
             if not name:
                 return "Error: Remote name required for remove action"
-            result = run_git_command(["remote", "remove", name], cwd=repo_path)
+            result = await run_git_command(["remote", "remove", name], cwd=repo_path)
         else:
             return f"Error: Unknown action '{action}'. Use: list, add, remove"
         
@@ -291,7 +508,7 @@ def git_remote(action: str = "list", name: str = "", url: str = "", path: str =
         return f"Error: {str(e)}"
 
 @mcp.tool("git_stash")
-def git_stash(action: str = "save", message: str = "", path: str = ".") -> str:
+async def git_stash(action: str = "save", message: str = "", path: str = ".") -> str:
     """Manage Git stash"""
     try:
         repo_path = validate_path(path)
@@ -311,7 +528,7 @@ def git_stash(action: str = "save", message: str = "", path: str = ".") -> str:
         else:
             return f"Error: Unknown action '{action}'. Use: save, pop, list, drop, clear"
         
-        result = run_git_command(cmd, cwd=repo_path)
+        result = await run_git_command(cmd, cwd=repo_path)
         
         if result["success"]:
             return f"Stash operation '{action}' completed:\n{result['stdout']}"
@@ -321,11 +538,11 @@ def git_stash(action: str = "save", message: str = "", path: str = ".") -> str:
         return f"Error: {str(e)}"
 
 @mcp.tool("git_merge")
-def git_merge(branch: str, path: str = ".") -> str:
+async def git_merge(branch: str, path: str = ".") -> str:
     """Merge a branch into current branch"""
     try:
         repo_path = validate_path(path)
-        result = run_git_command(["merge", branch], cwd=repo_path)
+        result = await run_git_command(["merge", branch], cwd=repo_path)
         
         if result["success"]:
             return f"Successfully merged branch '{branch}':\n{result['stdout']}"
@@ -335,7 +552,7 @@ def git_merge(branch: str, path: str = ".") -> str:
         return f"Error: {str(e)}"
 
 @mcp.tool("git_reset")
-def git_reset(mode: str = "mixed", target: str = "HEAD", path: str = ".") -> str:
+async def git_reset(mode: str = "mixed", target: str = "HEAD", path: str = ".") -> str:
     """Reset Git repository state"""
     try:
         repo_path = validate_path(path)
@@ -344,7 +561,7 @@ def git_reset(mode: str = "mixed", target: str = "HEAD", path: str = ".") -> str
         if mode not in valid_modes:
             return f"Error: Invalid mode '{mode}'. Use: {', '.join(valid_modes)}"
         
-        result = run_git_command(["reset", f"--{mode}", target], cwd=repo_path)
+        result = await run_git_command(["reset", f"--{mode}", target], cwd=repo_path)
         
         if result["success"]:
             return f"Successfully reset to {target} ({mode} mode):\n{result['stdout']}"
@@ -354,7 +571,7 @@ def git_reset(mode: str = "mixed", target: str = "HEAD", path: str = ".") -> str
         return f"Error: {str(e)}"
 
 @mcp.tool("git_config")
-def git_config(action: str = "list", key: str = "", value: str = "", global_config: bool = False, path: str = ".") -> str:
+async def git_config(action: str = "list", key: str = "", value: str = "", global_config: bool = False, path: str = ".") -> str:
     """Manage Git configuration"""
     try:
         repo_path = validate_path(path)
@@ -378,7 +595,7 @@ def git_config(action: str = "list", key: str = "", value: str = "", global_conf
         else:
             return f"Error: Unknown action '{action}'. Use: list, get, set"
         
-        result = run_git_command(cmd, cwd=repo_path)
+        result = await run_git_command(cmd, cwd=repo_path)
         
         if result["success"]:
             return f"Config operation '{action}' completed:\n{result['stdout']}"
@@ -387,6 +604,59 @@ def git_config(action: str = "list", key: str = "", value: str = "", global_conf
     except Exception as e:
         return f"Error: {str(e)}"
 
+@mcp.tool("git_batch")
+async def git_batch(operations: List[Dict[str, Any]], path: str = ".") -> str:
+    """
+    Run an ordered list of operations on one repository in a single call, e.g.
+    [{"op": "add", "files": ["a.py"]}, {"op": "commit", "message": "..."}, {"op": "status"}].
+    Operations: add/rm {files}, restore {files, staged}, commit {message, all}, status {max_paths},
+    diff {staged, files}, log {count}, branch {name, delete}, checkout {branch, create}, merge {branch},
+    reset {mode, target}, stash {action, message}, tag {name, message}, fetch/pull/push {remote, branch}.
+    The batch holds the repository lock throughout and stops at the first failing operation.
+    """
+    try:
+        repo_path = validate_path(path)
+        repo = repo_root(repo_path)
+        if not operations:
+            return "Error: No operations given"
+        if len(operations) > GIT_BATCH_MAX_OPERATIONS:
+            return f"Error: At most {GIT_BATCH_MAX_OPERATIONS} operations per batch"
+        # Validate everything up front so a malformed operation does not leave the batch half done.
+        commands = []
+        for number, operation in enumerate(operations, 1):
+            try:
+                commands.append(batch_command(operation))
+            except ValueError as e:
+                return f"Error in operation {number}: {e}"
+        writes = not all(is_read_only(cmd) for cmd in commands)
+        
+        started = time.monotonic()
+        lines, succeeded, graph_changed = [], 0, False
+        async with (repo_locks.write(repo) if writes else repo_locks.read(repo)):
+            try:
+                for number, (operation, cmd) in enumerate(zip(operations, commands), 1):
+                    result = await run_operation(operation, cmd, repo_path)
+                    state = "ok" if result["success"] else "FAILED"
+                    lines.append(f"[{number}] {operation['op']}: {state}")
+                    if result["output"]:
+                        lines.append("    " + result["output"].replace("\n", "\n    "))
+                    if not result["success"]:
+                        lines += [f"[{n}] {op['op']}: skipped" for n, op in enumerate(operations[number:], number + 1)]
+                        break
+                    succeeded += 1
+                    graph_changed = graph_changed or cmd[0] in GRAPH_CHANGING_COMMANDS
+            finally:
+                if writes:
+                    status_cache.invalidate(repo)
+                    repo_index.mark_stale(repo)
+        if graph_changed:
+            commit_graph.mark_stale(repo)
+        
+        header = f"git_batch in {path}: {succeeded}/{len(operations)} operations succeeded ({time.monotonic() - started:.1f}s)"
+        return "\n".join([header, *lines])
+    except Exception as e:
+        return f"Error: {str(e)}"
+
 transport = SseServerTransport("/mcp-messages/")
 
 async def handle_sse_handshake(request):
@@ -408,15 +678,46 @@ async def handle_sse_handshake(request):
     finally:
         return Response(status_code=200, content="SSE connection closed.")
 
+async def handle_metrics(request):
+    """Expose server-side runtime statistics"""
+    return JSONResponse({
+        "read_backend": read_backend.stats(),
+        "locks": repo_locks.stats(),
+        "status_cache": status_cache.stats(),
+        "fast_status": fast_status.stats(),
+        "commit_graph": commit_graph.stats(),
+        "mirror_cache": mirror_cache.stats(),
+        "repo_index": repo_index.stats(),
+        "maintenance": maintenance.stats(),
+        "watcher": workspace_watcher.stats(),
+    })
+
 sse_app = Starlette(
     routes=[
         Route("/mcp-sse", handle_sse_handshake, methods=["GET"]),
+        Route("/metrics", handle_metrics, methods=["GET"]),
         
         Mount("/mcp-messages/", app=transport.handle_post_message)
     ]
 )
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    if GIT_REPO_INDEX_ENABLED:
+        await asyncio.to_thread(repo_index.scan)
+    if STATUS_CACHE_ENABLED or GIT_REPO_INDEX_ENABLED:
+        workspace_watcher.start()
+        status_cache.trust_watcher = STATUS_CACHE_ENABLED
+        repo_index.trust_watcher = GIT_REPO_INDEX_ENABLED
+    maintenance.start()
+    yield
+    await maintenance.stop()
+    status_cache.trust_watcher = False
+    repo_index.trust_watcher = False
+    await workspace_watcher.stop()
+    await commit_graph.aclose()
+
+app = FastAPI(lifespan=lifespan)
 app.mount("/", sse_app)
 
 if __name__ == "__main__":
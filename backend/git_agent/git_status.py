@@ -0,0 +1,197 @@
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+GIT_STATUS_MAX_PATHS = int(os.getenv("GIT_STATUS_MAX_PATHS", "50"))
+
+STATUS_COMMAND = ["status", "--porcelain=v2", "--branch", "-z"]
+
+# (XY code in `git status --short` style, path, original path of a rename or copy)
+StatusEntry = Tuple[str, str, Optional[str]]
+
+
+def summarize(branch: Optional[str], oid: Optional[str], upstream: Optional[str],
+              ahead: int, behind: int, entries: List[StatusEntry]) -> Dict[str, Any]:
+    """The structured status both read backends return"""
+    counts = {"staged": 0, "unstaged": 0, "untracked": 0, "conflicted": 0}
+    for code, _, _ in entries:
+        if code == "??":
+            counts["untracked"] += 1
+        elif "U" in code or code in ("AA", "DD"):
+            counts["conflicted"] += 1
+        else:
+            counts["staged"] += code[0] != " "
+            counts["unstaged"] += code[1] != " "
+    return {
+        "branch": branch, "oid": oid, "upstream": upstream, "ahead": ahead, "behind": behind,
+        "counts": counts, "entries": entries,
+    }
+
+
+def parse_porcelain_v2(output: str) -> Dict[str, Any]:
+    """Parse `git status --porcelain=v2 --branch -z` output"""
+    branch = oid = upstream = None
+    ahead = behind = 0
+    entries: List[StatusEntry] = []
+    records = output.split("\0")
+    i = 0
+    while i < len(records):
+        record = records[i]
+        i += 1
+        if not record:
+            continue
+        kind = record[0]
+        if kind == "#":
+            _, key, value = record.split(" ", 2)
+            if key == "branch.head":
+                branch = None if value == "(detached)" else value
+            elif key == "branch.oid":
+                oid = None if value == "(initial)" else value
+            elif key == "branch.upstream":
+                upstream = value
+            elif key == "branch.ab":
+                a, b = value.split()
+                ahead, behind = int(a), -int(b)
+        elif kind == "1":
+            fields = record.split(" ", 8)
+            entries.append((fields[1].replace(".", " "), fields[8], None))
+        elif kind == "2":
+            fields = record.split(" ", 9)
+            # -z puts the original path of a rename in the next record.
+            entries.append((fields[1].replace(".", " "), fields[9], records[i]))
+            i += 1
+        elif kind == "u":
+            fields = record.split(" ", 10)
+            entries.append((fields[1], fields[10], None))
+        elif kind == "?":
+            entries.append(("??", record[2:], None))
+    return summarize(branch, oid, upstream, ahead, behind, entries)
+
+
+def format_status(status: Dict[str, Any], label: str, max_paths: int = GIT_STATUS_MAX_PATHS) -> str:
+    """Compact rendering for the LLM: branch line, counts, then at most max_paths entries"""
+    if status["branch"] is None:
+        head = f"HEAD detached at {status['oid'][:7]}" if status["oid"] else "HEAD (no branch)"
+    else:
+        head = f"branch {status['branch']}" + ("" if status["oid"] else " (no commits yet)")
+    if status["upstream"]:
+        head += f"...{status['upstream']}"
+        drift = [f"{name} {status[name]}" for name in ("ahead", "behind") if status[name]]
+        if drift:
+            head += f" [{', '.join(drift)}]"
+    entries = status["entries"]
+    if not entries:
+        return f"Working directory clean in {label} ({head})"
+
+    counts = ", ".join(f"{name} {count}" for name, count in status["counts"].items())
+    lines = [f"Git status for {label}: {head}", counts]
+    for code, path, orig_path in entries[:max_paths]:
+        lines.append(f"{code} {orig_path} -> {path}" if orig_path else f"{code} {path}")
+    if len(entries) > max_paths:
+        lines.append(f"... {len(entries) - max_paths} more paths not shown (raise max_paths to see them)")
+    return "\n".join(lines)
+
+
+def git_dirs(repo: Path) -> Tuple[Path, Path]:
+    """(git dir, common dir) of a working tree; they differ for linked worktrees"""
+    git_dir = repo / ".git"
+    if git_dir.is_file():
+        pointer = git_dir.read_text().strip()
+        if pointer.startswith("gitdir:"):
+            git_dir = (repo / pointer[len("gitdir:"):].strip()).resolve()
+    common = git_dir
+    commondir_file = git_dir / "commondir"
+    if commondir_file.is_file():
+        common = (git_dir / commondir_file.read_text().strip()).resolve()
+    return git_dir, common
+
+
+def _mtime(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def repository_stamp(repo: Path) -> Tuple[int, ...]:
+    """
+    mtimes of the files a status depends on outside the working tree: the
+    index, HEAD, the branch HEAD points to, packed refs and FETCH_HEAD (upstream drift)
+    """
+    git_dir, common = git_dirs(repo)
+    head = git_dir / "HEAD"
+    files = [git_dir / "index", head, common / "packed-refs", git_dir / "FETCH_HEAD"]
+    try:
+        target = head.read_text().strip()
+        if target.startswith("ref: "):
+            files.append(common / target[len("ref: "):])
+    except OSError:
+        pass
+    return tuple(_mtime(f) for f in files)
+
+
+class StatusCache:
+    """
+    Structured status per repository and pathspec scope, reused while its
+    repository stamp is unchanged and the workspace watcher saw no
+    working-tree change below it. Without a running watcher (trust_watcher
+    False) nothing is reused, since edits to tracked or untracked files would
+    go unnoticed. An edit is seen once the watcher reports it, i.e. after its
+    debounce interval.
+    """
+
+    def __init__(self):
+        self.trust_watcher = False
+        self._entries: Dict[str, Dict[Tuple[str, ...], Tuple[Tuple[int, ...], Dict[str, Any]]]] = {}
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.refresh_seconds = 0.0
+
+    def get(self, repo: Path, scope: Tuple[str, ...] = ()) -> Optional[Dict[str, Any]]:
+        cached = self._entries.get(str(repo), {}).get(scope) if self.trust_watcher else None
+        if cached is not None and cached[0] == repository_stamp(repo):
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        return None
+
+    def begin(self, repo: Path) -> Tuple[Tuple[int, ...], int]:
+        """Token to take before computing a status, so that changes racing the computation void it"""
+        return repository_stamp(repo), self._generations.setdefault(str(repo), 0)
+
+    def put(self, repo: Path, token: Tuple[Tuple[int, ...], int], status: Dict[str, Any], seconds: float,
+            scope: Tuple[str, ...] = (), restamp: bool = False) -> None:
+        """restamp: the status itself may have rewritten the index (untracked cache, fsmonitor token)"""
+        self.refresh_seconds += seconds
+        stamp, generation = token
+        if self.trust_watcher and generation == self._generations.get(str(repo), 0):
+            self._entries.setdefault(str(repo), {})[scope] = (repository_stamp(repo) if restamp else stamp, status)
+
+    def invalidate(self, repo: Path) -> None:
+        key = str(repo)
+        self._generations[key] = self._generations.get(key, 0) + 1
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    async def on_changes(self, changes) -> None:
+        """WorkspaceWatcher listener: drop the status of every repository a changed path lies in"""
+        # Changes inside .git are covered by repository_stamp.
+        paths = [str(path) for _, path in changes if ".git" not in path.parts]
+        for key in list(self._generations.keys() | self._entries.keys()):
+            prefix = key.rstrip(os.sep) + os.sep
+            if any(path.startswith(prefix) for path in paths):
+                self.invalidate(Path(key))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.trust_watcher,
+            "repositories": len(self._entries),
+            "entries": sum(len(scopes) for scopes in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "avg_refresh_ms": round(self.refresh_seconds / self.misses * 1000, 2) if self.misses else 0.0,
+        }
+
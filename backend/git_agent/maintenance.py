@@ -0,0 +1,166 @@
+import asyncio
+import contextlib
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from git_agent.commit_graph import CommitGraphKeeper
+from git_agent.git_backend import run_cli
+from git_agent.repo_locks import RepoLockManager
+
+GIT_MAINTENANCE_ENABLED = os.getenv("GIT_MAINTENANCE_ENABLED", "true").lower() == "true"
+GIT_MAINTENANCE_TICK_SECONDS = int(os.getenv("GIT_MAINTENANCE_TICK_SECONDS", "60"))
+# Tasks only start once no tool call has held a repository lock for this long.
+GIT_MAINTENANCE_IDLE_SECONDS = int(os.getenv("GIT_MAINTENANCE_IDLE_SECONDS", "30"))
+GIT_MAINTENANCE_TIMEOUT_SECONDS = int(os.getenv("GIT_MAINTENANCE_TIMEOUT_SECONDS", "900"))
+
+# (task, seconds between runs per repository). loose-objects and incremental-repack
+# run with --auto, so git skips them until enough loose objects or packs pile up.
+MAINTENANCE_TASKS = [
+    ("commit-graph", 3600),
+    ("prefetch", 3600),
+    ("loose-objects", 6 * 3600),
+    ("incremental-repack", 24 * 3600),
+]
+
+# Fetches into refs/prefetch/ only: branches, remote-tracking refs and FETCH_HEAD stay as they are.
+PREFETCH_OPTIONS = ["--prefetch", "--prune", "--no-tags", "--no-write-fetch-head", "--recurse-submodules=no", "--quiet"]
+
+
+def is_local_url(url: str, repo: Path) -> bool:
+    """Remotes on this machine are cheap to prefetch; network remotes are left to explicit fetches"""
+    if url.startswith("file://"):
+        return True
+    if "://" in url or ":" in url.split("/", 1)[0]:
+        return False
+    return (repo / url).exists()
+
+
+class MaintenanceScheduler:
+    """
+    Background `git maintenance` for the workspace's repositories, so object
+    counts and commit-graphs stay in shape without manual gc. Each tick runs
+    the tasks that are due, one at a time, as long as no tool call is using
+    a repository; a task already running is never interrupted.
+    """
+
+    def __init__(self, locks: RepoLockManager, repositories: Callable[[], List[Path]],
+                 commit_graph: Optional[CommitGraphKeeper] = None, enabled: bool = GIT_MAINTENANCE_ENABLED,
+                 tick: float = GIT_MAINTENANCE_TICK_SECONDS, idle: float = GIT_MAINTENANCE_IDLE_SECONDS):
+        self.locks = locks
+        self.repositories = repositories
+        self.commit_graph = commit_graph
+        self.enabled = enabled
+        self.tick = tick
+        self.idle = idle
+        self._task: Optional[asyncio.Task] = None
+        self._busy = False
+        self._state: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.runs = 0
+        self.failures = 0
+        self.deferred = 0
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """Stop scheduling; a task in progress runs to completion (a killed repack leaves lock files behind)"""
+        self.enabled = False
+        if self._task is not None:
+            if not self._busy:
+                self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _loop(self) -> None:
+        while self.enabled:
+            await asyncio.sleep(self.tick)
+            try:
+                await self.run_due()
+            except Exception as e:
+                print(f"[Git] Maintenance error: {e}")
+
+    async def run_due(self) -> int:
+        """Run every task that is due while the server stays idle; returns how many ran"""
+        repos = await asyncio.to_thread(self.repositories)
+        for key in [key for key in self._state if Path(key) not in repos]:
+            del self._state[key]
+        ran = 0
+        for repo in repos:
+            for task, interval in MAINTENANCE_TASKS:
+                last = self._state.get(str(repo), {}).get(task)
+                if last is not None and time.time() - last["at"] < interval:
+                    continue
+                if not self.enabled:
+                    return ran
+                if self.locks.idle_for() < self.idle:
+                    self.deferred += 1
+                    return ran
+                self._busy = True
+                try:
+                    await self.run_task(repo, task)
+                finally:
+                    self._busy = False
+                ran += 1
+        return ran
+
+    async def run_task(self, repo: Path, task: str) -> Dict[str, Any]:
+        started = time.monotonic()
+        if task == "commit-graph" and self.commit_graph is not None:
+            # The keeper serializes graph writes per repository; two concurrent writers would collide on the lock file.
+            self.commit_graph.mark_stale(repo)
+            result = {"success": True, "stderr": "", "detail": "scheduled"}
+        elif task == "prefetch":
+            result = await self._prefetch(repo)
+        else:
+            cmd = ["maintenance", "run", f"--task={task}", "--quiet"]
+            if task != "commit-graph":
+                cmd.insert(2, "--auto")
+            async with self.locks.read(repo, background=True):
+                result = await run_cli(cmd, repo, timeout=GIT_MAINTENANCE_TIMEOUT_SECONDS)
+        seconds = time.monotonic() - started
+        self.runs += 1
+        if not result["success"]:
+            self.failures += 1
+            print(f"[Git] Maintenance task {task} failed in {repo}: {result['stderr']}")
+        self._state.setdefault(str(repo), {})[task] = {
+            "at": time.time(),
+            "seconds": round(seconds, 3),
+            "ok": result["success"],
+            "detail": result["stderr"][-200:] if not result["success"] else result.get("detail", ""),
+        }
+        return result
+
+    async def _prefetch(self, repo: Path) -> Dict[str, Any]:
+        """Prefetch every local remote, so later fetches and pulls from it transfer little"""
+        async with self.locks.read(repo, background=True):
+            config = await run_cli(["config", "--get-regexp", r"^remote\..*\.url$"], repo)
+            remotes = []
+            for line in config["stdout"].splitlines() if config["success"] else []:
+                key, _, url = line.partition(" ")
+                if is_local_url(url, repo):
+                    remotes.append(key[len("remote."):-len(".url")])
+            for remote in remotes:
+                result = await run_cli(["fetch", remote, *PREFETCH_OPTIONS], repo, timeout=GIT_MAINTENANCE_TIMEOUT_SECONDS)
+                if not result["success"]:
+                    return result
+        return {"success": True, "stderr": "", "detail": f"local remotes: {', '.join(remotes) or 'none'}"}
+
+    def stats(self) -> Dict[str, Any]:
+        repos = {}
+        for key, tasks in self._state.items():
+            repos[key] = {
+                task: {**state, "at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(state["at"]))}
+                for task, state in tasks.items()
+            }
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None,
+            "runs": self.runs,
+            "failures": self.failures,
+            "deferred": self.deferred,
+            "repositories": repos,
+        }
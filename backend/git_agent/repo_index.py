@@ -0,0 +1,184 @@
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from watchfiles import Change, DefaultFilter
+
+from git_agent.git_status import git_dirs
+
+GIT_REPO_INDEX_ENABLED = os.getenv("GIT_REPO_INDEX_ENABLED", "true").lower() == "true"
+# Directory levels below the workspace searched for repositories
+GIT_REPO_INDEX_MAX_DEPTH = int(os.getenv("GIT_REPO_INDEX_MAX_DEPTH", "6"))
+
+# Never hold repositories of their own; skipping them keeps the scan cheap.
+SKIP_DIRS = {"node_modules", "__pycache__", ".venv", "venv", ".tox", ".mypy_cache", ".pytest_cache", ".cache"}
+
+
+class GitWorkspaceFilter(DefaultFilter):
+    """
+    Working-tree paths plus the few .git paths that add or remove a
+    repository or move HEAD or a branch. Object, log and index writes
+    inside .git are dropped.
+    """
+
+    def __init__(self):
+        super().__init__(ignore_dirs=(), ignore_entity_patterns=())
+
+    def __call__(self, change: Change, path: str) -> bool:
+        parts = Path(path).parts
+        if ".git" not in parts:
+            return True
+        tail = parts[parts.index(".git") + 1:]
+        return not tail or tail[-1] in ("HEAD", "packed-refs") or "refs/heads/" in "/".join(tail)
+
+
+def find_repositories(root: Path, max_depth: int = GIT_REPO_INDEX_MAX_DEPTH) -> List[Path]:
+    """Working trees (with a .git directory, or a .git file for worktrees and submodules) below root"""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        path = Path(dirpath)
+        if ".git" in dirnames or ".git" in filenames:
+            found.append(path)
+        if len(path.relative_to(root).parts) >= max_depth:
+            dirnames[:] = []
+        else:
+            dirnames[:] = [d for d in dirnames if d != ".git" and d not in SKIP_DIRS]
+    return found
+
+
+def read_head(git_dir: Path, common: Path) -> Tuple[Optional[str], Optional[str]]:
+    """(branch, or None when detached; commit, or None on an unborn branch) read from the ref files"""
+    try:
+        target = (git_dir / "HEAD").read_text().strip()
+    except OSError:
+        return None, None
+    if not target.startswith("ref: "):
+        return None, target
+    ref = target[len("ref: "):]
+    branch = ref[len("refs/heads/"):] if ref.startswith("refs/heads/") else ref
+    try:
+        return branch, (common / ref).read_text().strip()
+    except OSError:
+        pass
+    try:
+        for line in (common / "packed-refs").read_text().splitlines():
+            if line.endswith(f" {ref}"):
+                return branch, line.split(" ", 1)[0]
+    except OSError:
+        pass
+    return branch, None
+
+
+def describe(repo: Path) -> Dict[str, Any]:
+    git_dir, common = git_dirs(repo)
+    if (repo / ".git").is_dir():
+        kind = "repository"
+    elif git_dir != common:
+        kind = "worktree"
+    else:
+        kind = "submodule"
+    branch, head = read_head(git_dir, common)
+    return {"path": repo, "kind": kind, "git_dir": git_dir, "common": common, "branch": branch, "head": head}
+
+
+class RepositoryIndex:
+    """
+    Every repository in the workspace with its kind, branch and HEAD. Built
+    by a scan at startup and then kept current by the workspace watcher: a
+    .git appearing or disappearing triggers a rescan, a moved HEAD or branch
+    re-reads that repository's ref files. Without a running watcher
+    (trust_watcher unset) every lookup rescans.
+    """
+
+    def __init__(self, root: Path, max_depth: int = GIT_REPO_INDEX_MAX_DEPTH):
+        self.root = root
+        self.max_depth = max_depth
+        self.trust_watcher = False
+        self._repos: Dict[str, Dict[str, Any]] = {}
+        self._stale: Set[str] = set()
+        self._rescan = True
+        self.scans = 0
+        self.scan_seconds = 0.0
+        self.refreshes = 0
+
+    def scan(self) -> None:
+        # Reset first: changes reported while the walk runs mark entries again.
+        self._rescan = False
+        self._stale.clear()
+        started = time.monotonic()
+        self._repos = {str(repo): describe(repo) for repo in find_repositories(self.root, self.max_depth)}
+        self.scans += 1
+        self.scan_seconds += time.monotonic() - started
+
+    def mark_stale(self, repo: Path) -> None:
+        """Re-read repo's HEAD on the next lookup; an unknown repository means something was added"""
+        if str(repo) in self._repos:
+            self._stale.add(str(repo))
+        else:
+            self._rescan = True
+
+    def mark_rescan(self) -> None:
+        self._rescan = True
+
+    async def on_changes(self, changes) -> None:
+        """WorkspaceWatcher listener"""
+        for kind, path in changes:
+            if path.name == ".git" and kind != "modified":
+                self._rescan = True
+            elif ".git" in path.parts:
+                # Refs shared through the common dir move the branches of every worktree.
+                for key, entry in list(self._repos.items()):
+                    if path.is_relative_to(entry["git_dir"]) or path.is_relative_to(entry["common"]):
+                        self._stale.add(key)
+
+    def repositories(self, below: Optional[Path] = None) -> List[Dict[str, Any]]:
+        """Current entries at or below `below`, refreshed first where needed"""
+        if self._rescan or not self.trust_watcher:
+            self.scan()
+        for key in list(self._stale):
+            self._stale.discard(key)
+            if key not in self._repos:
+                continue
+            if (Path(key) / ".git").exists():
+                self._repos[key] = describe(Path(key))
+                self.refreshes += 1
+            else:
+                del self._repos[key]
+        entries = sorted(self._repos.values(), key=lambda entry: str(entry["path"]))
+        if below is not None:
+            entries = [entry for entry in entries if entry["path"].is_relative_to(below)]
+        return entries
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.trust_watcher,
+            "repositories": len(self._repos),
+            "scans": self.scans,
+            "avg_scan_ms": round(self.scan_seconds / self.scans * 1000, 2) if self.scans else 0.0,
+            "refreshes": self.refreshes,
+        }
+
+
+def format_repositories(entries: List[Dict[str, Any]], root: Path, statuses: Dict[str, Optional[Dict[str, Any]]]) -> str:
+    """One line per repository: path, kind, branch @ HEAD and, when statuses has it, clean/dirty"""
+    if not entries:
+        return "No Git repositories found"
+    lines = [f"Git repositories ({len(entries)}):"]
+    for entry in entries:
+        path = entry["path"].relative_to(root).as_posix() or "."
+        kind = entry["kind"]
+        if kind == "worktree":
+            main = entry["common"].parent
+            kind += f" of {(main.relative_to(root).as_posix() or '.') if main.is_relative_to(root) else main}"
+        head = entry["branch"] or "detached"
+        head += f" @ {entry['head'][:10]}" if entry["head"] else " (no commits yet)"
+        line = f"{path} [{kind}] {head}"
+        status = statuses.get(str(entry["path"]))
+        if status is not None:
+            if status["entries"]:
+                line += " dirty (" + ", ".join(f"{n} {name}" for name, n in status["counts"].items() if n) + ")"
+            else:
+                line += " clean"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,171 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List
+
+# Subcommands that never touch the index or refs.
+READ_ONLY_COMMANDS = {
+    "status", "log", "diff", "show", "rev-parse", "rev-list", "ls-files", "ls-tree",
+    "cat-file", "for-each-ref", "blame", "shortlog", "describe", "grep", "merge-base",
+}
+
+
+def is_read_only(cmd: List[str]) -> bool:
+    """Whether a git command line (without the leading 'git') only reads the repository"""
+    if not cmd:
+        return True
+    subcommand, args = cmd[0], cmd[1:]
+    if subcommand in READ_ONLY_COMMANDS:
+        return True
+    if subcommand == "branch":
+        return all(arg in ("-a", "--all", "-r", "--list", "-v", "-vv") for arg in args)
+    if subcommand == "remote":
+        return all(arg in ("-v", "--verbose") for arg in args)
+    if subcommand == "stash":
+        return bool(args) and args[0] in ("list", "show")
+    if subcommand == "config":
+        positional = [arg for arg in args if not arg.startswith("-")]
+        return "--list" in args or "-l" in args or len(positional) == 1
+    return False
+
+
+def repo_root(path: Path) -> Path:
+    """The enclosing working tree (nearest directory containing .git), or path itself"""
+    for candidate in (path, *path.parents):
+        if (candidate / ".git").exists():
+            return candidate
+    return path
+
+
+class RepoLock:
+    """
+    Readers-writer lock for one repository. Reads share it, writes are
+    exclusive, and waiting writers block new readers so they cannot starve.
+    """
+
+    def __init__(self):
+        self._cond = asyncio.Condition()
+        self.readers = 0
+        self.writer = False
+        self.waiting_readers = 0
+        self.waiting_writers = 0
+
+    async def acquire_read(self) -> None:
+        async with self._cond:
+            self.waiting_readers += 1
+            try:
+                await self._cond.wait_for(lambda: not self.writer and self.waiting_writers == 0)
+            finally:
+                self.waiting_readers -= 1
+            self.readers += 1
+
+    async def release_read(self) -> None:
+        async with self._cond:
+            self.readers -= 1
+            if self.readers == 0:
+                self._cond.notify_all()
+
+    async def acquire_write(self) -> None:
+        async with self._cond:
+            self.waiting_writers += 1
+            try:
+                await self._cond.wait_for(lambda: not self.writer and self.readers == 0)
+            finally:
+                self.waiting_writers -= 1
+                # A writer giving up may unblock readers queued behind it.
+                self._cond.notify_all()
+            self.writer = True
+
+    async def release_write(self) -> None:
+        async with self._cond:
+            self.writer = False
+            self._cond.notify_all()
+
+
+class RepoLockManager:
+    """
+    Per-repository locks plus queue depth and lock wait statistics. Locks
+    taken for background work (background=True) do not count as activity,
+    so background jobs can tell whether tool calls are running (idle_for).
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, RepoLock] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._foreground = 0
+        self._last_activity = time.monotonic()
+
+    def _lock(self, repo: Path) -> RepoLock:
+        key = str(repo)
+        if key not in self._locks:
+            self._locks[key] = RepoLock()
+            self._stats[key] = {"reads": 0, "writes": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+        return self._locks[key]
+
+    def _record(self, repo: Path, kind: str, waited: float) -> None:
+        stats = self._stats[str(repo)]
+        stats[kind] += 1
+        stats["wait_seconds"] += waited
+        stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+
+    @asynccontextmanager
+    async def _activity(self, background: bool) -> AsyncIterator[None]:
+        if background:
+            yield
+            return
+        self._foreground += 1
+        try:
+            yield
+        finally:
+            self._foreground -= 1
+            self._last_activity = time.monotonic()
+
+    def idle_for(self) -> float:
+        """Seconds since the last foreground lock was released; 0 while one is held or awaited"""
+        return 0.0 if self._foreground else time.monotonic() - self._last_activity
+
+    @asynccontextmanager
+    async def read(self, repo: Path, background: bool = False) -> AsyncIterator[None]:
+        lock = self._lock(repo)
+        async with self._activity(background):
+            started = time.monotonic()
+            await lock.acquire_read()
+            self._record(repo, "reads", time.monotonic() - started)
+            try:
+                yield
+            finally:
+                await lock.release_read()
+
+    @asynccontextmanager
+    async def write(self, repo: Path, background: bool = False) -> AsyncIterator[None]:
+        lock = self._lock(repo)
+        async with self._activity(background):
+            started = time.monotonic()
+            await lock.acquire_write()
+            self._record(repo, "writes", time.monotonic() - started)
+            try:
+                yield
+            finally:
+                await lock.release_write()
+
+    def stats(self) -> Dict[str, Any]:
+        repos = {}
+        for key, lock in self._locks.items():
+            stats = self._stats[key]
+            acquisitions = stats["reads"] + stats["writes"]
+            repos[key] = {
+                "active_readers": lock.readers,
+                "writer_active": lock.writer,
+                "queued_readers": lock.waiting_readers,
+                "queued_writers": lock.waiting_writers,
+                "reads": int(stats["reads"]),
+                "writes": int(stats["writes"]),
+                "avg_wait_seconds": round(stats["wait_seconds"] / acquisitions, 4) if acquisitions else 0.0,
+                "max_wait_seconds": round(stats["max_wait_seconds"], 4),
+            }
+        return {
+            "queue_depth": sum(lock.waiting_readers + lock.waiting_writers for lock in self._locks.values()),
+            "idle_seconds": round(self.idle_for(), 1),
+            "repositories": repos,
+        }
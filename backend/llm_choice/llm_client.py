@@ -1,9 +1,19 @@
 import os
-import requests
+import json
+import asyncio
+import time
+import httpx
 from google import genai
 # import google.generativeai as genai
 from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Optional
 from dotenv import load_dotenv
+from .response_cache import ResponseCache, cache_key
+from .provider_health import ProviderHealth
+from .single_flight import SingleFlight
+from .token_budget import (
+    PromptTooLargeError, TokenBudget, TokenUsage, context_tokens_for, load_tokenizer, tokenizer_spec
+)
 
 env_path = Path(__file__).resolve().parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
@@ -11,93 +21,601 @@ load_dotenv(dotenv_path=env_path)
 LLM_PROVIDER = os.getenv("LLM_PROVIDER")
 client = genai.Client()
 
-class FlexibleLLMClient:
-    def __init__(self):
-        self.provider = LLM_PROVIDER.lower() if LLM_PROVIDER else "ollama"
+# Concurrent requests allowed per provider; a local Ollama serializes generations anyway.
+DEFAULT_CONCURRENCY = {"ollama": 2, "gemini": 8, "claude": 8}
+REQUEST_TIMEOUTS = {"ollama": 180, "claude": 90}
+# Tokens reserved for the answer, unless LLM_MAX_OUTPUT_TOKENS is set.
+DEFAULT_OUTPUT_TOKENS = {"ollama": 2048, "gemini": 8192, "claude": 4096}
+# Ollama's own default context is small and silently truncates longer prompts.
+DEFAULT_OLLAMA_NUM_CTX = 8192
+# How long Ollama keeps the model loaded after a request (Ollama duration syntax).
+DEFAULT_OLLAMA_KEEP_ALIVE = "30m"
+# Startup warm-up keeps retrying while the Ollama server is still coming up.
+WARMUP_TIMEOUT_SECONDS = 600
+WARMUP_RETRY_SECONDS = 5
+# Hedge delay used until a provider has enough latency samples for a p95.
+DEFAULT_HEDGE_DELAY_SECONDS = 8.0
+HEDGE_MIN_SAMPLES = 20
+MIN_HEDGE_DELAY_SECONDS = 0.5
+
+
+def _http2_enabled() -> bool:
+    """HTTP/2 is opt-in and needs the optional h2 package (pip install httpx[http2])"""
+    if os.getenv("LLM_HTTP2", "false").lower() != "true":
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        print("[LLM] LLM_HTTP2 is set but the 'h2' package is missing; falling back to HTTP/1.1.")
+        return False
+
 
-        if self.provider == "ollama":
+class ProviderClient:
+    """
+    Settings, concurrency limit, health statistics and request code of one
+    LLM provider. Requests go through the HTTP pool owned by FlexibleLLMClient.
+    """
+
+    def __init__(self, name: str, max_concurrency: Optional[int] = None):
+        self.name = name
+        output_tokens = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "0")) or DEFAULT_OUTPUT_TOKENS.get(name, 2048)
+
+        if name == "ollama":
             self.base_url = os.getenv("OLLAMA_BASE_URL")
             self.model_name = os.getenv("MODEL")
             if not self.base_url or not self.model_name:
                 raise ValueError("OLLAMA_BASE_URL and MODEL must be set for the ollama provider.")
-        
-        elif self.provider == "gemini":
+            context_tokens = int(os.getenv("OLLAMA_NUM_CTX", DEFAULT_OLLAMA_NUM_CTX))
+            self.sampling_params = {"temperature": 0.5, "top_p": 0.9, "num_ctx": context_tokens, "num_predict": output_tokens}
+            self.keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", DEFAULT_OLLAMA_KEEP_ALIVE)
+
+        elif name == "gemini":
             api_key = os.getenv("GEMINI_API_KEY_CODE")
             gemini_model_name = os.getenv("GEMINI_MODEL")
             if not api_key or not gemini_model_name:
                 raise ValueError("GEMINI_API_KEY_CODE and GEMINI_MODEL must be set for the gemini provider.")
-            
+
             self.client = genai.Client(api_key=api_key)
             self.model_name = gemini_model_name
-        
-        elif self.provider == "claude":
+            context_tokens = context_tokens_for(self.model_name)
+            self.sampling_params = {"max_output_tokens": output_tokens}
+
+        elif name == "claude":
             self.api_key = os.getenv("CLAUDE_API_KEY")
             claude_model_name = os.getenv("CLAUDE_MODEL")
             self.model_name = claude_model_name
             if not self.api_key:
                 raise ValueError("CLAUDE_API_KEY must be set for the claude provider.")
-        
+            context_tokens = context_tokens_for(self.model_name or "claude")
+            self.sampling_params = {"temperature": 0.5, "max_tokens": output_tokens}
+
         else:
-            raise ValueError(f"Unsupported LLM_PROVIDER: {self.provider}")
+            raise ValueError(f"Unsupported LLM_PROVIDER: {name}")
+
+        self.budget = TokenBudget(load_tokenizer(tokenizer_spec(name)), context_tokens, output_tokens)
+        self.max_concurrency = max_concurrency or DEFAULT_CONCURRENCY[name]
+        self.timeout = REQUEST_TIMEOUTS.get(name, 120)
+        self.health = ProviderHealth(
+            failure_threshold=int(os.getenv("LLM_CIRCUIT_FAILURES", "3")),
+            cooldown_seconds=float(os.getenv("LLM_CIRCUIT_COOLDOWN_SECONDS", "30")),
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.warmed_at: Optional[float] = None
+        self.load_seconds: Optional[float] = None
+        self.warm_error: Optional[str] = None
+        self.waiting = 0
+        self.in_flight = 0
+        self.requests = 0
+
+    async def _acquire(self) -> None:
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        self.requests += 1
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
 
-    def generate_response(self, prompt: str, system_prompt: str) -> str:
+    def _claude_headers(self) -> dict:
+        return {
+            "x-api-key": self.api_key,
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json",
+        }
+
+    async def warm_up(self, http: httpx.AsyncClient) -> None:
         """
-        Takes a user prompt and a system prompt, formats them,
-        and calls the appropriate LLM chat method.
+        Load the model into memory and (re)start its keep_alive timer. Only
+        Ollama loads models on demand; other providers have nothing to warm.
         """
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": prompt}
-        ]
-        
-        return self.chat(messages)
+        if self.name != "ollama":
+            return
+        # An empty prompt loads the model without generating. num_ctx must match
+        # the real requests, or Ollama reloads the model on the first of them.
+        payload = {
+            "model": self.model_name,
+            "prompt": "",
+            "keep_alive": self.keep_alive,
+            "options": {"num_ctx": self.sampling_params["num_ctx"]},
+        }
+        try:
+            res = await http.post(f"{self.base_url}/api/generate", json=payload, timeout=self.timeout)
+            res.raise_for_status()
+        except Exception as e:
+            self.warm_error = f"{type(e).__name__}: {e}"[:200]
+            raise
+        self.load_seconds = round(res.json().get("load_duration", 0) / 1e9, 3)
+        self.warmed_at = time.time()
+        self.warm_error = None
+
+    async def residency(self, http: httpx.AsyncClient) -> dict:
+        """Whether the model is loaded and ready to answer without a cold start"""
+        if self.name != "ollama":
+            return {"resident": True}
+        res = await http.get(f"{self.base_url}/api/ps", timeout=5)
+        res.raise_for_status()
+        names = {self.model_name, f"{self.model_name}:latest"}
+        for model in res.json().get("models", []):
+            if model.get("name") in names or model.get("model") in names:
+                return {"resident": True, "expires_at": model.get("expires_at"), "size_vram": model.get("size_vram")}
+        return {"resident": False}
 
-    def chat(self, messages: list[dict]) -> str:
+    async def chat(self, http: httpx.AsyncClient, messages: list[dict], acquired: Optional[asyncio.Event] = None) -> str:
         """
-        Internal method to handle the actual API call to the selected provider.
+        One non-streamed request; latency and outcome feed the provider's
+        health. acquired is set once the request holds a concurrency slot.
         """
-        system_prompt = ""
-        user_messages = []
-        for msg in messages:
-            if msg["role"] == "system":
-                system_prompt = msg["content"]
-            else:
-                user_messages.append(msg)
+        await self._acquire()
+        if acquired is not None:
+            acquired.set()
+        started = time.monotonic()
+        try:
+            response = await self._chat(http, messages)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.health.record_failure(e)
+            raise
+        finally:
+            self._release()
+        self.health.record_success(time.monotonic() - started)
+        return response
+
+    async def _chat(self, http: httpx.AsyncClient, messages: list[dict]) -> str:
+        system_prompt, user_messages = FlexibleLLMClient._split_system(messages)
 
-        if self.provider == "ollama":
+        if self.name == "ollama":
             payload = {
                 "model": self.model_name,
-                "messages": messages, 
+                "messages": messages,
                 "stream": False,
-                "options": { "temperature": 0.5, "top_p": 0.9 },
+                "options": self.sampling_params,
+                "keep_alive": self.keep_alive,
             }
-            res = requests.post(f"{self.base_url}/api/chat", json=payload, timeout=180)
+            res = await http.post(f"{self.base_url}/api/chat", json=payload, timeout=self.timeout)
             res.raise_for_status()
             return res.json().get("message", {}).get("content", "")
 
-        elif self.provider == "gemini":
-            response = self.client.models.generate_content(
+        elif self.name == "gemini":
+            response = await self.client.aio.models.generate_content(
                 model=self.model_name,
                 contents=user_messages,
+                config=self.sampling_params,
             )
             return response.text
-            
-        elif self.provider == "claude":
-            headers = {
-                "x-api-key": self.api_key,
-                "anthropic-version": "2023-06-01",
-                "content-type": "application/json",
-            }
+
+        elif self.name == "claude":
             payload = {
                 "model": self.model_name,
-                "max_tokens": 4096,
-                "temperature": 0.5,
+                **self.sampling_params,
                 "system": system_prompt,
                 "messages": user_messages,
             }
-            res = requests.post("https://api.anthropic.com/v1/messages", headers=headers, json=payload, timeout=90)
+            res = await http.post(
+                "https://api.anthropic.com/v1/messages", headers=self._claude_headers(), json=payload, timeout=self.timeout
+            )
             res.raise_for_status()
             return res.json()["content"][0]["text"]
 
         else:
-            raise ValueError("Unknown provider")
\ No newline at end of file
+            raise ValueError("Unknown provider")
+
+    async def stream_chat(self, http: httpx.AsyncClient, messages: list[dict]) -> AsyncIterator[str]:
+        """Same as chat, but yields text deltas while the provider generates them"""
+        await self._acquire()
+        started = time.monotonic()
+        try:
+            async for delta in self._stream_chat(http, messages):
+                yield delta
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.health.record_failure(e)
+            raise
+        finally:
+            self._release()
+        self.health.record_success(time.monotonic() - started)
+
+    async def _stream_chat(self, http: httpx.AsyncClient, messages: list[dict]) -> AsyncIterator[str]:
+        system_prompt, user_messages = FlexibleLLMClient._split_system(messages)
+
+        if self.name == "ollama":
+            payload = {
+                "model": self.model_name,
+                "messages": messages,
+                "stream": True,
+                "options": self.sampling_params,
+                "keep_alive": self.keep_alive,
+            }
+            async with http.stream("POST", f"{self.base_url}/api/chat", json=payload, timeout=self.timeout) as res:
+                res.raise_for_status()
+                async for line in res.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    delta = chunk.get("message", {}).get("content", "")
+                    if delta:
+                        yield delta
+                    if chunk.get("done"):
+                        break
+
+        elif self.name == "gemini":
+            async for chunk in await self.client.aio.models.generate_content_stream(
+                model=self.model_name,
+                contents=user_messages,
+                config=self.sampling_params,
+            ):
+                if chunk.text:
+                    yield chunk.text
+
+        elif self.name == "claude":
+            payload = {
+                "model": self.model_name,
+                **self.sampling_params,
+                "system": system_prompt,
+                "messages": user_messages,
+                "stream": True,
+            }
+            async with http.stream(
+                "POST", "https://api.anthropic.com/v1/messages", headers=self._claude_headers(), json=payload, timeout=self.timeout
+            ) as res:
+                res.raise_for_status()
+                async for line in res.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    event = json.loads(line[len("data:"):])
+                    if event.get("type") == "content_block_delta":
+                        delta = event.get("delta", {}).get("text", "")
+                        if delta:
+                            yield delta
+                    elif event.get("type") == "message_stop":
+                        break
+
+        else:
+            raise ValueError("Unknown provider")
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "tokenizer": self.budget.tokenizer.name,
+            "context_tokens": self.budget.context_tokens,
+            "output_tokens": self.budget.output_tokens,
+            "warmed_at": self.warmed_at,
+            "load_seconds": self.load_seconds,
+            "warm_error": self.warm_error,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "requests": self.requests,
+            **self.health.stats(),
+        }
+
+
+class FlexibleLLMClient:
+    """
+    LLM client over an ordered list of providers: LLM_PROVIDER first, then the
+    comma-separated LLM_FALLBACK_PROVIDERS. A failed request falls through to
+    the next provider whose circuit is not open. With LLM_HEDGE_ENABLED, a
+    request still running after the provider's p95 latency is duplicated to the
+    next provider and the first answer wins.
+    """
+
+    def __init__(self, cache: Optional[ResponseCache] = None):
+        self.cache = cache
+        primary = LLM_PROVIDER.lower() if LLM_PROVIDER else "ollama"
+        fallbacks = [name.strip().lower() for name in os.getenv("LLM_FALLBACK_PROVIDERS", "").split(",")]
+
+        self.backends: list[ProviderClient] = [
+            ProviderClient(primary, int(os.getenv("LLM_MAX_CONCURRENCY", "0")) or None)
+        ]
+        for name in fallbacks:
+            if not name or name in [backend.name for backend in self.backends]:
+                continue
+            try:
+                self.backends.append(ProviderClient(name))
+            except ValueError as e:
+                print(f"[LLM] Fallback provider '{name}' disabled: {e}")
+
+        # The primary provider identifies requests (e.g. in cache keys), whichever provider answers.
+        self.primary = self.backends[0]
+        self.provider = self.primary.name
+        self.model_name = self.primary.model_name
+        self.sampling_params = self.primary.sampling_params
+        self.max_concurrency = self.primary.max_concurrency
+        self.budget = self.primary.budget
+        self.usage = TokenUsage()
+
+        self.hedge_enabled = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true" and len(self.backends) > 1
+        self.default_hedge_delay = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", DEFAULT_HEDGE_DELAY_SECONDS))
+        self.hedges = 0
+        self.fallbacks = 0
+        self.served_by_backup = 0
+
+        self.coalesce_enabled = os.getenv("LLM_COALESCE_ENABLED", "true").lower() == "true"
+        self.single_flight = SingleFlight()
+
+        # Re-warm Ollama models at this interval; keep it below OLLAMA_KEEP_ALIVE. 0 disables.
+        self.keep_warm_seconds = float(os.getenv("OLLAMA_KEEP_WARM_SECONDS", "0"))
+        self._warm_task: Optional[asyncio.Task] = None
+
+        self.http2 = _http2_enabled()
+        self._http: Optional[httpx.AsyncClient] = None
+
+    def _http_client(self) -> httpx.AsyncClient:
+        """Shared keep-alive connection pool, created inside the running event loop"""
+        if self._http is None:
+            total_concurrency = sum(backend.max_concurrency for backend in self.backends)
+            self._http = httpx.AsyncClient(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=total_concurrency * 2,
+                    max_keepalive_connections=total_concurrency,
+                    keepalive_expiry=60,
+                ),
+                timeout=httpx.Timeout(120, connect=10),
+            )
+        return self._http
+
+    def start_warmup(self) -> None:
+        """Warm the models in the background, then keep them warm if configured"""
+        if self._warm_task is None:
+            self._warm_task = asyncio.create_task(self._warm_loop())
+
+    async def _warm_loop(self) -> None:
+        http = self._http_client()
+        for backend in self.backends:
+            deadline = time.monotonic() + WARMUP_TIMEOUT_SECONDS
+            while True:
+                try:
+                    await backend.warm_up(http)
+                    if backend.warmed_at:
+                        print(f"[LLM] {backend.name} model {backend.model_name} warm (load {backend.load_seconds}s)")
+                    break
+                except Exception as e:
+                    if time.monotonic() >= deadline:
+                        print(f"[LLM] Giving up warming {backend.name}: {e}")
+                        break
+                    await asyncio.sleep(WARMUP_RETRY_SECONDS)
+
+        while self.keep_warm_seconds > 0:
+            await asyncio.sleep(self.keep_warm_seconds)
+            for backend in self.backends:
+                try:
+                    await backend.warm_up(http)
+                except Exception as e:
+                    print(f"[LLM] Keep-warm ping to {backend.name} failed: {e}")
+
+    async def readiness(self) -> dict:
+        """Ready when the primary provider can answer without loading its model first"""
+        providers = {}
+        for backend in self.backends:
+            try:
+                providers[backend.name] = await backend.residency(self._http_client())
+            except Exception as e:
+                providers[backend.name] = {"resident": False, "error": f"{type(e).__name__}: {e}"[:200]}
+        return {"ready": providers[self.primary.name]["resident"], "providers": providers}
+
+    async def aclose(self) -> None:
+        if self._warm_task is not None:
+            self._warm_task.cancel()
+            self._warm_task = None
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def generate_response(
+        self,
+        prompt: str,
+        system_prompt: str,
+        tool: str = "",
+        use_cache: bool = True,
+        on_token: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> str:
+        """
+        Takes a user prompt and a system prompt, formats them,
+        and calls the appropriate LLM chat method.
+        Responses are served from / stored in the response cache when one is configured,
+        unless use_cache is False. When on_token is given the response is streamed
+        and on_token is awaited with every text delta (once with the full text on a cache hit).
+        Identical concurrent calls share a single provider request (LLM_COALESCE_ENABLED).
+        Prompts that cannot fit the model's context and output budget raise
+        PromptTooLargeError before anything is sent.
+        """
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+
+        key = None
+        if self.cache is not None and use_cache:
+            key = cache_key(tool, self.provider, self.model_name, messages, self.sampling_params)
+            cached = self.cache.get(key, tool)
+            if cached is not None:
+                self.usage.record_cache_hit(tool)
+                if on_token:
+                    await on_token(cached)
+                return cached
+
+        try:
+            prompt_tokens = self.budget.check(messages)
+        except PromptTooLargeError:
+            self.usage.record_rejected(tool)
+            raise
+
+        async def work(push: Callable[[str], None]) -> str:
+            served: dict = {}
+            if on_token:
+                deltas = []
+                async for delta in self.stream_chat(messages, served):
+                    deltas.append(delta)
+                    push(delta)
+                response = "".join(deltas)
+            else:
+                response = await self.chat(messages, served)
+            self.usage.record(tool, prompt_tokens, self.budget.count(response))
+            # The key names the primary's model: a backup's answer must not be replayed in its place.
+            if key and response and served.get("backend") is self.primary:
+                await asyncio.to_thread(self.cache.put, key, response, tool, self.provider, self.model_name)
+            return response
+
+        if not self.coalesce_enabled:
+            return await SingleFlight().run("", work, on_token)
+        # Identical concurrent requests share one generation, whichever tool issued them.
+        flight_key = cache_key("", self.provider, self.model_name, messages, self.sampling_params)
+        return await self.single_flight.run(flight_key, work, on_token)
+
+    @staticmethod
+    def _split_system(messages: list[dict]) -> tuple[str, list[dict]]:
+        system_prompt = ""
+        user_messages = []
+        for msg in messages:
+            if msg["role"] == "system":
+                system_prompt = msg["content"]
+            else:
+                user_messages.append(msg)
+        return system_prompt, user_messages
+
+    def _candidates(self, messages: list[dict]) -> list[ProviderClient]:
+        """
+        Providers to try, in order: those with a closed circuit whose context fits
+        the prompt. The primary is still tried when no provider qualifies.
+        """
+        return [
+            backend for backend in self.backends
+            if backend.health.available() and backend.budget.count_messages(messages) <= backend.budget.prompt_limit
+        ] or self.backends[:1]
+
+    def hedge_delay(self, backend: ProviderClient) -> float:
+        """How long to wait for backend before duplicating the request to the next provider"""
+        if backend.health.samples < HEDGE_MIN_SAMPLES:
+            return self.default_hedge_delay
+        return max(MIN_HEDGE_DELAY_SECONDS, backend.health.percentile(95))
+
+    async def chat(self, messages: list[dict], served: Optional[dict] = None) -> str:
+        """
+        Send messages to the first healthy provider, falling back (or hedging,
+        when enabled) to the next ones. Raises the last error if all fail.
+        The provider that answered is stored in served["backend"].
+        """
+        candidates = self._candidates(messages)
+        backups = candidates[1:]
+        http = self._http_client()
+        tasks: dict[asyncio.Task, ProviderClient] = {}
+        slots: dict[asyncio.Task, asyncio.Event] = {}
+        clock: dict[asyncio.Task, float] = {}
+        last_error: Optional[BaseException] = None
+
+        def launch(backend: ProviderClient) -> None:
+            acquired = asyncio.Event()
+            task = asyncio.create_task(backend.chat(http, messages, acquired))
+            tasks[task] = backend
+            slots[task] = acquired
+
+        launch(candidates[0])
+        try:
+            while tasks:
+                timeout = None
+                if self.hedge_enabled and backups:
+                    first = next(iter(tasks))
+                    if not slots[first].is_set() and not first.done():
+                        # Time queued behind the provider's concurrency limit is not provider
+                        # latency: the hedge clock starts once the request holds a slot.
+                        slot = asyncio.create_task(slots[first].wait())
+                        await asyncio.wait([*tasks, slot], return_when=asyncio.FIRST_COMPLETED)
+                        slot.cancel()
+                    clock.setdefault(first, time.monotonic())
+                    timeout = max(0.0, self.hedge_delay(tasks[first]) - (time.monotonic() - clock[first]))
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Slower than the provider's p95: race a backup against it.
+                    self.hedges += 1
+                    clock[first] = time.monotonic()
+                    launch(backups.pop(0))
+                    continue
+                for task in done:
+                    backend = tasks.pop(task)
+                    if task.exception() is None:
+                        if backend is not self.primary:
+                            self.served_by_backup += 1
+                        if served is not None:
+                            served["backend"] = backend
+                        return task.result()
+                    last_error = task.exception()
+                    print(f"[LLM] {backend.name} request failed: {last_error}")
+                if not tasks and backups:
+                    self.fallbacks += 1
+                    launch(backups.pop(0))
+            raise last_error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def stream_chat(self, messages: list[dict], served: Optional[dict] = None) -> AsyncIterator[str]:
+        """
+        Same as chat, but yields the response as text deltas while the provider generates it.
+        Falls back to the next provider only while nothing has been yielded yet.
+        """
+        candidates = self._candidates(messages)
+        http = self._http_client()
+        for index, backend in enumerate(candidates):
+            emitted = False
+            try:
+                async for delta in backend.stream_chat(http, messages):
+                    emitted = True
+                    yield delta
+                if backend is not self.primary:
+                    self.served_by_backup += 1
+                if served is not None:
+                    served["backend"] = backend
+                return
+            except Exception as e:
+                if emitted or index == len(candidates) - 1:
+                    raise
+                print(f"[LLM] {backend.name} stream failed: {e}")
+                self.fallbacks += 1
+
+    def stats(self) -> dict:
+        return {
+            "provider": self.provider,
+            "model": self.model_name,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": sum(backend.in_flight for backend in self.backends),
+            "waiting": sum(backend.waiting for backend in self.backends),
+            "requests": sum(backend.requests for backend in self.backends),
+            "http2": self.http2,
+            "hedging": {
+                "enabled": self.hedge_enabled,
+                "hedges": self.hedges,
+                "fallbacks": self.fallbacks,
+                "served_by_backup": self.served_by_backup,
+                "current_delay": round(self.hedge_delay(self.primary), 3),
+            },
+            "providers": {backend.name: backend.stats() for backend in self.backends},
+            "coalescing": {"enabled": self.coalesce_enabled, **self.single_flight.stats()},
+            "tokens": self.usage.stats(),
+        }
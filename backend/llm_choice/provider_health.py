@@ -0,0 +1,91 @@
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+DEFAULT_LATENCY_WINDOW = 200
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_COOLDOWN_SECONDS = 30.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderHealth:
+    """
+    Rolling latency/error statistics and a circuit breaker for one provider.
+
+    After failure_threshold consecutive failures the circuit opens and the
+    provider is skipped for cooldown_seconds. It is then half-open: requests
+    are let through again and the next outcome closes or re-opens it.
+    """
+
+    def __init__(
+        self,
+        window: int = DEFAULT_LATENCY_WINDOW,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        cooldown_seconds: float = DEFAULT_COOLDOWN_SECONDS,
+    ):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._latencies: "deque[float]" = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self.consecutive_failures = 0
+        self.successes = 0
+        self.failures = 0
+        self.circuit_opens = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            self._state = HALF_OPEN
+        return self._state
+
+    def available(self) -> bool:
+        return self.state != OPEN
+
+    def record_success(self, latency: float) -> None:
+        self._latencies.append(latency)
+        self.successes += 1
+        self.consecutive_failures = 0
+        self._state = CLOSED
+
+    def record_failure(self, error: BaseException) -> None:
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"[:200]
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self._state != OPEN:
+                self.circuit_opens += 1
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency percentile (0-100) over the recent window, None without samples"""
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    @property
+    def samples(self) -> int:
+        return len(self._latencies)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.successes + self.failures
+        p50, p95, p99 = (self.percentile(q) for q in (50, 95, 99))
+        return {
+            "state": self.state,
+            "successes": self.successes,
+            "failures": self.failures,
+            "error_rate": round(self.failures / total, 4) if total else 0.0,
+            "consecutive_failures": self.consecutive_failures,
+            "circuit_opens": self.circuit_opens,
+            "latency_p50": round(p50, 3) if p50 is not None else None,
+            "latency_p95": round(p95, 3) if p95 is not None else None,
+            "latency_p99": round(p99, 3) if p99 is not None else None,
+            "last_error": self.last_error,
+        }
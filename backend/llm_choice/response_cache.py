@@ -0,0 +1,134 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def normalize_prompt(text: str) -> str:
+    """Normalize whitespace that does not change the meaning of a prompt"""
+    lines = [line.rstrip() for line in text.strip().splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+
+def cache_key(tool: str, provider: str, model: str, messages: list[dict], params: Dict[str, Any]) -> str:
+    """Stable key over everything that influences a generation"""
+    prompt = [{"role": m["role"], "content": normalize_prompt(m["content"])} for m in messages]
+    prompt_hash = hashlib.sha256(json.dumps(prompt, sort_keys=True).encode()).hexdigest()
+    material = json.dumps(
+        {"tool": tool, "provider": provider, "model": model, "prompt": prompt_hash, "params": params},
+        sort_keys=True,
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk (SQLite) cache of LLM responses with TTL and size-based LRU eviction.
+    Safe to share between threads.
+    """
+
+    def __init__(self, db_path: Path, ttl_seconds: int = DEFAULT_TTL_SECONDS, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY, tool TEXT, provider TEXT, model TEXT, response TEXT,
+                size INTEGER, created_at REAL, last_access REAL
+            );
+            CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+        """)
+        self._lock = threading.Lock()
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self._per_tool: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, tool: str, field: str) -> None:
+        self._per_tool.setdefault(tool, {"hits": 0, "misses": 0})[field] += 1
+
+    def get(self, key: str, tool: str = "") -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT response, size, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[2] > self.ttl_seconds:
+                with self._db:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= row[1]
+                self.expired += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                self._count(tool, "misses")
+                return None
+            with self._db:
+                self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            self._count(tool, "hits")
+            return row[0]
+
+    def put(self, key: str, response: str, tool: str = "", provider: str = "", model: str = "") -> None:
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock, self._db:
+            previous = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if previous is not None:
+                self._total_bytes -= previous[0]
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, tool, provider, model, response, size, now, now),
+            )
+            self._total_bytes += size
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        expired = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).fetchone()
+        if expired[1]:
+            self._db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            self._total_bytes -= expired[0]
+            self.expired += expired[1]
+
+        while self._total_bytes > self.max_bytes:
+            oldest = self._db.execute(
+                "SELECT key, size FROM responses ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not oldest:
+                break
+            for key, size in oldest:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {
+                "entries": entries,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "tools": dict(self._per_tool),
+            }
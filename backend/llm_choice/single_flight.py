@@ -0,0 +1,87 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+
+# work(push) produces the response; it may call push(delta) for every streamed text delta.
+WorkFn = Callable[[Callable[[str], None]], Awaitable[str]]
+
+
+class _Flight:
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.deltas: list[str] = []
+        self.waiters = 0
+        self.changed = asyncio.Event()
+
+    def push(self, delta: str) -> None:
+        self.deltas.append(delta)
+        self.wake()
+
+    def wake(self, *_) -> None:
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent requests. The first caller for a key starts
+    the work; callers arriving while it runs attach to it and get the same
+    result, and streaming callers get every delta from the start. The shared
+    work is cancelled only once every caller waiting on it has gone away.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.started = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+    async def run(self, key: str, work: WorkFn, on_token: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            flight.task = asyncio.create_task(work(flight.push))
+            flight.task.add_done_callback(flight.wake)
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self._flights[key] = flight
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            if on_token is None:
+                return await asyncio.shield(flight.task)
+
+            sent = 0
+            while True:
+                changed = flight.changed
+                while sent < len(flight.deltas):
+                    sent += 1
+                    await on_token(flight.deltas[sent - 1])
+                if flight.task.done():
+                    break
+                await changed.wait()
+            result = flight.task.result()
+            if not flight.deltas and result:
+                # The shared request was not streamed: deliver the answer in one piece.
+                await on_token(result)
+            return result
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                self.cancelled += 1
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "waiters": sum(flight.waiters for flight in self._flights.values()),
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+        }
@@ -0,0 +1,162 @@
+import math
+import os
+from typing import Any, Dict, Protocol
+
+# Code and prose average 3-4 characters per token across the providers' tokenizers;
+# erring low over-counts slightly, which is the safe side for budgets.
+APPROX_CHARS_PER_TOKEN = 3.5
+# Role markers and separators the providers add around every message.
+MESSAGE_OVERHEAD_TOKENS = 8
+
+# Context windows by model name prefix (first match wins). Ollama uses num_ctx instead.
+MODEL_CONTEXT_TOKENS = [
+    ("gemini-1.5-pro", 2_097_152),
+    ("gemini", 1_048_576),
+    ("claude", 200_000),
+]
+DEFAULT_CONTEXT_TOKENS = 8192
+
+
+class Tokenizer(Protocol):
+    name: str
+
+    def count(self, text: str) -> int: ...
+
+
+class ApproximateTokenizer:
+    """Character-ratio estimate: no dependencies, no I/O, microseconds per call"""
+
+    name = "approx"
+
+    def count(self, text: str) -> int:
+        return math.ceil(len(text) / APPROX_CHARS_PER_TOKEN)
+
+
+class TiktokenTokenizer:
+    """BPE counts from the optional tiktoken package, e.g. tiktoken:cl100k_base"""
+
+    def __init__(self, encoding: str):
+        import tiktoken
+        self.name = f"tiktoken:{encoding}"
+        self._encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+class HuggingFaceTokenizer:
+    """Exact counts for open models (e.g. hf:meta-llama/Llama-3.1-8B) via the optional tokenizers package"""
+
+    def __init__(self, name_or_path: str):
+        from tokenizers import Tokenizer as HFTokenizer
+        self.name = f"hf:{name_or_path}"
+        if os.path.isfile(name_or_path):
+            self._tokenizer = HFTokenizer.from_file(name_or_path)
+        else:
+            self._tokenizer = HFTokenizer.from_pretrained(name_or_path)
+
+    def count(self, text: str) -> int:
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def load_tokenizer(spec: str) -> Tokenizer:
+    """
+    Build a tokenizer from "approx", "tiktoken:<encoding>" or "hf:<name or tokenizer.json>".
+    Falls back to the approximation when the package or its data is unavailable.
+    """
+    kind, _, argument = spec.partition(":")
+    try:
+        if kind == "tiktoken":
+            return TiktokenTokenizer(argument or "cl100k_base")
+        if kind == "hf" and argument:
+            return HuggingFaceTokenizer(argument)
+    except Exception as e:
+        print(f"[LLM] Tokenizer '{spec}' unavailable ({e}); using the approximate counter.")
+    return ApproximateTokenizer()
+
+
+def context_tokens_for(model: str) -> int:
+    for prefix, tokens in MODEL_CONTEXT_TOKENS:
+        if model and model.lower().startswith(prefix):
+            return tokens
+    return DEFAULT_CONTEXT_TOKENS
+
+
+class PromptTooLargeError(ValueError):
+    """Raised before sending a prompt that cannot fit the model's context window"""
+
+
+class TokenBudget:
+    """Context and output budget of one model, measured with its tokenizer"""
+
+    def __init__(self, tokenizer: Tokenizer, context_tokens: int, output_tokens: int):
+        self.tokenizer = tokenizer
+        self.context_tokens = context_tokens
+        self.output_tokens = output_tokens
+
+    @property
+    def prompt_limit(self) -> int:
+        """Tokens available to the prompt once the output budget is reserved"""
+        return max(0, self.context_tokens - self.output_tokens)
+
+    def count(self, text: str) -> int:
+        return self.tokenizer.count(text)
+
+    def count_messages(self, messages: list[dict]) -> int:
+        return sum(self.count(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+    def check(self, messages: list[dict]) -> int:
+        """Return the prompt's token count, raising PromptTooLargeError if it does not fit"""
+        tokens = self.count_messages(messages)
+        if tokens > self.prompt_limit:
+            raise PromptTooLargeError(
+                f"Prompt is {tokens} tokens but the model allows {self.prompt_limit} "
+                f"({self.context_tokens} context - {self.output_tokens} reserved for output)."
+            )
+        return tokens
+
+    def trim(self, text: str, max_tokens: int, marker: str = "\n[... truncated ...]") -> str:
+        """Cut text so that it (plus marker) fits in max_tokens"""
+        tokens = self.count(text)
+        if tokens <= max_tokens:
+            return text
+        keep = int(len(text) * max(0, max_tokens - self.count(marker)) / tokens)
+        while keep > 0 and self.count(text[:keep] + marker) > max_tokens:
+            keep = int(keep * 0.9)
+        return text[:keep] + marker
+
+
+class TokenUsage:
+    """Per-tool token accounting"""
+
+    def __init__(self):
+        self._tools: Dict[str, Dict[str, int]] = {}
+
+    def _tool(self, tool: str) -> Dict[str, int]:
+        return self._tools.setdefault(tool or "unknown", {
+            "requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "cache_hits": 0, "rejected": 0,
+        })
+
+    def record(self, tool: str, prompt_tokens: int, completion_tokens: int) -> None:
+        entry = self._tool(tool)
+        entry["requests"] += 1
+        entry["prompt_tokens"] += prompt_tokens
+        entry["completion_tokens"] += completion_tokens
+
+    def record_cache_hit(self, tool: str) -> None:
+        self._tool(tool)["cache_hits"] += 1
+
+    def record_rejected(self, tool: str) -> None:
+        self._tool(tool)["rejected"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        totals = {"prompt_tokens": 0, "completion_tokens": 0}
+        for entry in self._tools.values():
+            totals["prompt_tokens"] += entry["prompt_tokens"]
+            totals["completion_tokens"] += entry["completion_tokens"]
+        return {**totals, "tools": {tool: dict(entry) for tool, entry in self._tools.items()}}
+
+
+def tokenizer_spec(provider: str, default: str = "approx") -> str:
+    """LLM_TOKENIZER_<PROVIDER> overrides LLM_TOKENIZER for one provider"""
+    return os.getenv(f"LLM_TOKENIZER_{provider.upper()}", os.getenv("LLM_TOKENIZER", default))
@@ -0,0 +1,49 @@
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# The server reads its workspace and mirror settings at import time.
+WORKSPACE = Path(tempfile.mkdtemp(prefix="git_clone_test_"))
+os.environ["MCP_WORKSPACE_DIR"] = str(WORKSPACE)
+os.environ["GIT_MIRROR_CACHE_ENABLED"] = "false"
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastmcp import Client
+
+from git_agent.git_server import mcp
+
+
+def make_upstream(path: Path) -> Path:
+    git = lambda *args: subprocess.run(["git", *args], cwd=path, check=True, capture_output=True)
+    path.mkdir(parents=True)
+    git("init", "-q")
+    (path / "README.md").write_text("hello\n")
+    git("add", "README.md")
+    git("-c", "user.email=test@example.com", "-c", "user.name=test", "commit", "-q", "-m", "initial")
+    return path
+
+
+def call_clone(arguments: dict) -> str:
+    async def run() -> str:
+        async with Client(mcp) as client:
+            result = await client.call_tool("git_clone", arguments)
+            return result[0].text
+
+    return asyncio.run(run())
+
+
+def test_clone_without_directory_uses_repository_name():
+    upstream = make_upstream(Path(tempfile.mkdtemp()) / "project")
+    result = call_clone({"url": str(upstream)})
+    assert not result.startswith("Error"), result
+    assert (WORKSPACE / "project" / "README.md").read_text() == "hello\n"
+
+
+def test_clone_accepts_explicit_null_directory():
+    upstream = make_upstream(Path(tempfile.mkdtemp()) / "other")
+    result = call_clone({"url": str(upstream), "directory": None})
+    assert not result.startswith("Error"), result
+    assert (WORKSPACE / "other" / "README.md").exists()